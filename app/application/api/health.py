@@ -0,0 +1,26 @@
+from fastapi import Request, status
+from fastapi.routing import APIRouter
+from pydantic import BaseModel
+
+router = APIRouter(tags=['Health'])
+
+
+class HealthResponseSchema(BaseModel):
+    """
+    startup_seconds - сколько занял старт приложения (lifespan до приема запросов), None - старт еще не прошел
+    """
+    status: str
+    startup_seconds: float | None = None
+
+
+@router.get(
+    '/health',
+    response_model=HealthResponseSchema,
+    status_code=status.HTTP_200_OK,
+    description='Проверка живости и время старта приложения',
+)
+async def health_handler(request: Request) -> HealthResponseSchema:
+    return HealthResponseSchema(
+        status='ok',
+        startup_seconds=getattr(request.app.state, 'startup_seconds', None),
+    )
@@ -1,5 +1,129 @@
+import asyncio
+import logging
+import time
+from contextlib import AsyncExitStack, asynccontextmanager, suppress
+
 from fastapi import FastAPI
+from motor.motor_asyncio import AsyncIOMotorClient
+from punq import Container
+
+from application.api.health import router as health_router
+from application.api.metrics import router as metrics_router
 from application.api.messages.handlers import router as message_router
+from application.api.messages.websockets import router as websocket_router
+from infra.message_brokers.base import BaseMessageBroker
+from infra.metrics.prometheus import PrometheusMetrics
+from infra.repositories.indexes import ensure_indexes, verify_indexes_usage
+from infra.repositories.messages.base import BaseChatsRepository, BaseMessagesRepository
+from infra.repositories.messages.cached import CachedChatsRepository
+from infra.repositories.messages.coalescing import CoalescingMessagesRepository
+from infra.repositories.messages.instrumented import InstrumentedChatsRepository, InstrumentedMessagesRepository
+from infra.repositories.messages.mongo import BaseMongoDBRepository
+from infra.repositories.messages.snapshots import MemorySnapshotter
+from infra.websockets.backplanes import BaseWebSocketsBackplane
+from logic.consumers import BroadcastEventsConsumer
+from logic.init import init_container
+from logic.mediator import Mediator
+from logic.outbox import OutboxRelay
+from settings.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+async def _cancel_task(task: asyncio.Task) -> None:
+    task.cancel()
+    with suppress(asyncio.CancelledError):
+        await task
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Старт приложения - все, что должно случиться до первого запроса:
+    - контейнер собирается здесь, в цикле событий, а не в первом запросе (Depends(init_container) вызывается
+      в пуле потоков - параллельные первые запросы собирали бы синглтоны наперегонки), медиатор со всеми
+      обработчиками и репозиториями создается сразу;
+    - пул монги открывается и проверяется ping-ом: недоступная монга не дает приложению стартовать,
+      а не отвечает таймаутом первому пользователю;
+    - применяем реестр индексов монго-репозиториев (идемпотентно) и, если включена диагностика
+      (MONGODB_EXPLAIN_QUERIES), проверяем explain()-ом, что запросы идут по индексам;
+    - при STORAGE_BACKEND=memory со снимком - восстанавливаем хранилище из файла (и периодически сохраняем).
+    Дальше стартуют продюсер брокера, бэкплейн веб-сокетов и в фоне крутятся OutboxRelay (если включен)
+    и слушатель событий (буфер последних сообщений, кэш чатов) - до остановки приложения. Каждый запущенный
+    компонент сразу регистрируется в AsyncExitStack: при остановке, как и при ошибке на любом шаге старта,
+    закрывается все уже запущенное в обратном порядке, пул монги - последним.
+    Контейнер берем с учетом dependency_overrides - в тестах там memory-репозитории.
+    Время старта - в app.state.startup_seconds (отдает GET /health) и в метрике chat_startup_seconds (GET /metrics).
+    """
+    started_at = time.perf_counter()
+    async with AsyncExitStack() as stack:
+        container: Container = app.dependency_overrides.get(init_container, init_container)()
+        config: Config = container.resolve(Config)
+        container.resolve(Mediator)
+
+        chats_repository = container.resolve(BaseChatsRepository)
+        messages_repository = container.resolve(BaseMessagesRepository)
+        # кэш, групповая запись и метрики - обертки, индексы объявлены у монго-репозиториев внутри
+        if isinstance(chats_repository, CachedChatsRepository):
+            chats_repository = chats_repository.repository
+        if isinstance(chats_repository, InstrumentedChatsRepository):
+            chats_repository = chats_repository.repository
+        coalescing_repository = messages_repository if isinstance(messages_repository, CoalescingMessagesRepository) else None
+        if coalescing_repository:
+            messages_repository = coalescing_repository.repository
+        if isinstance(messages_repository, InstrumentedMessagesRepository):
+            messages_repository = messages_repository.repository
+
+        mongo_repositories = [
+            repository
+            for repository in (chats_repository, messages_repository)
+            if isinstance(repository, BaseMongoDBRepository)
+        ]
+        if mongo_repositories:
+            mongo_client: AsyncIOMotorClient = container.resolve(AsyncIOMotorClient)
+            stack.callback(mongo_client.close)
+            await mongo_client.admin.command('ping')
+
+        await ensure_indexes(mongo_repositories)
+
+        if config.mongo_db_explain_queries != 'off':
+            await verify_indexes_usage(mongo_repositories, fail=config.mongo_db_explain_queries == 'fail')
+
+        if config.storage_backend == 'memory' and config.memory_snapshot_path:
+            # memory-хранилище: поднимаем последний снимок до первого запроса
+            snapshotter: MemorySnapshotter = container.resolve(MemorySnapshotter)
+            snapshotter.load()
+            stack.push_async_callback(snapshotter.save)
+            if config.memory_snapshot_interval > 0:
+                stack.push_async_callback(_cancel_task, asyncio.create_task(snapshotter.run()))
+
+        message_broker: BaseMessageBroker = container.resolve(BaseMessageBroker)
+        await message_broker.start()
+        stack.push_async_callback(message_broker.close)
+
+        backplane: BaseWebSocketsBackplane = container.resolve(BaseWebSocketsBackplane)
+        await backplane.start()
+        stack.push_async_callback(backplane.close)
+
+        # отложенные группой записи дописываются, когда relay и слушатель уже остановлены, а брокер еще открыт
+        if coalescing_repository:
+            stack.push_async_callback(coalescing_repository.flush)
+
+        if config.outbox_relay_enabled:
+            stack.push_async_callback(_cancel_task, asyncio.create_task(container.resolve(OutboxRelay).run()))
+
+        # буфер последних сообщений и кэш чатов выключены - слушателю событий нечего обновлять
+        events_listener: BroadcastEventsConsumer = container.resolve(BroadcastEventsConsumer)
+        if events_listener.mediator.events_map:
+            await events_listener.consumer.start()
+            stack.push_async_callback(events_listener.consumer.close)
+            stack.push_async_callback(_cancel_task, asyncio.create_task(events_listener.run()))
+
+        app.state.startup_seconds = time.perf_counter() - started_at
+        container.resolve(PrometheusMetrics).startup_seconds.set(app.state.startup_seconds)
+        logger.info('application started in %.3fs', app.state.startup_seconds)
+
+        yield
 
 
 def create_app() -> FastAPI:
@@ -8,10 +132,12 @@ def create_app() -> FastAPI:
         docs_url='/api/docs',
         description='A simple kafka + ddd example.',
         debug=True,
+        lifespan=lifespan,
     )
 
+    app.include_router(health_router)
+    app.include_router(metrics_router)
     app.include_router(message_router, prefix="/chat")
+    app.include_router(websocket_router, prefix="/chat")
 
     return app
-
-
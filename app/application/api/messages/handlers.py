@@ -1,14 +1,22 @@
-from fastapi import HTTPException, Depends, status
+from typing import Literal
+
+from fastapi import HTTPException, Depends, Query, status
+from fastapi.responses import StreamingResponse
 from fastapi.routing import APIRouter
 from punq import Container
 
 # from application.api.dependencies.containers import container  - используя Depends ушли от глобавльной инициализации
 from application.api.messages.schema import CreateChatResponseSchema, CreateChatRequestSchema, ErrorSchema, \
-    CreateMessageResponseSchema, CreateMessageRequestSchema
+    CreateMessageResponseSchema, CreateMessageRequestSchema, ChatDetailSchema, GetMessagesQueryResponseSchema, \
+    BulkCreateMessagesRequestSchema, BulkCreateMessagesResponseSchema
+from application.api.messages.serializers import JSONBytesResponse, serialize_chat, serialize_messages_page, \
+    stream_chat_json, stream_messages_ndjson
 from domain.exceptions.base import ApplicationException
-from logic.commands.messages import CreateChatCommand, CreateMessageCommand
+from logic.commands.messages import CreateChatCommand, CreateMessageCommand, BulkCreateMessagesCommand
 from logic.init import init_container
 from logic.mediator import Mediator
+from logic.queries.messages import GetChatQuery, GetMessagesQuery, ExportChatQuery
+from settings.config import Config
 
 router = APIRouter(
     # prefix="chat/",
@@ -45,7 +53,6 @@ async def create_chat_handler(
         chat, *_ = await mediator.handle_command(CreateChatCommand(title=schema.title))
     except ApplicationException as exception:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={"error": exception.message})
-    print(f'chat={chat}')
     return CreateChatResponseSchema.from_entity(chat)
     # return {'success': True}
 
@@ -73,10 +80,38 @@ async def create_message_handler(
         ))
     except ApplicationException as exception:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={"error": exception.message})
-    print(f'message={message}')
     return CreateMessageResponseSchema.from_entity(message)
 
 
+@router.post(
+    '/{chat_oid}/messages/bulk',
+    response_model=BulkCreateMessagesResponseSchema,
+    status_code=status.HTTP_200_OK,
+    description='Endpoint - add many msgs to chat by chat_oid in one request and one DB write. '
+                'Result per text in the same order: oid of the created msg or error (invalid texts are skipped)',
+    responses={
+        status.HTTP_200_OK: {'model': BulkCreateMessagesResponseSchema},
+        status.HTTP_400_BAD_REQUEST: {'model': ErrorSchema},
+    }
+)
+async def bulk_create_messages_handler(
+        chat_oid: str,
+        schema: BulkCreateMessagesRequestSchema,
+        container: Container = Depends(init_container)
+) -> BulkCreateMessagesResponseSchema:
+    mediator: Mediator = container.resolve(Mediator)
+
+    try:
+        results, *_ = await mediator.handle_command(BulkCreateMessagesCommand(
+            chat_oid=chat_oid,
+            texts=schema.texts,
+        ))
+    except ApplicationException as exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={'error': exception.message})
+
+    return BulkCreateMessagesResponseSchema.from_results(results)
+
+
 @router.get(
     '/{chat_oid}/',
     status_code=status.HTTP_200_OK,
@@ -89,7 +124,7 @@ async def create_message_handler(
 async def get_chat_with_messages_handler(
     chat_oid: str,
     container: Container = Depends(init_container),
-) -> ChatDetailSchema:
+) -> JSONBytesResponse:
     mediator: Mediator = container.resolve(Mediator)
 
     try:
@@ -97,4 +132,72 @@ async def get_chat_with_messages_handler(
     except ApplicationException as exception:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={'error': exception.message})
 
-    return ChatDetailSchema.from_entity(chat)
+    # история может быть длинной - в JSON сразу из сущностей, без ChatDetailSchema
+    return JSONBytesResponse(serialize_chat(chat))
+
+
+@router.get(
+    '/{chat_oid}/messages',
+    status_code=status.HTTP_200_OK,
+    description='История сообщений чата постранично (keyset-курсор по created_at + oid). '
+                'Без курсора - последние limit сообщений, before - страница старше, after - новее.',
+    responses={
+        status.HTTP_200_OK: {'model': GetMessagesQueryResponseSchema},
+        status.HTTP_400_BAD_REQUEST: {'model': ErrorSchema},
+    }
+)
+async def get_chat_messages_handler(
+    chat_oid: str,
+    limit: int = Query(default=20, ge=1, le=100),
+    before: str | None = None,
+    after: str | None = None,
+    container: Container = Depends(init_container),
+) -> JSONBytesResponse:
+    mediator: Mediator = container.resolve(Mediator)
+
+    try:
+        page = await mediator.handle_query(GetMessagesQuery(
+            chat_oid=chat_oid,
+            limit=limit,
+            before=before,
+            after=after,
+        ))
+    except ApplicationException as exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={'error': exception.message})
+
+    return JSONBytesResponse(serialize_messages_page(page))
+
+
+@router.get(
+    '/{chat_oid}/export',
+    status_code=status.HTTP_200_OK,
+    description='Экспорт всей истории чата потоком: format=json - объект чата как в GET /{chat_oid}/ '
+                '(массив messages отдается по частям), format=ndjson - по сообщению на строку. '
+                'История читается из хранилища пачками, целиком в памяти не собирается.',
+    responses={
+        status.HTTP_200_OK: {
+            'model': ChatDetailSchema,
+            'content': {'application/x-ndjson': {}},
+        },
+        status.HTTP_400_BAD_REQUEST: {'model': ErrorSchema},
+    }
+)
+async def export_chat_handler(
+    chat_oid: str,
+    format: Literal['json', 'ndjson'] = 'json',
+    container: Container = Depends(init_container),
+) -> StreamingResponse:
+    mediator: Mediator = container.resolve(Mediator)
+    config: Config = container.resolve(Config)
+
+    try:
+        export = await mediator.handle_query(ExportChatQuery(
+            chat_oid=chat_oid,
+            batch_size=config.chat_export_batch_size,
+        ))
+    except ApplicationException as exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail={'error': exception.message})
+
+    if format == 'ndjson':
+        return StreamingResponse(stream_messages_ndjson(export.batches), media_type='application/x-ndjson')
+    return StreamingResponse(stream_chat_json(export.chat, export.batches), media_type='application/json')
@@ -1,6 +1,13 @@
-from pydantic import BaseModel
+from datetime import datetime
+
+from pydantic import BaseModel, Field
 
 from domain.entities.messages import Chat, Message
+from logic.commands.messages import BulkCreateMessageResult
+from logic.queries.messages import MessagesPage
+
+# сколько сообщений принимает один запрос пачкой
+BULK_MESSAGES_MAX_ITEMS = 1000
 
 
 class CreateChatRequestSchema(BaseModel):
@@ -42,3 +49,83 @@ class CreateMessageResponseSchema(BaseModel):
             oid=message.oid,
             text=message.text.as_generic_type(),
         )
+
+
+class BulkCreateMessagesRequestSchema(BaseModel):
+    texts: list[str] = Field(min_length=1, max_length=BULK_MESSAGES_MAX_ITEMS)
+
+
+class BulkCreateMessageItemSchema(BaseModel):
+    """
+    Результат по одному тексту: oid созданного сообщения или error (в порядке texts запроса)
+    """
+    text: str
+    oid: str | None = None
+    error: str | None = None
+
+    @classmethod
+    def from_result(cls, result: BulkCreateMessageResult) -> 'BulkCreateMessageItemSchema':
+        return BulkCreateMessageItemSchema(
+            text=result.text,
+            oid=result.message.oid if result.message else None,
+            error=result.error,
+        )
+
+
+class BulkCreateMessagesResponseSchema(BaseModel):
+    items: list[BulkCreateMessageItemSchema]
+
+    @classmethod
+    def from_results(cls, results: list[BulkCreateMessageResult]) -> 'BulkCreateMessagesResponseSchema':
+        return BulkCreateMessagesResponseSchema(
+            items=[BulkCreateMessageItemSchema.from_result(result) for result in results],
+        )
+
+
+class MessageDetailSchema(BaseModel):
+    oid: str
+    text: str
+    created_at: datetime
+
+    @classmethod
+    def from_entity(cls, message: Message) -> 'MessageDetailSchema':
+        return MessageDetailSchema(
+            oid=message.oid,
+            text=message.text.as_generic_type(),
+            created_at=message.created_at,
+        )
+
+
+class ChatDetailSchema(BaseModel):
+    oid: str
+    title: str
+    created_at: datetime
+    messages: list[MessageDetailSchema]
+
+    @classmethod
+    def from_entity(cls, chat: Chat) -> 'ChatDetailSchema':
+        return ChatDetailSchema(
+            oid=chat.oid,
+            title=chat.title.as_generic_type(),
+            created_at=chat.created_at,
+            messages=[MessageDetailSchema.from_entity(message) for message in chat.messages],
+        )
+
+
+class GetMessagesQueryResponseSchema(BaseModel):
+    """
+    before/after - непрозрачные курсоры для соседних страниц (None - дальше сообщений нет)
+    """
+    items: list[MessageDetailSchema]
+    limit: int
+    before: str | None = None
+    after: str | None = None
+
+    @classmethod
+    def from_page(cls, page: MessagesPage) -> 'GetMessagesQueryResponseSchema':
+        return GetMessagesQueryResponseSchema(
+            items=[MessageDetailSchema.from_entity(message) for message in page.items],
+            limit=page.limit,
+            before=page.before.encode() if page.before else None,
+            after=page.after.encode() if page.after else None,
+        )
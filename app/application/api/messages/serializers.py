@@ -0,0 +1,74 @@
+from typing import AsyncIterator
+
+from pydantic_core import to_json
+from starlette.responses import Response
+
+from domain.entities.messages import Chat, Message
+from logic.queries.messages import MessagesPage
+
+
+class JSONBytesResponse(Response):
+    """
+    Ответ из уже готовых JSON-байт: FastAPI не валидирует и не перекодирует его через response_model.
+    """
+    media_type = 'application/json'
+
+
+# Сериализаторы ниже отдают тот же JSON, что и схемы из schema.py (MessageDetailSchema, ChatDetailSchema,
+# GetMessagesQueryResponseSchema) - порядок и имена полей совпадают, - но без промежуточных pydantic-объектов:
+# сущность -> dict -> байты одним вызовом pydantic_core.to_json. Схемы остаются для документации (responses=...).
+
+def _message_to_dict(message: Message) -> dict:
+    return {
+        'oid': message.oid,
+        'text': message.text.value,
+        'created_at': message.created_at,
+    }
+
+
+def serialize_chat(chat: Chat) -> bytes:
+    return to_json({
+        'oid': chat.oid,
+        'title': chat.title.value,
+        'created_at': chat.created_at,
+        'messages': [_message_to_dict(message) for message in chat.messages],
+    })
+
+
+def serialize_messages_page(page: MessagesPage) -> bytes:
+    return to_json({
+        'items': [_message_to_dict(message) for message in page.items],
+        'limit': page.limit,
+        'before': page.before.encode() if page.before else None,
+        'after': page.after.encode() if page.after else None,
+    })
+
+
+async def stream_messages_ndjson(batches: AsyncIterator[list[Message]]) -> AsyncIterator[bytes]:
+    """
+    NDJSON: по сообщению на строку, один кусок ответа на пачку
+    """
+    async for batch in batches:
+        yield b''.join([to_json(_message_to_dict(message)) + b'\n' for message in batch])
+
+
+async def stream_chat_json(chat: Chat, batches: AsyncIterator[list[Message]]) -> AsyncIterator[bytes]:
+    """
+    Тот же JSON, что и serialize_chat, но массив messages дописывается по пачкам
+    """
+    # заголовок чата с пустым массивом: '{..."messages":[]}' - отдаем до '[' включительно
+    yield to_json({
+        'oid': chat.oid,
+        'title': chat.title.value,
+        'created_at': chat.created_at,
+        'messages': [],
+    })[:-2]
+
+    separator = b''
+    async for batch in batches:
+        if not batch:
+            continue
+        yield separator + to_json([_message_to_dict(message) for message in batch])[1:-1]
+        separator = b','
+
+    yield b']}'
@@ -0,0 +1,50 @@
+from fastapi import Depends, WebSocket, WebSocketDisconnect, status
+from fastapi.routing import APIRouter
+from punq import Container
+
+from domain.exceptions.base import ApplicationException
+from infra.websockets.backplanes import BaseWebSocketsBackplane
+from infra.websockets.managers import BaseConnectionManager
+from logic.init import init_container
+from logic.mediator import Mediator
+from logic.queries.messages import GetChatMetadataQuery
+
+router = APIRouter(
+    tags=['Chat'],
+)
+
+
+@router.websocket('/{chat_oid}/ws')
+async def websocket_chat_handler(
+        chat_oid: str,
+        websocket: WebSocket,
+        container: Container = Depends(init_container),
+) -> None:
+    """
+    Подписка на новые сообщения чата: сервер присылает каждое сообщение JSON-ом {oid, text, chat_oid}.
+    Клиенту писать в сокет не нужно - входящие сообщения игнорируются.
+    """
+    mediator: Mediator = container.resolve(Mediator)
+    connection_manager: BaseConnectionManager = container.resolve(BaseConnectionManager)
+    backplane: BaseWebSocketsBackplane = container.resolve(BaseWebSocketsBackplane)
+
+    await websocket.accept()
+    try:
+        await mediator.handle_query(GetChatMetadataQuery(chat_oid=chat_oid))
+    except ApplicationException as exception:
+        await websocket.send_json({'error': exception.message})
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await connection_manager.accept_connection(websocket=websocket, key=chat_oid)
+    # сообщения чата приходят на узел, только пока у него есть хотя бы один слушатель этого чата
+    await backplane.subscribe(chat_oid)
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await connection_manager.remove_connection(websocket=websocket, key=chat_oid)
+        if not connection_manager.has_connections(chat_oid):
+            await backplane.unsubscribe(chat_oid)
@@ -0,0 +1,19 @@
+from fastapi import Depends, Response
+from fastapi.routing import APIRouter
+from prometheus_client import CONTENT_TYPE_LATEST
+from punq import Container
+
+from infra.metrics.prometheus import PrometheusMetrics
+from logic.init import init_container
+
+router = APIRouter(tags=['Metrics'])
+
+
+@router.get(
+    '/metrics',
+    description='Метрики процесса в текстовом формате prometheus',
+    include_in_schema=False,
+)
+async def metrics_handler(container: Container = Depends(init_container)) -> Response:
+    metrics: PrometheusMetrics = container.resolve(PrometheusMetrics)
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,41 @@
+import asyncio
+import logging
+import signal
+
+from punq import Container
+
+from infra.message_brokers.base import BaseMessageBroker, BaseMessageConsumer
+from logic.consumers import EventsConsumer
+from logic.init import init_container
+
+
+async def run_consumer(container: Container) -> None:
+    """
+    Отдельный от API процесс: читает события из брокера и раздает их обработчикам медиатора консьюмера
+    (рассылка новых сообщений в бэкплейн веб-сокетов - через продюсер брокера).
+    SIGTERM/SIGINT - мягкая остановка: дорабатываем очереди воркеров, коммитим офсеты и выходим.
+    """
+    message_broker: BaseMessageBroker = container.resolve(BaseMessageBroker)
+    message_consumer: BaseMessageConsumer = container.resolve(BaseMessageConsumer)
+    events_consumer: EventsConsumer = container.resolve(EventsConsumer)
+
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signal_number, events_consumer.stop)
+
+    await message_broker.start()
+    await message_consumer.start()
+    try:
+        await events_consumer.run()
+    finally:
+        await message_consumer.close()
+        await message_broker.close()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_consumer(init_container()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Бенчмарки: micro - объекты-значения, конвертеры, медиатор; load - API в процессе через httpx (чат из 1 и 10k сообщений).
+Результаты (p50/p99, ops/sec) сравниваются с базовой линией из benchmarks/baselines/<suite>.json.
+
+Запуск из app/: python -m benchmarks [micro|load|all] [--save-baseline] [--check]
+"""
+import argparse
+import asyncio
+import sys
+
+from benchmarks.load import run_load_benchmarks
+from benchmarks.micro import run_micro_benchmarks
+from benchmarks.runner import find_regressions, format_report, load_baseline, save_baseline
+
+SUITES = {
+    'micro': lambda scale: run_micro_benchmarks(iterations=int(10_000 * scale)),
+    'load': lambda scale: run_load_benchmarks(iterations=int(1000 * scale)),
+}
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('suite', choices=[*SUITES, 'all'], nargs='?', default='all')
+    parser.add_argument('--scale', type=float, default=1.0, help='множитель числа итераций')
+    parser.add_argument('--save-baseline', action='store_true', help='записать результаты как новую базовую линию')
+    parser.add_argument('--check', action='store_true', help='код выхода 1, если есть регрессии')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='допустимое ухудшение относительно базовой линии')
+    args = parser.parse_args()
+
+    regressions = []
+    for suite in SUITES if args.suite == 'all' else [args.suite]:
+        results = await SUITES[suite](args.scale)
+        baseline = load_baseline(suite)
+        print(f'\n[{suite}]')
+        print(format_report(results, baseline))
+
+        if args.save_baseline:
+            print(f'baseline saved to {save_baseline(suite, results)}')
+        else:
+            regressions.extend(find_regressions(results, baseline, tolerance=args.tolerance))
+
+    for regression in regressions:
+        print(f'REGRESSION {regression}')
+
+    return 1 if args.check and regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,88 @@
+from itertools import count
+
+import httpx
+
+from application.api.main import create_app
+from application.api.messages.schema import BULK_MESSAGES_MAX_ITEMS
+from benchmarks.runner import BenchmarkResult, run_async_benchmark
+from logic.init import init_container, init_memory_container
+
+# профили нагрузки: сколько сообщений в истории чата перед замерами
+SCENARIOS = {
+    'small_chat': 1,
+    'large_chat': 10_000,
+}
+
+
+async def seed_chat(client: httpx.AsyncClient, messages: int) -> str:
+    response = await client.post('/chat/', json={'title': f'benchmark chat with {messages} messages'})
+    response.raise_for_status()
+    chat_oid = response.json()['oid']
+
+    for start in range(0, messages, BULK_MESSAGES_MAX_ITEMS):
+        texts = [f'message {number}' for number in range(start, min(start + BULK_MESSAGES_MAX_ITEMS, messages))]
+        (await client.post(f'/chat/{chat_oid}/messages/bulk', json={'texts': texts})).raise_for_status()
+
+    return chat_oid
+
+
+async def run_scenario(name: str, messages: int, iterations: int, concurrency: int) -> list[BenchmarkResult]:
+    """
+    Приложение целиком (роутинг, зависимости, медиатор, сериализация) в том же процессе через ASGI-транспорт httpx,
+    хранилища - в памяти. Тяжелые запросы (вся история) повторяются реже.
+    """
+    app = create_app()
+    container = init_memory_container()
+    app.dependency_overrides[init_container] = lambda: container
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://benchmark') as client:
+        chat_oid = await seed_chat(client, messages)
+        # страница из середины истории - мимо буфера последних сообщений
+        middle = await client.get(f'/chat/{chat_oid}/messages', params={'limit': 100})
+        before = middle.json()['before']
+        texts = (f'load message {number}' for number in count())
+
+        async def get(url: str, **params) -> None:
+            (await client.get(url, params=params)).raise_for_status()
+
+        async def create_message() -> None:
+            response = await client.post(f'/chat/{chat_oid}/messages', json={'text': next(texts)})
+            response.raise_for_status()
+
+        heavy_iterations = max(iterations // max(messages // 100, 1), 10)
+        return [
+            await run_async_benchmark(
+                f'{name}/get_latest_messages',
+                lambda: get(f'/chat/{chat_oid}/messages', limit=20),
+                iterations, concurrency=concurrency,
+            ),
+            await run_async_benchmark(
+                f'{name}/get_messages_before_cursor',
+                lambda: get(f'/chat/{chat_oid}/messages', limit=20, **({'before': before} if before else {})),
+                iterations, concurrency=concurrency,
+            ),
+            await run_async_benchmark(
+                f'{name}/get_chat_with_messages',
+                lambda: get(f'/chat/{chat_oid}/'),
+                heavy_iterations, concurrency=concurrency,
+            ),
+            await run_async_benchmark(
+                f'{name}/export_ndjson',
+                lambda: get(f'/chat/{chat_oid}/export', format='ndjson'),
+                heavy_iterations, concurrency=concurrency,
+            ),
+            await run_async_benchmark(
+                f'{name}/create_message',
+                create_message,
+                iterations, concurrency=concurrency,
+            ),
+        ]
+
+
+async def run_load_benchmarks(iterations: int = 1000, concurrency: int = 10) -> list[BenchmarkResult]:
+    results = []
+    for name, messages in SCENARIOS.items():
+        results.extend(await run_scenario(name, messages, iterations=iterations, concurrency=concurrency))
+
+    return results
@@ -0,0 +1,75 @@
+"""
+Сколько памяти занимают загруженные сообщения: байт на один Message (с Text и datetime внутри).
+Рядом меряется базовая линия - те же сущности без slots и со списком событий на каждую (как до перехода на
+slots=True), так что экономию можно проверить одним запуском.
+
+Запуск из app/: python -m benchmarks.memory [--count 50000]
+"""
+import argparse
+import gc
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from domain.entities.messages import Chat, Message
+from domain.values.messages import Text, Title
+
+
+@dataclass(eq=False)
+class BaselineMessage:
+    """
+    Message до slots=True: поля в __dict__ экземпляра, пустой список _events заводится на каждое сообщение.
+    """
+    text: 'BaselineText'
+    oid: str = field(kw_only=True)
+    created_at: datetime = field(kw_only=True)
+    _events: list = field(default_factory=list, kw_only=True)
+
+
+@dataclass(frozen=True)
+class BaselineText:
+    value: str
+
+
+def measure_messages(count: int, message_type: type = Message, text_type: type = Text) -> int:
+    """
+    Возвращает, сколько байт в среднем выделяется на одно сообщение чата из count сообщений
+    (так же, как их собирает репозиторий при чтении истории).
+    """
+    # строки и время готовим заранее - в реальном чтении они приходят из драйвера и меряются не здесь
+    texts = [f'message text {number}' for number in range(count)]
+    oids = [f'{number:036d}' for number in range(count)]
+    started_at = datetime(2024, 1, 1)
+    created_at = [started_at + timedelta(milliseconds=number) for number in range(count)]
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        messages = [
+            message_type(oid=oids[number], created_at=created_at[number], text=text_type(texts[number]))
+            for number in range(count)
+        ]
+        chat = Chat(title=Title('benchmark'), messages=messages)
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert len(chat.messages) == count
+    return (after - before) // count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=50_000)
+    args = parser.parse_args()
+
+    baseline = measure_messages(args.count, message_type=BaselineMessage, text_type=BaselineText)
+    current = measure_messages(args.count)
+    print(f'{args.count} messages:')
+    print(f'  baseline (no slots): {baseline} bytes per Message')
+    print(f'  Message:             {current} bytes per Message ({1 - current / baseline:.0%} less)')
+
+
+if __name__ == '__main__':
+    main()
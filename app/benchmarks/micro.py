@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+from itertools import count
+
+from benchmarks.runner import BenchmarkResult, run_async_benchmark, run_benchmark
+from domain.entities.messages import Chat, Message
+from domain.values.messages import Text, Title
+from infra.metrics.prometheus import PrometheusMetrics
+from infra.repositories.messages.codecs import decode_message, decode_messages, encode_message
+from infra.repositories.messages.converters import convert_chat_entity_to_document
+from logic.commands.messages import CreateChatCommand, CreateMessageCommand
+from logic.init import init_memory_container
+from logic.mediator import Mediator
+
+
+def make_messages(amount: int) -> list[Message]:
+    started_at = datetime(2024, 1, 1)
+    return [
+        Message(text=Text(f'message {number}'), created_at=started_at + timedelta(milliseconds=number))
+        for number in range(amount)
+    ]
+
+
+def run_values_benchmarks(iterations: int) -> list[BenchmarkResult]:
+    title = 't' * 255
+    return [
+        run_benchmark('values/text_validate', lambda: Text('hello world'), iterations),
+        run_benchmark('values/title_validate', lambda: Title(title), iterations),
+        run_benchmark('values/text_from_trusted', lambda: Text.from_trusted('hello world'), iterations),
+    ]
+
+
+def run_converters_benchmarks(iterations: int) -> list[BenchmarkResult]:
+    message = make_messages(1)[0]
+    document = encode_message(message)
+    documents = [encode_message(message) for message in make_messages(1000)]
+    chat = Chat(title=Title('benchmark'), messages=make_messages(1000))
+
+    return [
+        run_benchmark('converters/encode_message', lambda: encode_message(message), iterations),
+        run_benchmark('converters/decode_message', lambda: decode_message(document), iterations),
+        run_benchmark('converters/decode_1k_messages', lambda: decode_messages(documents), max(iterations // 1000, 10)),
+        run_benchmark(
+            'converters/chat_1k_messages_to_document',
+            lambda: convert_chat_entity_to_document(chat),
+            max(iterations // 1000, 10),
+        ),
+    ]
+
+
+def run_metrics_benchmarks(iterations: int) -> list[BenchmarkResult]:
+    metrics = PrometheusMetrics()
+
+    def time_command() -> None:
+        # цена замера одного вызова медиатора - сверх самой команды
+        with metrics.time_command(CreateChatCommand):
+            pass
+
+    return [run_benchmark('metrics/time_command', time_command, iterations)]
+
+
+async def run_mediator_benchmarks(iterations: int) -> list[BenchmarkResult]:
+    mediator: Mediator = init_memory_container().resolve(Mediator)
+    titles = (f'benchmark chat {number}' for number in count())
+    chat, *_ = await mediator.handle_command(CreateChatCommand(title=next(titles)))
+
+    return [
+        await run_async_benchmark(
+            'mediator/create_chat',
+            lambda: mediator.handle_command(CreateChatCommand(title=next(titles))),
+            iterations,
+        ),
+        await run_async_benchmark(
+            'mediator/create_message',
+            lambda: mediator.handle_command(CreateMessageCommand(chat_oid=chat.oid, text='hello world')),
+            iterations,
+        ),
+    ]
+
+
+async def run_micro_benchmarks(iterations: int = 10_000) -> list[BenchmarkResult]:
+    return [
+        *run_values_benchmarks(iterations),
+        *run_converters_benchmarks(iterations),
+        *run_metrics_benchmarks(iterations),
+        *await run_mediator_benchmarks(iterations // 10),
+    ]
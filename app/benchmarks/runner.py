@@ -0,0 +1,137 @@
+import asyncio
+import json
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+BASELINES_DIR = Path(__file__).parent / 'baselines'
+
+
+@dataclass(frozen=True)
+class BenchmarkResult:
+    """
+    Итог одного бенчмарка: задержка одной операции (p50/p99, мс) и пропускная способность (операций в секунду).
+    """
+    name: str
+    iterations: int
+    p50_ms: float
+    p99_ms: float
+    ops_per_sec: float
+
+    @classmethod
+    def from_latencies(cls, name: str, latencies: list[float], elapsed: float) -> 'BenchmarkResult':
+        latencies = sorted(latencies)
+        return cls(
+            name=name,
+            iterations=len(latencies),
+            p50_ms=round(percentile(latencies, 50) * 1000, 6),
+            p99_ms=round(percentile(latencies, 99) * 1000, 6),
+            ops_per_sec=round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        )
+
+
+def percentile(sorted_samples: list[float], percent: float) -> float:
+    """
+    Перцентиль по методу ближайшего ранга - выборка должна быть отсортирована.
+    """
+    if not sorted_samples:
+        return 0.0
+    rank = max(int(len(sorted_samples) * percent / 100 + 0.5), 1)
+    return sorted_samples[min(rank, len(sorted_samples)) - 1]
+
+
+def run_benchmark(name: str, operation: Callable[[], Any], iterations: int, warmup: int = 100) -> BenchmarkResult:
+    for _ in range(warmup):
+        operation()
+
+    latencies = []
+    clock = time.perf_counter
+    started = clock()
+    for _ in range(iterations):
+        operation_started = clock()
+        operation()
+        latencies.append(clock() - operation_started)
+
+    return BenchmarkResult.from_latencies(name, latencies, elapsed=clock() - started)
+
+
+async def run_async_benchmark(
+        name: str,
+        operation: Callable[[], Awaitable[Any]],
+        iterations: int,
+        warmup: int = 10,
+        concurrency: int = 1,
+) -> BenchmarkResult:
+    """
+    concurrency > 1 - столько одновременных "клиентов" делят iterations между собой;
+    задержка меряется на каждую операцию, ops/sec - по общему времени.
+    """
+    for _ in range(warmup):
+        await operation()
+
+    latencies = []
+    clock = time.perf_counter
+
+    async def client(count: int) -> None:
+        for _ in range(count):
+            operation_started = clock()
+            await operation()
+            latencies.append(clock() - operation_started)
+
+    shares = [iterations // concurrency + (1 if index < iterations % concurrency else 0) for index in range(concurrency)]
+    started = clock()
+    await asyncio.gather(*(client(share) for share in shares))
+
+    return BenchmarkResult.from_latencies(name, latencies, elapsed=clock() - started)
+
+
+def load_baseline(suite: str) -> dict[str, BenchmarkResult]:
+    path = BASELINES_DIR / f'{suite}.json'
+    if not path.exists():
+        return {}
+
+    return {name: BenchmarkResult(**result) for name, result in json.loads(path.read_text()).items()}
+
+
+def save_baseline(suite: str, results: list[BenchmarkResult]) -> Path:
+    path = BASELINES_DIR / f'{suite}.json'
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({result.name: asdict(result) for result in results}, indent=2) + '\n')
+    return path
+
+
+def find_regressions(
+        results: list[BenchmarkResult],
+        baseline: dict[str, BenchmarkResult],
+        tolerance: float,
+) -> list[str]:
+    """
+    Регрессия - p99 вырос или ops/sec упал больше чем на tolerance (доля) относительно базовой линии.
+    """
+    regressions = []
+    for result in results:
+        base = baseline.get(result.name)
+        if base is None:
+            continue
+        if base.p99_ms and result.p99_ms > base.p99_ms * (1 + tolerance):
+            regressions.append(f'{result.name}: p99 {base.p99_ms}ms -> {result.p99_ms}ms')
+        if base.ops_per_sec and result.ops_per_sec < base.ops_per_sec * (1 - tolerance):
+            regressions.append(f'{result.name}: ops/sec {base.ops_per_sec} -> {result.ops_per_sec}')
+
+    return regressions
+
+
+def format_report(results: list[BenchmarkResult], baseline: dict[str, BenchmarkResult]) -> str:
+    lines = [f'{"benchmark":<44} {"p50 ms":>10} {"p99 ms":>10} {"ops/sec":>12} {"vs baseline":>12}']
+    for result in results:
+        base = baseline.get(result.name)
+        delta = (
+            f'{(result.ops_per_sec / base.ops_per_sec - 1) * 100:+.1f}%'
+            if base and base.ops_per_sec else '-'
+        )
+        lines.append(
+            f'{result.name:<44} {result.p50_ms:>10.4g} {result.p99_ms:>10.4g} {result.ops_per_sec:>12.1f} {delta:>12}'
+        )
+
+    return '\n'.join(lines)
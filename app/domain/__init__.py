@@ -1,3 +0,0 @@
-version 1
-version 3
-version 4
\ No newline at end of file
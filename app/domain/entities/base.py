@@ -1,5 +1,4 @@
 from abc import ABC
-from copy import copy
 from dataclasses import dataclass, field
 from datetime import datetime
 from uuid import uuid4
@@ -7,7 +6,11 @@ from uuid import uuid4
 from domain.events.base import BaseEvent
 
 
-@dataclass(eq=False)  # eq=False предотвращает автоматическую генерацию метода __eq__
+# eq=False предотвращает автоматическую генерацию метода __eq__.
+# slots=True - у экземпляров нет __dict__, поля лежат в слотах: загруженная история чата - это десятки тысяч
+# сущностей, и словарь на каждую заметно увеличивает память. Наследники тоже объявляются с slots=True,
+# иначе у них снова появится __dict__.
+@dataclass(eq=False, slots=True)
 class BaseEntity(ABC):
     oid: str = field(
         default_factory=lambda: str(uuid4()),  # Генерация уникального идентификатора для объекта
@@ -20,18 +23,23 @@ class BaseEntity(ABC):
         kw_only=True
     )
 
-    _events: list[BaseEvent] = field(
-        default_factory=list,
-        kw_only=True
+    # список событий заводится при первом register_event: у большинства сущностей (сообщения,
+    # прочитанные из хранилища) событий нет, и пустой список на каждую - лишняя аллокация
+    _events: list[BaseEvent] | None = field(
+        default=None,
+        kw_only=True,
+        repr=False,
     )
 
     def register_event(self, event: BaseEvent) -> None:
+        if self._events is None:
+            self._events = []
         self._events.append(event)
 
-    def pull_events(self):
-        registered_events = copy(self._events)  # будем копираовать все ивенты, которые здесь происходили, что б потом их обнулить
+    def pull_events(self) -> list[BaseEvent]:
+        registered_events = self._events or []  # забираем все ивенты, которые здесь происходили, и обнуляем их
 
-        self._events.clear()
+        self._events = None
 
         return registered_events
 
@@ -1,12 +1,13 @@
+from collections.abc import Callable, Iterable, MutableSequence
 from dataclasses import dataclass, field
 
 from domain.entities.base import BaseEntity
-from domain.events.messages import NewMessageReceivedEvent
+from domain.events.messages import NewChatCreatedEvent, NewMessageReceivedEvent
+from domain.exceptions.messages import ChatMessagesNotLoadedException
 from domain.values.messages import Text, Title
-from logic.events.messages import NewChatCreatedEvent
 
 
-@dataclass
+@dataclass(slots=True)
 class Message(BaseEntity):
     text: Text
 
@@ -18,7 +19,7 @@ class Message(BaseEntity):
 # message_wrong = Message("some-uuid", Text("Hello world")) # TypeError: __init__() takes 1 positional argument but 2 were given
 # message_correct_2 = Message(text=Text("Hello world"), oid="some-uuid")  # Теперь все корректно.
 
-@dataclass
+@dataclass(slots=True)
 class Chat(BaseEntity):
     title: Title
     messages: list[Message] = field(
@@ -47,10 +48,82 @@ class Chat(BaseEntity):
     # Например, каждый ключ может быть уникальным идентификатором сообщения (например, oid), а значение — объектом Message.
     # Это позволяет эффективно организовать доступ к сообщениям по ключу, обеспечивая быструю навигацию.
 
-@dataclass
+class LazyMessages(MutableSequence[Message]):
+    """
+    Сообщения чата, которые материализуются только при первом чтении.
+
+    - loader вызывается один раз - когда кто-то реально читает сообщения (итерация, len, индекс, in ...);
+    - append не загружает историю: новое сообщение откладывается в pending и приклеивается в конец
+      после загрузки. Поэтому Chat.add_message на пути записи стоит O(1), а не O(длина истории);
+    - loader=None - у чата загружены только метаданные (get_chat_metadata_by_oid), историю такой
+      чат не знает и при чтении кидает ChatMessagesNotLoadedException, а не делает вид, что она пустая.
+    """
+    __slots__ = ('_chat_oid', '_loader', '_items', '_pending')
+
+    def __init__(self, loader: Callable[[], Iterable[Message]] | None = None, chat_oid: str | None = None):
+        self._chat_oid = chat_oid
+        self._loader = loader
+        self._items: list[Message] | None = None
+        self._pending: list[Message] = []
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._items is not None
+
+    def _load(self) -> list[Message]:
+        if self._items is None:
+            if self._loader is None:
+                raise ChatMessagesNotLoadedException(chat_oid=self._chat_oid)
+
+            self._items = list(self._loader())
+            self._items.extend(self._pending)
+            self._loader, self._pending = None, []
+
+        return self._items
+
+    def append(self, message: Message) -> None:
+        if self._items is None:
+            self._pending.append(message)
+        else:
+            self._items.append(message)
+
+    def __getitem__(self, index):
+        return self._load()[index]
+
+    def __setitem__(self, index, message) -> None:
+        self._load()[index] = message
+
+    def __delitem__(self, index) -> None:
+        del self._load()[index]
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __contains__(self, message) -> bool:
+        return message in self._load()
+
+    def insert(self, index: int, message: Message) -> None:
+        self._load().insert(index, message)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (LazyMessages, list)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        if self._items is None:
+            return f'LazyMessages(<not loaded>, pending={len(self._pending)})'
+        return f'LazyMessages({self._items!r})'
+
+
+@dataclass(slots=True)
 class Chat(BaseEntity):
     title: Title
-    messages: list[Message] = field(
+    # list - когда чат собран в памяти целиком, LazyMessages - когда его поднял репозиторий
+    messages: MutableSequence[Message] = field(
         default_factory=list,
         kw_only=True,
     )
@@ -61,6 +134,7 @@ class Chat(BaseEntity):
                 message_text=message.text.as_generic_type(),
                 chat_oid=self.oid,
                 message_oid=message.oid,
+                message_created_at=message.created_at,
             )
         )  # передаем event обьект (NewMessageReceivedEvent)
 
@@ -1,5 +1,6 @@
 from abc import ABC
 from dataclasses import dataclass, field
+from datetime import datetime
 from uuid import uuid4, UUID
 
 
@@ -8,8 +9,10 @@ from uuid import uuid4, UUID
 class BaseEvent:
     """
     BaseEvent — это абстрактный базовый класс для всех событий.
-    Каждое событие должно иметь уникальный идентификатор event_id (UUID).
+    Каждое событие должно иметь уникальный идентификатор event_id (UUID)
+    и время occurred_at, когда оно произошло (по нему считается задержка публикации).
     """
     event_id: UUID = field(default_factory=uuid4, kw_only=True)
+    occurred_at: datetime = field(default_factory=datetime.now, kw_only=True)
 
 
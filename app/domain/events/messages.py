@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from datetime import datetime
 
 from domain.events.base import BaseEvent
 
@@ -8,3 +9,11 @@ class NewMessageReceivedEvent(BaseEvent):
     message_text: str
     message_oid: str
     chat_oid: str
+    # None - у событий, сохраненных до появления поля (в outbox/брокере)
+    message_created_at: datetime | None = None
+
+
+@dataclass(frozen=True)
+class NewChatCreatedEvent(BaseEvent):
+    chat_oid: str
+    chat_title: str
@@ -18,3 +18,12 @@ class EmptyTextxException(ApplicationException):
     @property
     def message(self):
         return f"There's no any text"
+
+
+@dataclass(eq=False)
+class ChatMessagesNotLoadedException(ApplicationException):
+    chat_oid: str | None
+
+    @property
+    def message(self):
+        return f"Messages of chat {self.chat_oid} were not loaded (metadata only)"
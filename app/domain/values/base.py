@@ -1,17 +1,22 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Any, Generic, TypeVar
+from typing import Any, Generic, Self, TypeVar
 
 # TypeVar используется для указания обобщенного типа (Generic). VT (Value Type) - это тип данных,
 # с которым будет работать данный класс. 'bound=Any' означает, что VT может быть любым типом.
 VT = TypeVar('VT', bound=Any)
 
+# frozen-датакласс запрещает обычное присваивание, поэтому from_trusted пишет поле напрямую через object
+_new_object = object.__new__
+_set_attribute = object.__setattr__
+
 
 # @dataclass автоматизирует создание стандартных методов для класса (например, __init__, __repr__, __eq__).
 # frozen=True делает объект неизменяемым (immutable), что часто используется для Value Objects,
 # так как это помогает избежать изменения значения после создания объекта. Если убрать frozen=True,
 # то объекты этого класса можно будет изменять после создания.
-@dataclass(frozen=True)
+# slots=True - без __dict__ на каждый объект-значение (их столько же, сколько сообщений в памяти)
+@dataclass(frozen=True, slots=True)
 class BaseValueObject(ABC, Generic[VT]):
     """
     Generic[VT] - обьект знаачение
@@ -27,6 +32,16 @@ class BaseValueObject(ABC, Generic[VT]):
     def __post_init__(self):
         return self.validate()
 
+    @classmethod
+    def from_trusted(cls, value: VT) -> Self:
+        """
+        Собирает объект-значение из уже проверенных данных (прочитанных из нашего хранилища или
+        из наших же событий) без __init__ и validate(). Данные от пользователя - только через конструктор.
+        """
+        value_object = _new_object(cls)
+        _set_attribute(value_object, 'value', value)
+        return value_object
+
     # abstractmethod указывает, что этот метод должен быть реализован в классах-наследниках.
     # Это обязывает разработчика реализовать логику валидации для конкретного объекта значения.
     @abstractmethod
@@ -4,7 +4,7 @@ from domain.exceptions.messages import TitleToolLongException, EmptyTextxExcepti
 from domain.values.base import BaseValueObject
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Text(BaseValueObject):
     value: str
 
@@ -16,7 +16,7 @@ class Text(BaseValueObject):
         return str(self.value)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Title(BaseValueObject):
     value: str
 
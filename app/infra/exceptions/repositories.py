@@ -0,0 +1,12 @@
+from dataclasses import dataclass
+
+from infra.exceptions.base import InfraException
+
+
+@dataclass(eq=False)
+class QueriesNotCoveredByIndexException(InfraException):
+    queries: list[str]
+
+    @property
+    def message(self):
+        return f"Queries are not covered by any index (COLLSCAN): {', '.join(self.queries)}"
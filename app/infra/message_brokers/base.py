@@ -0,0 +1,88 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Iterable
+
+
+@dataclass(frozen=True)
+class BrokerMessage:
+    topic: str
+    partition: int
+    offset: int
+    key: bytes | None
+    value: bytes
+
+
+@dataclass
+class BaseMessageBroker(ABC):
+    """
+    Брокер сообщений (Kafka или memory-заглушка с тем же интерфейсом).
+    key - ключ партиционирования: сообщения с одним ключом попадают в одну партицию и сохраняют порядок.
+    """
+
+    @abstractmethod
+    async def start(self) -> None:
+        pass
+
+    @abstractmethod
+    async def close(self) -> None:
+        pass
+
+    @abstractmethod
+    async def send_message(self, topic: str, value: bytes, key: bytes | None = None) -> None:
+        """
+        Возвращается после подтверждения брокером. Одновременные вызовы собираются в пачки
+        (linger/размер пачки), поэтому выгоднее отправлять конкурентно, а не по одному.
+        """
+        pass
+
+
+@dataclass
+class BaseMessageConsumer(ABC):
+    """
+    Читатель топиков в составе группы консьюмеров. Офсеты коммитятся вручную (commit) - только после обработки.
+    Партиция задается парой (topic, partition).
+    """
+
+    @abstractmethod
+    async def start(self) -> None:
+        pass
+
+    @abstractmethod
+    async def close(self) -> None:
+        pass
+
+    @abstractmethod
+    async def get_many(self, max_records: int, timeout: float) -> list[BrokerMessage]:
+        """
+        Пачка сообщений со всех не приостановленных партиций (не больше max_records).
+        Если сообщений нет - ждет до timeout секунд и возвращает пустой список.
+        """
+        pass
+
+    @abstractmethod
+    async def commit(self, offsets: dict[tuple[str, int], int]) -> None:
+        """
+        offsets - офсет следующего непрочитанного сообщения по каждой партиции (как в kafka: последний обработанный + 1).
+        """
+        pass
+
+    @abstractmethod
+    def pause(self, partitions: Iterable[tuple[str, int]]) -> None:
+        pass
+
+    @abstractmethod
+    def resume(self, partitions: Iterable[tuple[str, int]]) -> None:
+        pass
+
+
+@dataclass
+class BaseMessageConsumerFactory(ABC):
+    """
+    Все консьюмеры процесса (группа консьюмеров событий, слушатель событий процесса API, узел бэкплейна)
+    создаются через фабрику: контейнер собирает их одинаково, а тестам и бенчмаркам достаточно подменить ее.
+    group_id=None - консьюмер вне группы: процесс читает весь поток сам, начиная с новых сообщений.
+    """
+
+    @abstractmethod
+    def create_consumer(self, topics: tuple[str, ...], group_id: str | None = None) -> BaseMessageConsumer:
+        pass
@@ -0,0 +1,35 @@
+import json
+from dataclasses import fields
+from datetime import datetime
+
+from domain.events.base import BaseEvent
+from infra.repositories.outbox.converters import OUTBOX_EVENT_TYPES, convert_event_to_document, \
+    convert_document_to_event
+
+
+def _datetime_fields(event_type: type[BaseEvent]) -> tuple[str, ...]:
+    return tuple(event_field.name for event_field in fields(event_type) if 'datetime' in str(event_field.type))
+
+
+# в JSON даты уходят ISO-строкой - по типу поля события понимаем, какие строки поднять обратно в datetime
+EVENT_DATETIME_FIELDS: dict[str, tuple[str, ...]] = {
+    event_type_name: _datetime_fields(event_type) for event_type_name, event_type in OUTBOX_EVENT_TYPES.items()
+}
+
+
+def convert_event_to_broker_message(event: BaseEvent) -> bytes:
+    # тот же формат, что и в outbox: event_id, event_type, payload, occurred_at
+    event_document = convert_event_to_document(event)
+    return json.dumps(event_document, default=datetime.isoformat).encode()
+
+
+def convert_broker_message_to_event(value: bytes) -> BaseEvent:
+    event_document = json.loads(value)
+    if event_document.get('occurred_at') is not None:
+        event_document['occurred_at'] = datetime.fromisoformat(event_document['occurred_at'])
+    payload = event_document['payload']
+    for field_name in EVENT_DATETIME_FIELDS[event_document['event_type']]:
+        if payload.get(field_name) is not None:
+            payload[field_name] = datetime.fromisoformat(payload[field_name])
+
+    return convert_document_to_event(event_document)
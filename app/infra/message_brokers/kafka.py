@@ -0,0 +1,118 @@
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from aiokafka import AIOKafkaConsumer, AIOKafkaProducer, TopicPartition
+
+from infra.message_brokers.base import BaseMessageBroker, BaseMessageConsumer, BaseMessageConsumerFactory, \
+    BrokerMessage
+
+
+@dataclass
+class KafkaMessageBroker(BaseMessageBroker):
+    """
+    Продюсер собирает сообщения в пачки: ждет до linger_ms или пока пачка партиции не наберет
+    max_batch_size байт, пачка сжимается (compression_type). enable_idempotence - брокер отбрасывает
+    дубли при ретраях, порядок внутри партиции сохраняется (требует acks='all').
+
+    Сам AIOKafkaProducer создается в start() - ему нужен запущенный event loop.
+    """
+    bootstrap_servers: str
+    linger_ms: int = field(default=5, kw_only=True)
+    max_batch_size: int = field(default=64 * 1024, kw_only=True)
+    compression_type: str | None = field(default='gzip', kw_only=True)
+
+    _producer: AIOKafkaProducer | None = field(default=None, init=False, repr=False)
+
+    async def start(self) -> None:
+        self._producer = AIOKafkaProducer(
+            bootstrap_servers=self.bootstrap_servers,
+            linger_ms=self.linger_ms,
+            max_batch_size=self.max_batch_size,
+            compression_type=self.compression_type,
+            enable_idempotence=True,
+            acks='all',
+        )
+        await self._producer.start()
+
+    async def close(self) -> None:
+        if self._producer is not None:
+            await self._producer.stop()
+            self._producer = None
+
+    async def send_message(self, topic: str, value: bytes, key: bytes | None = None) -> None:
+        # send() только кладет сообщение в пачку, ждем уже подтверждения доставки всей пачки
+        delivery = await self._producer.send(topic=topic, value=value, key=key)
+        await delivery
+
+
+@dataclass
+class KafkaMessageConsumer(BaseMessageConsumer):
+    """
+    Консьюмер группы group_id без автокоммита: офсеты фиксирует вызывающий после обработки (at-least-once).
+    pause/resume останавливают и фоновую предвыборку aiokafka по партиции, а не только выдачу из get_many.
+
+    group_id=None - консьюмер вне группы: читает все партиции топиков сам (так каждый узел получает весь поток),
+    коммитить офсеты в этом режиме нельзя.
+    """
+    bootstrap_servers: str
+    topics: tuple[str, ...]
+    group_id: str | None
+    auto_offset_reset: str = field(default='earliest', kw_only=True)
+    max_partition_fetch_bytes: int = field(default=1024 * 1024, kw_only=True)
+
+    _consumer: AIOKafkaConsumer | None = field(default=None, init=False, repr=False)
+
+    async def start(self) -> None:
+        self._consumer = AIOKafkaConsumer(
+            *self.topics,
+            bootstrap_servers=self.bootstrap_servers,
+            group_id=self.group_id,
+            enable_auto_commit=False,
+            auto_offset_reset=self.auto_offset_reset,
+            max_partition_fetch_bytes=self.max_partition_fetch_bytes,
+        )
+        await self._consumer.start()
+
+    async def close(self) -> None:
+        if self._consumer is not None:
+            await self._consumer.stop()
+            self._consumer = None
+
+    async def get_many(self, max_records: int, timeout: float) -> list[BrokerMessage]:
+        records = await self._consumer.getmany(timeout_ms=int(timeout * 1000), max_records=max_records)
+        return [
+            BrokerMessage(
+                topic=record.topic,
+                partition=record.partition,
+                offset=record.offset,
+                key=record.key,
+                value=record.value,
+            )
+            for partition_records in records.values()
+            for record in partition_records
+        ]
+
+    async def commit(self, offsets: dict[tuple[str, int], int]) -> None:
+        await self._consumer.commit({
+            TopicPartition(topic, partition): offset for (topic, partition), offset in offsets.items()
+        })
+
+    def pause(self, partitions: Iterable[tuple[str, int]]) -> None:
+        self._consumer.pause(*(TopicPartition(topic, partition) for topic, partition in partitions))
+
+    def resume(self, partitions: Iterable[tuple[str, int]]) -> None:
+        self._consumer.resume(*(TopicPartition(topic, partition) for topic, partition in partitions))
+
+
+@dataclass
+class KafkaMessageConsumerFactory(BaseMessageConsumerFactory):
+    bootstrap_servers: str
+
+    def create_consumer(self, topics: tuple[str, ...], group_id: str | None = None) -> KafkaMessageConsumer:
+        return KafkaMessageConsumer(
+            bootstrap_servers=self.bootstrap_servers,
+            topics=topics,
+            group_id=group_id,
+            # группа продолжает с закоммиченных офсетов, консьюмеру вне группы нужны только новые сообщения
+            auto_offset_reset='earliest' if group_id is not None else 'latest',
+        )
@@ -0,0 +1,112 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Iterable
+from zlib import crc32
+
+from infra.message_brokers.base import BaseMessageBroker, BaseMessageConsumer, BaseMessageConsumerFactory, \
+    BrokerMessage
+
+
+@dataclass
+class MemoryMessageBroker(BaseMessageBroker):
+    """
+    Брокер в памяти процесса с тем же интерфейсом, что и KafkaMessageBroker: топики разбиты на партиции,
+    партиция выбирается по ключу, в партиции сохраняется порядок и офсеты.
+    Для тестов и замеров пропускной способности без живого кластера.
+    """
+    partitions: int = field(default=4, kw_only=True)
+    _topics: dict[str, list[list[BrokerMessage]]] = field(default_factory=dict, init=False, repr=False)
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    def get_partition(self, key: bytes | None) -> int:
+        return crc32(key) % self.partitions if key is not None else 0
+
+    def get_messages(self, topic: str, partition: int | None = None) -> list[BrokerMessage]:
+        """
+        Копия всего содержимого топика (или партиции) - для проверок в тестах; консьюмеры читают через fetch.
+        """
+        partitions = self._topics.get(topic, [])
+        if partition is not None:
+            return list(partitions[partition]) if partitions else []
+        return [message for messages in partitions for message in messages]
+
+    def fetch(self, topic: str, partition: int, offset: int, max_records: int) -> list[BrokerMessage]:
+        """
+        Не больше max_records сообщений партиции начиная с offset - срез без копирования всей партиции.
+        """
+        partitions = self._topics.get(topic)
+        if not partitions:
+            return []
+        return partitions[partition][offset:offset + max_records]
+
+    async def send_message(self, topic: str, value: bytes, key: bytes | None = None) -> None:
+        partitions = self._topics.setdefault(topic, [[] for _ in range(self.partitions)])
+        partition = self.get_partition(key)
+        messages = partitions[partition]
+        messages.append(BrokerMessage(topic=topic, partition=partition, offset=len(messages), key=key, value=value))
+
+
+@dataclass
+class MemoryMessageConsumer(BaseMessageConsumer):
+    """
+    Консьюмер для MemoryMessageBroker: читает все партиции топиков, начиная с закоммиченных офсетов группы
+    (хранятся в committed), учитывает pause/resume.
+    """
+    broker: MemoryMessageBroker
+    topics: tuple[str, ...]
+    committed: dict[tuple[str, int], int] = field(default_factory=dict, kw_only=True)
+
+    _positions: dict[tuple[str, int], int] = field(default_factory=dict, init=False, repr=False)
+    _paused: set[tuple[str, int]] = field(default_factory=set, init=False, repr=False)
+
+    @property
+    def paused(self) -> frozenset[tuple[str, int]]:
+        return frozenset(self._paused)
+
+    async def start(self) -> None:
+        self._positions = dict(self.committed)
+
+    async def close(self) -> None:
+        pass
+
+    async def get_many(self, max_records: int, timeout: float) -> list[BrokerMessage]:
+        messages = []
+        for topic in self.topics:
+            for partition in range(self.broker.partitions):
+                if (topic, partition) in self._paused:
+                    continue
+
+                position = self._positions.get((topic, partition), 0)
+                batch = self.broker.fetch(topic, partition, position, max_records - len(messages))
+                self._positions[(topic, partition)] = position + len(batch)
+                messages.extend(batch)
+
+        if not messages:
+            await asyncio.sleep(timeout)
+        return messages
+
+    async def commit(self, offsets: dict[tuple[str, int], int]) -> None:
+        self.committed.update(offsets)
+
+    def pause(self, partitions: Iterable[tuple[str, int]]) -> None:
+        self._paused.update(partitions)
+
+    def resume(self, partitions: Iterable[tuple[str, int]]) -> None:
+        self._paused.difference_update(partitions)
+
+
+@dataclass
+class MemoryMessageConsumerFactory(BaseMessageConsumerFactory):
+    """
+    Консьюмеры MemoryMessageBroker: у каждого свои офсеты с начала топиков - группа memory-брокеру не нужна,
+    в процессе один консьюмер на поток.
+    """
+    broker: MemoryMessageBroker
+
+    def create_consumer(self, topics: tuple[str, ...], group_id: str | None = None) -> MemoryMessageConsumer:
+        return MemoryMessageConsumer(broker=self.broker, topics=topics)
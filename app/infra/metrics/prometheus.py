@@ -0,0 +1,169 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from time import perf_counter
+from typing import Callable, Iterable
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+from domain.events.base import BaseEvent
+from domain.exceptions.base import ApplicationException
+from infra.repositories.cache import CacheStats
+from logic.metrics import BaseMediatorMetrics
+
+# границы бакетов в секундах: от ответов из памяти (сотни мкс) до медленных запросов в монгу
+LATENCY_BUCKETS = (.0001, .00025, .0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+# задержка публикации события - от записи в outbox до обработчиков: relay опрашивает outbox раз в poll_interval
+PUBLISH_LAG_BUCKETS = (.001, .005, .01, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60, 300)
+# ошибки приложения (ApplicationException) у репозитория - ответ хранилища, а не его сбой
+REPOSITORY_EXPECTED_ERRORS = (ApplicationException,)
+
+
+@dataclass(eq=False, slots=True)
+class Timer:
+    """
+    Замер одного вызова: длительность - в гистограмму, исключение - в счетчик ошибок
+    (кроме expected_errors - ожидаемых исходов вроде "чат с таким названием уже есть").
+    Дочерние метрики с уже подставленными метками берутся из кэша PrometheusMetrics - на вызов
+    остается два perf_counter и observe (около микросекунды).
+    """
+    histogram: Histogram
+    errors: Counter
+    expected_errors: tuple[type[BaseException], ...] = ()
+    started_at: float = 0.0
+
+    def __enter__(self) -> 'Timer':
+        self.started_at = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.histogram.observe(perf_counter() - self.started_at)
+        if exc_type is not None and not issubclass(exc_type, self.expected_errors):
+            self.errors.inc()
+
+
+@dataclass(eq=False)
+class CacheStatsCollector(Collector):
+    """
+    Счетчики кэшей (CacheStats) читаются только при сборе метрик - сами кэши про prometheus не знают.
+    """
+    caches: dict[str, CacheStats] = field(default_factory=dict)
+
+    def collect(self) -> Iterable[CounterMetricFamily | GaugeMetricFamily]:
+        hits = CounterMetricFamily('chat_cache_hits', 'Попадания в кэш', labels=['cache'])
+        misses = CounterMetricFamily('chat_cache_misses', 'Промахи кэша', labels=['cache'])
+        evictions = CounterMetricFamily('chat_cache_evictions', 'Вытеснения из кэша', labels=['cache'])
+        hit_ratio = GaugeMetricFamily('chat_cache_hit_ratio', 'Доля попаданий в кэш', labels=['cache'])
+        for name, stats in self.caches.items():
+            hits.add_metric([name], stats.hits)
+            misses.add_metric([name], stats.misses)
+            evictions.add_metric([name], stats.evictions)
+            hit_ratio.add_metric([name], stats.hit_ratio)
+
+        return [hits, misses, evictions, hit_ratio]
+
+
+@dataclass(eq=False)
+class PrometheusMetrics(BaseMediatorMetrics):
+    """
+    Метрики процесса API (GET /metrics) в своем реестре - несколько контейнеров в одном процессе
+    (тесты, бенчмарки) не конфликтуют из-за имен метрик. Медиатору отдается как BaseMediatorMetrics.
+
+    - chat_command_duration_seconds / chat_query_duration_seconds - время Mediator.handle_command / handle_query
+      по типу команды/запроса, ошибки - chat_command_errors_total / chat_query_errors_total;
+    - chat_repository_duration_seconds / chat_repository_errors_total - вызовы методов репозиториев хранилища;
+    - chat_event_publish_lag_seconds - от occurred_at события до его публикации медиатором;
+    - chat_websocket_connections - открытые веб-сокеты процесса;
+    - chat_cache_* - счетчики кэша чатов и буфера последних сообщений;
+    - chat_startup_seconds - время старта приложения.
+
+    Метки с подставленными значениями кэшируются по типу/имени: на горячем пути нет поиска по меткам.
+    """
+    registry: CollectorRegistry = field(default_factory=CollectorRegistry)
+
+    def __post_init__(self):
+        self.command_duration = Histogram(
+            'chat_command_duration_seconds', 'Время обработки команды', ['command'],
+            buckets=LATENCY_BUCKETS, registry=self.registry,
+        )
+        self.command_errors = Counter(
+            'chat_command_errors', 'Команды, завершившиеся ошибкой', ['command'], registry=self.registry,
+        )
+        self.query_duration = Histogram(
+            'chat_query_duration_seconds', 'Время обработки запроса', ['query'],
+            buckets=LATENCY_BUCKETS, registry=self.registry,
+        )
+        self.query_errors = Counter(
+            'chat_query_errors', 'Запросы, завершившиеся ошибкой', ['query'], registry=self.registry,
+        )
+        self.repository_duration = Histogram(
+            'chat_repository_duration_seconds', 'Время вызова метода репозитория', ['repository', 'method'],
+            buckets=LATENCY_BUCKETS, registry=self.registry,
+        )
+        self.repository_errors = Counter(
+            'chat_repository_errors', 'Вызовы репозитория, завершившиеся ошибкой', ['repository', 'method'],
+            registry=self.registry,
+        )
+        self.event_publish_lag = Histogram(
+            'chat_event_publish_lag_seconds', 'Задержка от создания события до публикации', ['event'],
+            buckets=PUBLISH_LAG_BUCKETS, registry=self.registry,
+        )
+        self.websocket_connections = Gauge(
+            'chat_websocket_connections', 'Открытые веб-сокет соединения', registry=self.registry,
+        )
+        self.startup_seconds = Gauge('chat_startup_seconds', 'Время старта приложения', registry=self.registry)
+
+        self.caches = CacheStatsCollector()
+        self.registry.register(self.caches)
+
+        self._command_metrics: dict[type, tuple[Histogram, Counter]] = {}
+        self._query_metrics: dict[type, tuple[Histogram, Counter]] = {}
+        self._repository_metrics: dict[tuple[str, str], tuple[Histogram, Counter]] = {}
+        self._publish_lags: dict[type, Histogram] = {}
+
+    def time_command(self, command_type: type) -> Timer:
+        metrics = self._command_metrics.get(command_type)
+        if metrics is None:
+            name = command_type.__name__
+            metrics = self._command_metrics[command_type] = (
+                self.command_duration.labels(name), self.command_errors.labels(name),
+            )
+        return Timer(*metrics)
+
+    def time_query(self, query_type: type) -> Timer:
+        metrics = self._query_metrics.get(query_type)
+        if metrics is None:
+            name = query_type.__name__
+            metrics = self._query_metrics[query_type] = (
+                self.query_duration.labels(name), self.query_errors.labels(name),
+            )
+        return Timer(*metrics)
+
+    def time_repository(self, repository: str, method: str) -> Timer:
+        key = (repository, method)
+        metrics = self._repository_metrics.get(key)
+        if metrics is None:
+            metrics = self._repository_metrics[key] = (
+                self.repository_duration.labels(repository, method), self.repository_errors.labels(repository, method),
+            )
+        return Timer(*metrics, expected_errors=REPOSITORY_EXPECTED_ERRORS)
+
+    def observe_publish_lag(self, events: Iterable[BaseEvent]) -> None:
+        now = datetime.now()
+        for event in events:
+            event_type = event.__class__
+            histogram = self._publish_lags.get(event_type)
+            if histogram is None:
+                histogram = self._publish_lags[event_type] = self.event_publish_lag.labels(event_type.__name__)
+            histogram.observe(max((now - event.occurred_at).total_seconds(), 0.0))
+
+    def track_websocket_connections(self, count_connections: Callable[[], int]) -> None:
+        # считается при сборе метрик - подключение/отключение сокета ничего не стоит
+        self.websocket_connections.set_function(count_connections)
+
+    def track_cache(self, name: str, stats: CacheStats) -> None:
+        self.caches.caches[name] = stats
+
+    def render(self) -> bytes:
+        return generate_latest(self.registry)
@@ -0,0 +1,60 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Generic, Hashable, TypeVar
+
+KT = TypeVar('KT', bound=Hashable)
+VT = TypeVar('VT', bound=Any)
+
+MISSING = object()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+
+@dataclass(eq=False)
+class LRUCache(Generic[KT, VT]):
+    """
+    Ограниченный кэш: не больше max_size записей (вытесняется давно не читанная), у каждой записи свой срок жизни.
+    get возвращает MISSING, если записи нет или она протухла - None можно хранить как значение (negative cache).
+    """
+    max_size: int
+    ttl: float
+    clock: Callable[[], float] = field(default=time.monotonic, kw_only=True)
+    stats: CacheStats = field(default_factory=CacheStats, kw_only=True)
+
+    _entries: OrderedDict[KT, tuple[float, VT]] = field(default_factory=OrderedDict, init=False, repr=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: KT) -> VT | object:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= self.clock():
+            if entry is not None:
+                del self._entries[key]
+            self.stats.misses += 1
+            return MISSING
+
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return entry[1]
+
+    def set(self, key: KT, value: VT, ttl: float | None = None) -> None:
+        self._entries[key] = (self.clock() + (self.ttl if ttl is None else ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def pop(self, key: KT) -> None:
+        self._entries.pop(key, None)
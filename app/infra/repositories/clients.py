@@ -0,0 +1,26 @@
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from settings.config import Config
+
+
+def create_mongo_db_client(config: Config) -> AsyncIOMotorClient:
+    """
+    Клиент монги с настройками пула, сжатия и таймаутов из конфига - один и тот же для приложения,
+    консьюмера и миграций.
+    """
+    options = {}
+    # не заданные в конфиге опции не передаем - остаются значения из connection string / драйвера
+    if config.mongodb_max_idle_time_ms is not None:
+        options['maxIdleTimeMS'] = config.mongodb_max_idle_time_ms
+    if config.mongodb_wait_queue_timeout_ms is not None:
+        options['waitQueueTimeoutMS'] = config.mongodb_wait_queue_timeout_ms
+    if config.mongodb_compressors:
+        options['compressors'] = config.mongodb_compressors
+
+    return AsyncIOMotorClient(
+        config.mongodb_connection_uri,
+        serverSelectionTimeoutMS=config.mongodb_server_selection_timeout_ms,
+        minPoolSize=config.mongodb_min_pool_size,
+        maxPoolSize=config.mongodb_max_pool_size,
+        **options,
+    )
@@ -0,0 +1,47 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from dataclasses import dataclass
+from datetime import datetime
+
+from domain.entities.messages import Message
+
+CURSOR_SEPARATOR = '|'
+
+
+@dataclass(frozen=True)
+class MessagesCursor:
+    """
+    Позиция в истории чата - ключ (created_at, oid), тот же, что и у индекса сообщений.
+    Клиенту отдается непрозрачной строкой (encode/decode).
+    """
+    created_at: datetime
+    oid: str
+
+    @classmethod
+    def from_message(cls, message: Message) -> 'MessagesCursor':
+        return cls(created_at=message.created_at, oid=message.oid)
+
+    def encode(self) -> str:
+        raw = f'{self.created_at.isoformat()}{CURSOR_SEPARATOR}{self.oid}'
+        return urlsafe_b64encode(raw.encode()).decode()
+
+    @classmethod
+    def decode(cls, token: str) -> 'MessagesCursor':
+        """
+        :raises ValueError: если строка не является курсором
+        """
+        try:
+            created_at, oid = urlsafe_b64decode(token.encode()).decode().split(CURSOR_SEPARATOR, 1)
+            return cls(created_at=datetime.fromisoformat(created_at), oid=oid)
+        except (ValueError, UnicodeError) as error:
+            raise ValueError(f'invalid messages cursor: {token!r}') from error
+
+
+@dataclass(frozen=True)
+class GetMessagesFilters:
+    """
+    Keyset-пагинация истории: before - страница старше курсора, after - новее курсора,
+    без курсоров - последние limit сообщений. Страница всегда в хронологическом порядке.
+    """
+    limit: int = 20
+    before: MessagesCursor | None = None
+    after: MessagesCursor | None = None
@@ -0,0 +1,73 @@
+import logging
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Iterable, Mapping
+
+from infra.exceptions.repositories import QueriesNotCoveredByIndexException
+
+if TYPE_CHECKING:
+    from infra.repositories.messages.mongo import BaseMongoDBRepository
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class IndexUsageProbe:
+    """
+    Образец запроса репозитория для проверки через explain(): тот же filter/sort, что и в самом
+    методе, но с любыми значениями - от значений план не зависит.
+    collection_name - если запрос идет не в коллекцию самого репозитория.
+    """
+    name: str
+    filter: Mapping[str, Any]
+    sort: list[tuple[str, int]] | None = None
+    collection_name: str | None = None
+
+
+async def ensure_indexes(repositories: Iterable['BaseMongoDBRepository']) -> None:
+    """
+    Применяет индексы, объявленные в repository.indexes. Идемпотентно: уже существующие
+    индексы с тем же именем и ключами монга пропускает, поэтому вызывается на каждом старте.
+    """
+    for repository in repositories:
+        await repository.create_indexes()
+
+
+def _find_stages(plan: Any) -> Iterable[str]:
+    if isinstance(plan, Mapping):
+        if 'stage' in plan:
+            yield plan['stage']
+        for value in plan.values():
+            yield from _find_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _find_stages(value)
+
+
+async def verify_indexes_usage(repositories: Iterable['BaseMongoDBRepository'], fail: bool = False) -> list[str]:
+    """
+    Диагностика: прогоняет explain() по каждому запросу репозиториев (get_index_usage_probes)
+    и собирает те, что монга выполняет полным сканом коллекции (COLLSCAN).
+
+    :param fail: кинуть QueriesNotCoveredByIndexException вместо предупреждения в лог
+    :return: имена непокрытых запросов
+    """
+    not_covered = []
+    for repository in repositories:
+        database = repository.mongo_db_client[repository.mongo_db_db_name]
+        for probe in repository.get_index_usage_probes():
+            collection = database[probe.collection_name or repository.mongo_db_collection_name]
+            cursor = collection.find(probe.filter)
+            if probe.sort:
+                cursor = cursor.sort(probe.sort)
+
+            explanation = await cursor.explain()
+            if 'COLLSCAN' in _find_stages(explanation['queryPlanner']['winningPlan']):
+                not_covered.append(f'{repository.__class__.__name__}.{probe.name}')
+
+    if not_covered and fail:
+        raise QueriesNotCoveredByIndexException(queries=not_covered)
+
+    for query in not_covered:
+        logger.warning('query %s is not covered by an index (COLLSCAN)', query)
+
+    return not_covered
@@ -1,7 +1,14 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
+from datetime import datetime
+from typing import AsyncIterator, Iterable, Sequence
 
 from domain.entities.messages import Chat, Message
+from domain.events.base import BaseEvent
+from infra.repositories.filters.messages import GetMessagesFilters, MessagesCursor
+
+# курсор "до начала истории" - after от него отдает сообщения с самого первого
+HISTORY_START_CURSOR = MessagesCursor(created_at=datetime.min, oid='')
 
 
 @dataclass
@@ -15,7 +22,20 @@ class BaseChatsRepository(ABC):
         pass
 
     @abstractmethod
-    async def add_chat(self) -> None:
+    async def get_chat_metadata_by_oid(self, oid: str) -> Chat | None:
+        """
+        Лёгкая проверка существования чата: только oid, title и created_at, без истории сообщений.
+        Сообщения у такого чата не загружены (LazyMessages без loader) - в него можно добавить
+        сообщение, но нельзя читать историю.
+        """
+        pass
+
+    @abstractmethod
+    async def add_chat(self, chat: Chat, events: Iterable[BaseEvent] = ()) -> None:
+        """
+        events - события агрегата (chat.pull_events()), сохраняются в outbox той же записью, что и чат.
+        :raises ChatWithThatTitleAlreadyExitsException: если чат с таким названием уже есть
+        """
         pass
 
     # async def add_message(self, chat_oid:str, message:Message):
@@ -31,9 +51,45 @@ class BaseChatsRepository(ABC):
 class BaseMessagesRepository(ABC):
 
     @abstractmethod
-    async def add_message(self, chat_oid: str, message: Message) -> None:
+    async def add_message(self, chat_oid: str, message: Message, events: Iterable[BaseEvent] = ()) -> None:
         """
         Имплементацию оставим на классах наследниках...
         Т.е. как как это будет: через МонгоДб или Мемори - намс не интересует
+
+        events - события агрегата чата, сохраняются в outbox той же записью, что и сообщение.
+        """
+        pass
+
+    @abstractmethod
+    async def add_messages(self, chat_oid: str, messages: Sequence[Message], events: Iterable[BaseEvent] = ()) -> None:
+        """
+        Пачка сообщений одного чата одной записью в хранилище (в порядке messages).
+        events - события агрегата чата по всем сообщениям пачки, в outbox вместе с сообщениями.
         """
         pass
+
+    @abstractmethod
+    async def get_messages(self, chat_oid: str, filters: GetMessagesFilters) -> list[Message]:
+        """
+        Одна страница истории чата (не больше filters.limit сообщений) в хронологическом порядке.
+        Сообщения за пределами страницы не должны подниматься из хранилища.
+        """
+        pass
+
+    async def iter_messages(self, chat_oid: str, batch_size: int = 1000) -> AsyncIterator[list[Message]]:
+        """
+        Вся история чата пачками не больше batch_size сообщений, в хронологическом порядке (экспорт).
+        В памяти одновременно только одна пачка. По умолчанию - постранично через get_messages,
+        хранилища с курсором переопределяют.
+        """
+        after = HISTORY_START_CURSOR
+        while True:
+            batch = await self.get_messages(
+                chat_oid=chat_oid,
+                filters=GetMessagesFilters(limit=batch_size, after=after),
+            )
+            if batch:
+                yield batch
+            if len(batch) < batch_size:
+                return
+            after = MessagesCursor.from_message(batch[-1])
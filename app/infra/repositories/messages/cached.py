@@ -0,0 +1,79 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Iterable
+
+from domain.entities.messages import Chat, LazyMessages
+from domain.events.base import BaseEvent
+from domain.values.messages import Title
+from infra.repositories.cache import MISSING, LRUCache
+from infra.repositories.messages.base import BaseChatsRepository
+
+
+@dataclass(eq=False)
+class CachedChatsRepository(BaseChatsRepository):
+    """
+    Read-through кэш метаданных чатов (oid, title, created_at) поверх другого репозитория чатов.
+    Метаданные чата после создания не меняются, поэтому живут ttl секунд в LRU на max_size чатов.
+
+    - отсутствующие oid/названия тоже кэшируются (negative cache), но на короткий negative_ttl;
+    - создание чата снимает negative-записи сразу в add_chat, а на остальных процессах -
+      по событию NewChatCreatedEvent из kafka (invalidate, слушатель событий процесса) или по истечении negative_ttl;
+    - get_chat_by_oid с историей не кэшируется, но для заведомо отсутствующего oid в хранилище не ходит.
+
+    Кэш хранит кортежи, а каждый вызов получает свой новый Chat - вызывающий может добавлять в него сообщения.
+    Попадания/промахи - в chats_cache.stats и titles_cache.stats.
+    """
+    repository: BaseChatsRepository
+    max_size: int = field(default=10_000, kw_only=True)
+    ttl: float = field(default=300, kw_only=True)
+    negative_ttl: float = field(default=5, kw_only=True)
+
+    chats_cache: LRUCache[str, tuple[str, str, datetime] | None] = field(init=False)
+    titles_cache: LRUCache[str, bool] = field(init=False)
+
+    def __post_init__(self):
+        self.chats_cache = LRUCache(max_size=self.max_size, ttl=self.ttl)
+        self.titles_cache = LRUCache(max_size=self.max_size, ttl=self.ttl)
+
+    async def check_chat_exists_by_title(self, title) -> bool:
+        title_value = title.as_generic_type() if isinstance(title, Title) else title
+        exists = self.titles_cache.get(title_value)
+        if exists is MISSING:
+            exists = await self.repository.check_chat_exists_by_title(title_value)
+            self.titles_cache.set(title_value, exists, ttl=None if exists else self.negative_ttl)
+
+        return exists
+
+    async def get_chat_by_oid(self, oid: str) -> Chat | None:
+        if self.chats_cache.get(oid) is None:
+            return None
+
+        return await self.repository.get_chat_by_oid(oid)
+
+    async def get_chat_metadata_by_oid(self, oid: str) -> Chat | None:
+        metadata = self.chats_cache.get(oid)
+        if metadata is MISSING:
+            chat = await self.repository.get_chat_metadata_by_oid(oid=oid)
+            metadata = (chat.oid, chat.title.as_generic_type(), chat.created_at) if chat else None
+            self.chats_cache.set(oid, metadata, ttl=None if chat else self.negative_ttl)
+
+        if metadata is None:
+            return None
+
+        chat_oid, title, created_at = metadata
+        return Chat(
+            oid=chat_oid,
+            title=Title.from_trusted(title),
+            created_at=created_at,
+            messages=LazyMessages(chat_oid=chat_oid),
+        )
+
+    async def add_chat(self, chat: Chat, events: Iterable[BaseEvent] = ()) -> None:
+        await self.repository.add_chat(chat, events=events)
+        self.invalidate(oid=chat.oid, title=chat.title.as_generic_type())
+
+    def invalidate(self, oid: str | None = None, title: str | None = None) -> None:
+        if oid is not None:
+            self.chats_cache.pop(oid)
+        if title is not None:
+            self.titles_cache.pop(title)
@@ -0,0 +1,107 @@
+import asyncio
+from dataclasses import dataclass, field
+from functools import partial
+from typing import AsyncIterator, Iterable, Sequence
+
+from domain.entities.messages import Message
+from domain.events.base import BaseEvent
+from infra.repositories.filters.messages import GetMessagesFilters
+from infra.repositories.messages.base import BaseMessagesRepository
+
+
+@dataclass(eq=False)
+class PendingAppend:
+    """
+    Накопленные для одного чата, еще не записанные сообщения и их ожидающие вызовы.
+    """
+    messages: list[Message] = field(default_factory=list)
+    events: list[BaseEvent] = field(default_factory=list)
+    waiters: list[asyncio.Future] = field(default_factory=list)
+    timer: asyncio.TimerHandle | None = None
+
+
+@dataclass(eq=False)
+class CoalescingMessagesRepository(BaseMessagesRepository):
+    """
+    Групповая запись (group commit) поверх другого репозитория сообщений. Включается в конфиге
+    (MONGODB_MESSAGES_COALESCE_WINDOW_MS > 0).
+
+    add_message не пишет сразу: сообщения одного чата копятся window секунд (или до max_items штук)
+    и уходят одной записью repository.add_messages. Каждый вызов add_message ждет запись своей пачки и
+    получает ее результат - возвращается после сохранения или получает исключение записи. Пачки одного чата
+    пишутся строго по очереди, поэтому порядок сообщений сохраняется.
+
+    add_messages (уже пачка) и чтение идут в repository напрямую.
+    """
+    repository: BaseMessagesRepository
+    window: float = field(default=0.005, kw_only=True)
+    max_items: int = field(default=100, kw_only=True)
+
+    _pending: dict[str, PendingAppend] = field(default_factory=dict, init=False, repr=False)
+    _flushing: dict[str, asyncio.Task] = field(default_factory=dict, init=False, repr=False)
+
+    async def add_message(self, chat_oid: str, message: Message, events: Iterable[BaseEvent] = ()) -> None:
+        loop = asyncio.get_running_loop()
+        pending = self._pending.get(chat_oid)
+        if pending is None:
+            pending = self._pending[chat_oid] = PendingAppend()
+            pending.timer = loop.call_later(self.window, self._flush, chat_oid)
+
+        waiter = loop.create_future()
+        pending.messages.append(message)
+        pending.events.extend(events)
+        pending.waiters.append(waiter)
+
+        if len(pending.messages) >= self.max_items:
+            self._flush(chat_oid)
+
+        # shield - отмена одного вызывающего не отменяет запись пачки, в которой едут чужие сообщения
+        await asyncio.shield(waiter)
+
+    async def add_messages(self, chat_oid: str, messages: Sequence[Message], events: Iterable[BaseEvent] = ()) -> None:
+        await self.repository.add_messages(chat_oid=chat_oid, messages=messages, events=events)
+
+    async def get_messages(self, chat_oid: str, filters: GetMessagesFilters) -> list[Message]:
+        return await self.repository.get_messages(chat_oid=chat_oid, filters=filters)
+
+    def iter_messages(self, chat_oid: str, batch_size: int = 1000) -> AsyncIterator[list[Message]]:
+        return self.repository.iter_messages(chat_oid=chat_oid, batch_size=batch_size)
+
+    async def flush(self) -> None:
+        """
+        Записывает все накопленное, не дожидаясь окна, и ждет окончания записей (остановка приложения).
+        """
+        for chat_oid in list(self._pending):
+            self._flush(chat_oid)
+        await asyncio.gather(*self._flushing.values(), return_exceptions=True)
+
+    def _flush(self, chat_oid: str) -> None:
+        pending = self._pending.pop(chat_oid, None)
+        if pending is None:
+            return
+
+        pending.timer.cancel()
+        previous = self._flushing.get(chat_oid)
+        task = asyncio.create_task(self._write(chat_oid, pending, previous))
+        self._flushing[chat_oid] = task
+        task.add_done_callback(partial(self._forget_flush, chat_oid))
+
+    def _forget_flush(self, chat_oid: str, task: asyncio.Task) -> None:
+        if self._flushing.get(chat_oid) is task:
+            del self._flushing[chat_oid]
+
+    async def _write(self, chat_oid: str, pending: PendingAppend, previous: asyncio.Task | None) -> None:
+        if previous is not None:
+            # предыдущая пачка чата еще пишется - ждем ее, чтобы не перепутать порядок
+            await asyncio.gather(previous, return_exceptions=True)
+
+        try:
+            await self.repository.add_messages(chat_oid=chat_oid, messages=pending.messages, events=pending.events)
+        except Exception as exception:
+            for waiter in pending.waiters:
+                if not waiter.done():
+                    waiter.set_exception(exception)
+        else:
+            for waiter in pending.waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
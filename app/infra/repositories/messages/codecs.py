@@ -0,0 +1,35 @@
+from typing import Any, Iterable, Mapping
+
+from domain.entities.messages import Message
+from domain.values.messages import Text
+
+# поля документа сообщения, которые нужны сущности - остальное (_id, chat_oid, outbox) драйверу декодировать незачем
+MESSAGE_DOCUMENT_PROJECTION = {'_id': 0, 'oid': 1, 'created_at': 1, 'text': 1}
+
+_new_object = object.__new__
+
+
+def encode_message(message: Message) -> dict:
+    return {
+        'oid': message.oid,
+        'created_at': message.created_at,
+        'text': message.text.value,
+    }
+
+
+def decode_message(document: Mapping[str, Any]) -> Message:
+    """
+    Сообщение из документа хранилища без __init__ датакласса и validate() у Text (Text.from_trusted): документ
+    уже прошел проверки при записи, а история чата читается десятками тысяч сообщений. Поля Message заполняются
+    здесь явно - при добавлении поля в Message его нужно добавить и сюда.
+    """
+    message = _new_object(Message)
+    message.oid = document['oid']
+    message.created_at = document['created_at']
+    message.text = Text.from_trusted(document['text'])
+    message._events = None
+    return message
+
+
+def decode_messages(documents: Iterable[Mapping[str, Any]]) -> list[Message]:
+    return [decode_message(document) for document in documents]
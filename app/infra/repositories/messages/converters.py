@@ -1,41 +1,72 @@
-from typing import Mapping, Any
+from typing import Any, Iterable, Mapping
 
-from domain.entities.messages import Chat, Message
+from domain.entities.messages import Chat, LazyMessages, Message
+from domain.values.messages import Title
+from infra.repositories.messages.codecs import decode_message, decode_messages, encode_message
 
 
 def convert_message_entity_to_document(message: Message):
+    return encode_message(message)
+
+
+def convert_message_entity_to_collection_document(chat_oid: str, message: Message) -> dict:
+    """
+    Документ сообщения для отдельной коллекции сообщений: тот же документ, что и во вложенном массиве,
+    плюс ссылка на чат (chat_oid), по которой строится индекс (chat_oid, created_at, oid).
+    """
     return {
-        "oid": message.oid,
-        "created_at": message.created_at,
-        "text": message.text.as_generic_type(),
+        "chat_oid": chat_oid,
+        **convert_message_entity_to_document(message),
     }
 
 
-def convert_chat_entity_to_document(chat: Chat) -> dict:
-    return {
+def convert_chat_entity_to_document(chat: Chat, embed_messages: bool = True) -> dict:
+    chat_document = {
         "oid": chat.oid,
         "title": chat.title.as_generic_type(),
         "created_at": chat.created_at,
-        "messages": [convert_message_entity_to_document(message) for message in chat.messages],
     }
+    if embed_messages:
+        # исторический формат - сообщения лежат массивом внутри документа чата
+        chat_document["messages"] = [convert_message_entity_to_document(message) for message in chat.messages]
 
+    return chat_document
+
+
+def convert_chat_document_to_entity(
+        chat_document: Mapping[str, Any],
+        messages_documents: Iterable[Mapping[str, Any]] | None = None,
+) -> Chat:
+    """
+    messages_documents - сообщения из отдельной коллекции. Если не переданы - берем вложенный массив
+    из самого документа чата (в новом формате его в документе нет вовсе).
+    """
+    if messages_documents is None:
+        messages_documents = chat_document.get('messages', ())
 
-def convert_chat_document_to_entity(chat_document: Mapping[str, Any]) -> Chat:
     return Chat(
-        title=chat_document['title'],
+        title=Title.from_trusted(chat_document['title']),
         oid=chat_document['oid'],
         created_at=chat_document['created_at'],
 
-        messages=[
-            # get messages as entities(not documents)
-            convert_message_document_to_entity(message_document)
-            for message_document in chat_document['messages']
-        ]
+        # get messages as entities(not documents) - но только когда их кто-то прочитает
+        messages=LazyMessages(
+            loader=lambda: decode_messages(messages_documents),
+            chat_oid=chat_document['oid'],
+        ),
+    )
+
+
+def convert_chat_metadata_document_to_entity(chat_document: Mapping[str, Any]) -> Chat:
+    """
+    Чат из проекции без сообщений: история не загружена, но в такой чат можно добавлять сообщения.
+    """
+    return Chat(
+        title=Title.from_trusted(chat_document['title']),
+        oid=chat_document['oid'],
+        created_at=chat_document['created_at'],
+        messages=LazyMessages(chat_oid=chat_document['oid']),
     )
 
 def convert_message_document_to_entity(message_document: Mapping[str, Any]) -> Message:
-    return Message(
-        text=message_document['text'],
-        oid=message_document['oid'],
-        created_at=message_document['created_at'],
-    )
\ No newline at end of file
+    return decode_message(message_document)
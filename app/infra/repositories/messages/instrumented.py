@@ -0,0 +1,79 @@
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Iterable, Sequence
+
+from domain.entities.messages import Chat, Message
+from domain.events.base import BaseEvent
+from infra.metrics.prometheus import PrometheusMetrics
+from infra.repositories.filters.messages import GetMessagesFilters
+from infra.repositories.messages.base import BaseChatsRepository, BaseMessagesRepository
+
+
+@dataclass(eq=False)
+class InstrumentedChatsRepository(BaseChatsRepository):
+    """
+    Время и ошибки каждого метода репозитория чатов (метки repository - класс обернутого репозитория, method).
+    Оборачивает именно хранилище - под кэшем, поэтому попадания в кэш сюда не попадают.
+    """
+    repository: BaseChatsRepository
+    metrics: PrometheusMetrics
+    name: str = field(default='', kw_only=True)
+
+    def __post_init__(self):
+        self.name = self.name or self.repository.__class__.__name__
+
+    async def check_chat_exists_by_title(self, title) -> bool:
+        with self.metrics.time_repository(self.name, 'check_chat_exists_by_title'):
+            return await self.repository.check_chat_exists_by_title(title)
+
+    async def get_chat_by_oid(self, oid: str) -> Chat | None:
+        with self.metrics.time_repository(self.name, 'get_chat_by_oid'):
+            return await self.repository.get_chat_by_oid(oid)
+
+    async def get_chat_metadata_by_oid(self, oid: str) -> Chat | None:
+        with self.metrics.time_repository(self.name, 'get_chat_metadata_by_oid'):
+            return await self.repository.get_chat_metadata_by_oid(oid)
+
+    async def add_chat(self, chat: Chat, events: Iterable[BaseEvent] = ()) -> None:
+        with self.metrics.time_repository(self.name, 'add_chat'):
+            await self.repository.add_chat(chat, events=events)
+
+
+@dataclass(eq=False)
+class InstrumentedMessagesRepository(BaseMessagesRepository):
+    """
+    То же для репозитория сообщений. Стоит под групповой записью: add_messages - это реальные записи пачек.
+    """
+    repository: BaseMessagesRepository
+    metrics: PrometheusMetrics
+    name: str = field(default='', kw_only=True)
+
+    def __post_init__(self):
+        self.name = self.name or self.repository.__class__.__name__
+
+    async def add_message(self, chat_oid: str, message: Message, events: Iterable[BaseEvent] = ()) -> None:
+        with self.metrics.time_repository(self.name, 'add_message'):
+            await self.repository.add_message(chat_oid, message, events=events)
+
+    async def add_messages(self, chat_oid: str, messages: Sequence[Message], events: Iterable[BaseEvent] = ()) -> None:
+        with self.metrics.time_repository(self.name, 'add_messages'):
+            await self.repository.add_messages(chat_oid, messages, events=events)
+
+    async def get_messages(self, chat_oid: str, filters: GetMessagesFilters) -> list[Message]:
+        with self.metrics.time_repository(self.name, 'get_messages'):
+            return await self.repository.get_messages(chat_oid, filters)
+
+    async def iter_messages(self, chat_oid: str, batch_size: int = 1000) -> AsyncIterator[list[Message]]:
+        """
+        Замеряется получение каждой пачки, а не весь экспорт - его длительность зависит от скорости клиента.
+        """
+        batches = self.repository.iter_messages(chat_oid, batch_size=batch_size)
+        try:
+            while True:
+                with self.metrics.time_repository(self.name, 'iter_messages'):
+                    try:
+                        batch = await anext(batches)
+                    except StopAsyncIteration:
+                        break
+                yield batch
+        finally:
+            await batches.aclose()
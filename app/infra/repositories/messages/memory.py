@@ -1,20 +1,71 @@
+from bisect import bisect_left, bisect_right
 from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Iterable, Sequence
 
-from domain.entities.messages import Chat
+from domain.entities.messages import Chat, LazyMessages, Message
+from domain.events.base import BaseEvent
 from domain.values.messages import Title
-from infra.repositories.messages.base import BaseChatsRepository
+from infra.repositories.filters.messages import GetMessagesFilters
+from infra.repositories.messages.base import BaseChatsRepository, BaseMessagesRepository
+from infra.repositories.outbox.memory import MemoryOutboxRepository
+from logic.exceptions.messages import ChatWithThatTitleAlreadyExitsException
+
+# ключ порядка сообщений в чате - тот же, что и у индекса сообщений в монге
+MessageKey = tuple[datetime, str]
+
+
+@dataclass(eq=False)
+class MemoryStorage:
+    """
+    Данные memory-репозиториев: чаты и сообщения живут здесь, а не в репозиториях, чтобы репозиторий
+    чатов видел историю, записанную репозиторием сообщений (как две коллекции одной базы).
+
+    - chats: oid -> чат без истории (только метаданные), titles: название -> oid - поиск за O(1);
+    - messages: история каждого чата по порядку (created_at, oid), keys - те же ключи для бинарного поиска.
+    """
+    chats: dict[str, Chat] = field(default_factory=dict)
+    titles: dict[str, str] = field(default_factory=dict)
+    messages: dict[str, list[Message]] = field(default_factory=dict)
+    keys: dict[str, list[MessageKey]] = field(default_factory=dict)
+
+    def add_chat(self, chat: Chat) -> None:
+        self.chats[chat.oid] = Chat(title=chat.title, oid=chat.oid, created_at=chat.created_at)
+        self.titles[chat.title.value] = chat.oid
+
+    def add_messages(self, chat_oid: str, messages: Iterable[Message]) -> None:
+        chat_messages = self.messages.setdefault(chat_oid, [])
+        chat_keys = self.keys.setdefault(chat_oid, [])
+        for message in messages:
+            key = (message.created_at, message.oid)
+            if not chat_keys or chat_keys[-1] <= key:
+                # обычный случай - новое сообщение новее всех: просто в конец
+                chat_messages.append(message)
+                chat_keys.append(key)
+            else:
+                position = bisect_right(chat_keys, key)
+                chat_keys.insert(position, key)
+                chat_messages.insert(position, message)
+
+    def clear(self) -> None:
+        self.chats.clear()
+        self.titles.clear()
+        self.messages.clear()
+        self.keys.clear()
 
 
 @dataclass
 class MemoryChatsRepository(BaseChatsRepository):
     """
     MemoryChatRepository — это конкретная реализация, которая хранит данные в памяти.
-    Это может быть полезно для тестирования или работы с небольшими данными.
+    Годится для тестов, бенчмарков и одноузлового запуска без монги (STORAGE_BACKEND=memory).
     """
-
-    # class MemoryChatRepository(BaseChatRepository):
-    _saved_chats: list[Chat] = field(
-        default_factory=list,
+    storage: MemoryStorage = field(
+        default_factory=MemoryStorage,
+        kw_only=True
+    )
+    outbox: MemoryOutboxRepository = field(
+        default_factory=MemoryOutboxRepository,
         kw_only=True
     )
 
@@ -23,22 +74,79 @@ class MemoryChatsRepository(BaseChatsRepository):
         Проверяет, существует ли чат с заданным заголовком в репозитории.
 
         Аргументы:
-        - title: Заголовок, который нужно найти. Ожидается, что это строка.
+        - title: Заголовок, который нужно найти - строка или Title.
 
         Возвращает:
         - True, если чат с таким заголовком существует, иначе False.
         """
-        # Приведем переданный заголовок к строке для сравнения с сохраненными объектами Title
-        if isinstance(title, Title):  # Если переданный title является объектом Title, берем его значение
-            title_value = title.value
-        else:
-            title_value = title  # Иначе предполагаем, что это уже строка
+        title_value = title.value if isinstance(title, Title) else title
+        return title_value in self.storage.titles
 
-        # Проверяем, существует ли чат с таким заголовком в сохранённых чатах
-        return any(chat.title.value == title_value for chat in self._saved_chats)
+    async def get_chat_by_oid(self, oid: str) -> Chat | None:
+        chat = self.storage.chats.get(oid)
+        if not chat:
+            return None
 
+        # история читается при первом обращении - как и у монго-реализации
+        return Chat(
+            title=chat.title,
+            oid=chat.oid,
+            created_at=chat.created_at,
+            messages=LazyMessages(loader=lambda: list(self.storage.messages.get(oid, ())), chat_oid=oid),
+        )
 
-    def add_chat(self, chat: Chat) -> None:
-        self._saved_chats.append(chat)
+    async def get_chat_metadata_by_oid(self, oid: str) -> Chat | None:
+        chat = self.storage.chats.get(oid)
+        if not chat:
+            return None
+
+        # отдаем копию без истории, как и монго-реализация - сохраненный чат не должен меняться в обход репозитория
+        return Chat(
+            title=chat.title,
+            oid=chat.oid,
+            created_at=chat.created_at,
+            messages=LazyMessages(chat_oid=chat.oid),
+        )
+
+    async def add_chat(self, chat: Chat, events: Iterable[BaseEvent] = ()) -> None:
+        # как и уникальный индекс в монге - проверка и вставка за один вызов
+        if await self.check_chat_exists_by_title(chat.title):
+            raise ChatWithThatTitleAlreadyExitsException(chat.title.as_generic_type())
+
+        self.storage.add_chat(chat)
+        if isinstance(chat.messages, list):
+            self.storage.add_messages(chat.oid, chat.messages)
+        self.outbox.add_events(events)
+
+
+@dataclass
+class MemoryMessagesRepository(BaseMessagesRepository):
+    """
+    История чатов в памяти: добавление в конец - O(1), страница по курсору - бинарный поиск по (created_at, oid).
+    """
+    storage: MemoryStorage = field(
+        default_factory=MemoryStorage,
+        kw_only=True
+    )
+    outbox: MemoryOutboxRepository = field(
+        default_factory=MemoryOutboxRepository,
+        kw_only=True
+    )
+
+    async def add_message(self, chat_oid: str, message: Message, events: Iterable[BaseEvent] = ()) -> None:
+        self.storage.add_messages(chat_oid, (message,))
+        self.outbox.add_events(events)
+
+    async def add_messages(self, chat_oid: str, messages: Sequence[Message], events: Iterable[BaseEvent] = ()) -> None:
+        self.storage.add_messages(chat_oid, messages)
+        self.outbox.add_events(events)
 
+    async def get_messages(self, chat_oid: str, filters: GetMessagesFilters) -> list[Message]:
+        messages = self.storage.messages.get(chat_oid, [])
+        keys = self.storage.keys.get(chat_oid, [])
+        if filters.after:
+            start = bisect_right(keys, (filters.after.created_at, filters.after.oid))
+            return messages[start:start + filters.limit]
 
+        end = bisect_left(keys, (filters.before.created_at, filters.before.oid)) if filters.before else len(keys)
+        return messages[max(end - filters.limit, 0):end]
@@ -0,0 +1,89 @@
+import asyncio
+
+from motor.core import AgnosticClient
+from pymongo.errors import BulkWriteError
+
+from infra.repositories.clients import create_mongo_db_client
+from infra.repositories.messages.mongo import MongoDBCollectionMessagesRepository
+from settings.config import Config
+
+DUPLICATE_KEY_ERROR_CODE = 11000
+
+
+async def migrate_embedded_messages_to_collection(
+        mongo_db_client: AgnosticClient,
+        mongo_db_db_name: str,
+        chats_collection_name: str,
+        messages_collection_name: str,
+        batch_size: int = 1000,
+) -> int:
+    """
+    Переносит сообщения из массива `messages` документов чатов в отдельную коллекцию сообщений.
+
+    Миграцию можно безопасно перезапускать после сбоя:
+    - уникальный индекс по oid + insert_many(ordered=False) - уже перенесённые сообщения не задублируются;
+    - из документа чата удаляются ($pull) только те сообщения, которые уже лежат в новой коллекции,
+      поэтому сообщение, добавленное в старом формате во время миграции, не потеряется -
+      его подберёт следующий запуск.
+
+    :return: сколько сообщений перенесено
+    """
+    messages_repository = MongoDBCollectionMessagesRepository(
+        mongo_db_client=mongo_db_client,
+        mongo_db_db_name=mongo_db_db_name,
+        mongo_db_collection_name=messages_collection_name,
+    )
+    await messages_repository.create_indexes()
+
+    chats_collection = mongo_db_client[mongo_db_db_name][chats_collection_name]
+    messages_collection = mongo_db_client[mongo_db_db_name][messages_collection_name]
+    migrated = 0
+
+    async for chat_document in chats_collection.find(
+            filter={'messages': {'$exists': True}},
+            projection={'oid': 1, 'messages': 1},
+    ):
+        chat_oid = chat_document['oid']
+        messages_documents = [
+            {'chat_oid': chat_oid, **message_document}
+            for message_document in chat_document['messages']
+        ]
+
+        for start in range(0, len(messages_documents), batch_size):
+            batch = messages_documents[start:start + batch_size]
+            try:
+                await messages_collection.insert_many(batch, ordered=False)
+            except BulkWriteError as error:
+                # дубликаты - это сообщения, перенесённые прошлым (упавшим) запуском
+                if any(write_error['code'] != DUPLICATE_KEY_ERROR_CODE for write_error in error.details['writeErrors']):
+                    raise
+
+            await chats_collection.update_one(
+                filter={'oid': chat_oid},
+                update={'$pull': {'messages': {'oid': {'$in': [document['oid'] for document in batch]}}}},
+            )
+            migrated += len(batch)
+
+        await chats_collection.update_one(
+            filter={'oid': chat_oid, 'messages': {'$size': 0}},
+            update={'$unset': {'messages': ''}},
+        )
+
+    return migrated
+
+
+async def main() -> None:
+    config = Config()
+    client = create_mongo_db_client(config)
+
+    migrated = await migrate_embedded_messages_to_collection(
+        mongo_db_client=client,
+        mongo_db_db_name=config.mongo_db_db_name,
+        chats_collection_name=config.mongo_db_collection_name,
+        messages_collection_name=config.mongo_db_messages_collection_name,
+    )
+    print(f'migrated messages: {migrated}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
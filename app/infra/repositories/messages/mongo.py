@@ -1,26 +1,140 @@
 from abc import ABC
 from dataclasses import dataclass, field
+from datetime import datetime
+from typing import AsyncIterator, ClassVar, Iterable, Sequence
 from motor.core import AgnosticClient
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import DuplicateKeyError
+
 from domain.entities.messages import Chat, Message
+from domain.events.base import BaseEvent
 from domain.values.messages import Title
+from infra.repositories.filters.messages import GetMessagesFilters, MessagesCursor
+from infra.repositories.indexes import IndexUsageProbe
+from infra.repositories.profiles import DEFAULT_OPERATION_PROFILE, MongoOperationProfile
+from infra.repositories.outbox.converters import convert_event_to_document, convert_events_to_documents
+from infra.repositories.outbox.mongo import OUTBOX_FIELD, OUTBOX_PENDING_INDEX, PENDING_FILTER
 from infra.repositories.messages.base import BaseChatsRepository, BaseMessagesRepository
+from infra.repositories.messages.codecs import MESSAGE_DOCUMENT_PROJECTION, decode_messages
+from logic.exceptions.messages import ChatWithThatTitleAlreadyExitsException
 from infra.repositories.messages.converters import convert_chat_entity_to_document, convert_chat_document_to_entity, \
-    convert_message_document_to_entity, convert_message_entity_to_document
+    convert_message_entity_to_document, \
+    convert_message_entity_to_collection_document, convert_chat_metadata_document_to_entity
+
+# порядок сообщений внутри чата в отдельной коллекции - совпадает с индексом (chat_oid, created_at, oid)
+MESSAGES_COLLECTION_SORT = [('created_at', ASCENDING), ('oid', ASCENDING)]
+MESSAGES_COLLECTION_REVERSED_SORT = [('created_at', DESCENDING), ('oid', DESCENDING)]
+# тот же порядок для массива messages в документе чата: created_at ставит приложение до записи, поэтому
+# параллельные $push из разных воркеров могут прийти не по порядку - массив упорядочивается при чтении
+MESSAGES_ARRAY_SORT = {'created_at': ASCENDING, 'oid': ASCENDING}
+
+CHAT_OID_INDEX = IndexModel([('oid', ASCENDING)], name='oid_unique', unique=True)
+# курсор-образец для explain() - план запроса от значений не зависит
+PROBE_CURSOR = MessagesCursor(created_at=datetime(1970, 1, 1), oid='')
+
+
+def _build_cursor_filter(cursor: MessagesCursor, operator: str) -> dict:
+    """
+    (created_at, oid) < / > курсора для find: oid разводит сообщения с одинаковым created_at
+    """
+    return {
+        '$or': [
+            {'created_at': {operator: cursor.created_at}},
+            {'created_at': cursor.created_at, 'oid': {operator: cursor.oid}},
+        ],
+    }
+
+
+def _build_cursor_expression(cursor: MessagesCursor, operator: str, variable: str = '$$message') -> dict:
+    """
+    то же условие, что и _build_cursor_filter, но в виде выражения агрегации (для $filter по массиву)
+    """
+    return {
+        '$or': [
+            {operator: [f'{variable}.created_at', cursor.created_at]},
+            {
+                '$and': [
+                    {'$eq': [f'{variable}.created_at', cursor.created_at]},
+                    {operator: [f'{variable}.oid', cursor.oid]},
+                ],
+            },
+        ],
+    }
 
 
 @dataclass
 class BaseMongoDBRepository(ABC):
+    # реестр индексов коллекции репозитория - применяется на старте приложения (infra.repositories.indexes)
+    indexes: ClassVar[tuple[IndexModel, ...]] = ()
+
     mongo_db_client: AgnosticClient
     mongo_db_db_name: str
     mongo_db_collection_name: str
+    # профили операций: write_profile - записи репозитория (создание чата / добавление сообщений),
+    # read_profile - чтение истории (его можно отправить на secondary); остальное идет с настройками клиента
+    write_profile: MongoOperationProfile = field(default=DEFAULT_OPERATION_PROFILE, kw_only=True)
+    read_profile: MongoOperationProfile = field(default=DEFAULT_OPERATION_PROFILE, kw_only=True)
 
     @property
     def _collection(self):
         return self.mongo_db_client[self.mongo_db_db_name][self.mongo_db_collection_name]
 
+    @property
+    def _write_collection(self):
+        return self.write_profile.apply(self._collection)
+
+    @property
+    def _read_collection(self):
+        return self.read_profile.apply(self._collection)
+
+    async def create_indexes(self) -> None:
+        """
+        Идемпотентно - существующие индексы с тем же именем и ключами монга пропускает.
+        """
+        if self.indexes:
+            await self._collection.create_indexes(list(self.indexes))
+
+    def get_index_usage_probes(self) -> list[IndexUsageProbe]:
+        """
+        Образцы всех запросов репозитория - для проверки через explain(), что каждый из них идет по индексу.
+        """
+        return []
+
 
 @dataclass
 class MongoDBChatsRepository(BaseChatsRepository, BaseMongoDBRepository):
+    indexes = (
+        # уникальность названия держит сама монга - без отдельной проверки перед вставкой
+        IndexModel([('title', ASCENDING)], name='title_unique', unique=True),
+        CHAT_OID_INDEX,
+        OUTBOX_PENDING_INDEX,
+    )
+
+    # если задано - сообщения чата лежат в отдельной коллекции (MongoDBCollectionMessagesRepository),
+    # а не массивом внутри документа чата
+    mongo_db_messages_collection_name: str | None = field(default=None, kw_only=True)
+    # write_profile - создание чата, read_profile - get_chat_by_oid (чат с историей);
+    # проверка названия и метаданные идут с настройками клиента - командам нужен только что созданный чат
+
+    @property
+    def _messages_collection(self):
+        return self.mongo_db_client[self.mongo_db_db_name][self.mongo_db_messages_collection_name]
+
+    def get_index_usage_probes(self) -> list[IndexUsageProbe]:
+        probes = [
+            IndexUsageProbe(name='check_chat_exists_by_title', filter={'title': ''}),
+            IndexUsageProbe(name='get_chat_by_oid', filter={'oid': ''}),
+            IndexUsageProbe(name='outbox', filter=PENDING_FILTER, sort=[(f'{OUTBOX_FIELD}.occurred_at', ASCENDING)]),
+        ]
+        if self.mongo_db_messages_collection_name is not None:
+            probes.append(IndexUsageProbe(
+                name='get_chat_by_oid.messages',
+                filter={'chat_oid': ''},
+                sort=MESSAGES_COLLECTION_SORT,
+                collection_name=self.mongo_db_messages_collection_name,
+            ))
+
+        return probes
 
     async def check_chat_exists_by_title(self, title: str) -> bool:
         """
@@ -37,7 +151,7 @@ class MongoDBChatsRepository(BaseChatsRepository, BaseMongoDBRepository):
         та же самая проверка, только другое поле
         """
         # 1. get chart document from mongoDB
-        chat_document = await self._collection.find_one(
+        chat_document = await self._read_collection.find_one(
             filter={
                 'oid': oid
             }
@@ -45,29 +159,246 @@ class MongoDBChatsRepository(BaseChatsRepository, BaseMongoDBRepository):
         if not chat_document:
             return None
 
-        # 2. need to convert document into entity
-        return convert_chat_document_to_entity(chat_document)
+        if self.mongo_db_messages_collection_name is None:
+            # 2. need to convert document into entity
+            return convert_chat_document_to_entity(chat_document)
 
-    async def add_chat(self, chat: Chat) -> None:
+        # 2.1. сообщения лежат отдельно - достаем их по индексу (chat_oid, created_at, oid)
+        messages_documents = await self.read_profile.apply(self._messages_collection).find(
+            filter={'chat_oid': oid},
+        ).sort(MESSAGES_COLLECTION_SORT).to_list(length=None)
+
+        return convert_chat_document_to_entity(chat_document, messages_documents=messages_documents)
+
+    async def get_chat_metadata_by_oid(self, oid: str) -> Chat | None:
+        """
+        проекция только по метаданным - массив messages (если он есть) даже не уходит с сервера
+        """
+        chat_document = await self._collection.find_one(
+            filter={'oid': oid},
+            projection={'_id': 0, 'oid': 1, 'title': 1, 'created_at': 1},
+        )
+        if not chat_document:
+            return None
+
+        return convert_chat_metadata_document_to_entity(chat_document)
+
+    async def add_chat(self, chat: Chat, events: Iterable[BaseEvent] = ()) -> None:
         """
         так же мы должны уметь добавлять новый чат в нашу коллекцию
         """
-        await self._collection.insert_one(
-            # конвертируем наш чат в json.. т.е. в то как он будет помещен в бд
-            convert_chat_entity_to_document(chat)
+        # конвертируем наш чат в json.. т.е. в то как он будет помещен в бд
+        # (при отдельной коллекции сообщений - без них, документ чата остаётся маленьким и фиксированного размера)
+        chat_document = convert_chat_entity_to_document(
+            chat,
+            embed_messages=self.mongo_db_messages_collection_name is None,
         )
+        if outbox := convert_events_to_documents(events):
+            chat_document[OUTBOX_FIELD] = outbox  # события - в том же документе, одной записью с чатом
+        try:
+            # одна вставка вместо check_chat_exists_by_title + insert: проверку делает уникальный индекс по title,
+            # поэтому два одновременных запроса с одинаковым названием не создадут два чата
+            await self._write_collection.insert_one(chat_document)
+        except DuplicateKeyError as error:
+            if 'title' in (error.details or {}).get('keyValue', {}):
+                raise ChatWithThatTitleAlreadyExitsException(chat.title.as_generic_type()) from error
+            raise
+
+        if self.mongo_db_messages_collection_name is not None and chat.messages:
+            await self.write_profile.apply(self._messages_collection).insert_many([
+                convert_message_entity_to_collection_document(chat_oid=chat.oid, message=message)
+                for message in chat.messages
+            ])
         # self._saved_chats.append(chat)
 
 
 @dataclass
 class MongoDBMessagesRepository(BaseMessagesRepository, BaseMongoDBRepository):
-    async def add_message(self, chat_oid: str,  message: Message) -> None:
+    # сообщения внутри документов чатов - коллекция та же, что у MongoDBChatsRepository, ищем по oid чата
+    indexes = (CHAT_OID_INDEX, OUTBOX_PENDING_INDEX)
+
+    def get_index_usage_probes(self) -> list[IndexUsageProbe]:
+        return [
+            IndexUsageProbe(name='add_message', filter={'oid': ''}),
+            IndexUsageProbe(name='get_messages', filter={'oid': ''}),
+        ]
+
+    async def add_message(self, chat_oid: str,  message: Message, events: Iterable[BaseEvent] = ()) -> None:
         # добавляем новый документ в массив внутри другого документа в колекции монгодб
-        await self._collection.update_one(
+        push = {"messages": convert_message_entity_to_document(message)}
+        if outbox := convert_events_to_documents(events):
+            # события - в outbox того же документа чата, тем же атомарным update_one
+            push[OUTBOX_FIELD] = {"$each": outbox}
+
+        await self._write_collection.update_one(
             filter={"oid": chat_oid},
-            update={
-                "$push": {
-                    "messages": convert_message_entity_to_document(message),
-                }
-            }
+            update={"$push": push},
+        )
+
+    async def add_messages(self, chat_oid: str, messages: Sequence[Message], events: Iterable[BaseEvent] = ()) -> None:
+        # вся пачка - один $push $each: одно обновление документа чата вместо update_one на сообщение
+        push = {"messages": {"$each": [convert_message_entity_to_document(message) for message in messages]}}
+        if outbox := convert_events_to_documents(events):
+            push[OUTBOX_FIELD] = {"$each": outbox}
+
+        await self._write_collection.update_one(
+            filter={"oid": chat_oid},
+            update={"$push": push},
         )
+
+    async def get_messages(self, chat_oid: str, filters: GetMessagesFilters) -> list[Message]:
+        """
+        Массив сообщений фильтруется ($filter) и режется ($slice) на стороне монги -
+        из документа чата приходит только запрошенная страница. $push дописывает в конец массива без сортировки
+        (запись не дорожает с длиной истории), поэтому перед срезом отфильтрованные сообщения
+        упорядочиваются по (created_at, oid) ($sortArray, MESSAGES_ARRAY_SORT).
+        """
+        messages = '$messages'
+        if filters.before:
+            messages = {'$filter': {
+                'input': messages, 'as': 'message', 'cond': _build_cursor_expression(filters.before, '$lt'),
+            }}
+        if filters.after:
+            messages = {'$filter': {
+                'input': messages, 'as': 'message', 'cond': _build_cursor_expression(filters.after, '$gt'),
+            }}
+
+        messages = {'$sortArray': {'input': messages, 'sortBy': MESSAGES_ARRAY_SORT}}
+        # after - ближайшие сообщения после курсора (начало массива), иначе - последние перед курсором (конец)
+        page_slice = [messages, filters.limit] if filters.after else [messages, -filters.limit]
+
+        documents = await self._read_collection.aggregate([
+            {'$match': {'oid': chat_oid}},
+            {'$project': {'_id': 0, 'messages': {'$slice': page_slice}}},
+        ]).to_list(length=1)
+        if not documents:
+            return []
+
+        return decode_messages(documents[0].get('messages') or ())
+
+    async def iter_messages(self, chat_oid: str, batch_size: int = 1000) -> AsyncIterator[list[Message]]:
+        """
+        Один aggregate-курсор: массив сообщений чата разворачивается ($unwind) в поток документов, и монга
+        отдает их пачками по batch_size - документ чата читается один раз на экспорт, а не на каждую пачку,
+        как у постраничного iter_messages по умолчанию. Массив хранится в порядке записи - порядок истории
+        дает $sort.
+        """
+        cursor = self._read_collection.aggregate(
+            [
+                {'$match': {'oid': chat_oid}},
+                {'$unwind': '$messages'},
+                {'$replaceRoot': {'newRoot': '$messages'}},
+                {'$sort': MESSAGES_ARRAY_SORT},
+                {'$project': MESSAGE_DOCUMENT_PROJECTION},
+            ],
+            batchSize=batch_size,
+            # сортировка всей истории чата может не влезть в лимит памяти стадии $sort
+            allowDiskUse=True,
+        )
+
+        try:
+            while documents := await cursor.to_list(length=batch_size):
+                yield decode_messages(documents)
+        finally:
+            await cursor.close()
+
+
+@dataclass
+class MongoDBCollectionMessagesRepository(BaseMessagesRepository, BaseMongoDBRepository):
+    """
+    Сообщения лежат отдельными документами в своей коллекции (mongo_db_collection_name),
+    ключ - (chat_oid, created_at, oid).
+
+    В отличие от MongoDBMessagesRepository ($push в массив документа чата) документ чата не растёт
+    к лимиту BSON в 16 MB, а запись в "горячий" чат стоит одинаково вне зависимости от длины истории -
+    это всегда один insert_one маленького документа.
+    """
+
+    indexes = (
+        # история чата в порядке создания, oid - тай-брейкер для одинаковых created_at
+        IndexModel(
+            [('chat_oid', ASCENDING), ('created_at', ASCENDING), ('oid', ASCENDING)],
+            name='chat_oid_created_at_oid',
+        ),
+        IndexModel([('oid', ASCENDING)], name='oid_unique', unique=True),
+        OUTBOX_PENDING_INDEX,
+    )
+
+    def get_index_usage_probes(self) -> list[IndexUsageProbe]:
+        return [
+            IndexUsageProbe(
+                name='get_messages.before',
+                filter={'$and': [{'chat_oid': ''}, _build_cursor_filter(PROBE_CURSOR, '$lt')]},
+                sort=MESSAGES_COLLECTION_REVERSED_SORT,
+            ),
+            IndexUsageProbe(
+                name='get_messages.after',
+                filter={'$and': [{'chat_oid': ''}, _build_cursor_filter(PROBE_CURSOR, '$gt')]},
+                sort=MESSAGES_COLLECTION_SORT,
+            ),
+            IndexUsageProbe(name='outbox', filter=PENDING_FILTER, sort=[(f'{OUTBOX_FIELD}.occurred_at', ASCENDING)]),
+        ]
+
+    async def add_message(self, chat_oid: str, message: Message, events: Iterable[BaseEvent] = ()) -> None:
+        message_document = convert_message_entity_to_collection_document(chat_oid=chat_oid, message=message)
+        if outbox := convert_events_to_documents(events):
+            message_document[OUTBOX_FIELD] = outbox  # события - в том же документе, одной записью с сообщением
+
+        await self._write_collection.insert_one(message_document)
+
+    async def add_messages(self, chat_oid: str, messages: Sequence[Message], events: Iterable[BaseEvent] = ()) -> None:
+        messages_documents = [
+            convert_message_entity_to_collection_document(chat_oid=chat_oid, message=message) for message in messages
+        ]
+        if not messages_documents:
+            return
+
+        # событие сообщения - в документ этого сообщения: оно уходит, только если сохранилось само сообщение,
+        # и relay опубликует события уже сохраненных сообщений, даже если вставка оборвалась посреди пачки.
+        # события не про сообщения пачки - в последний документ (при ordered-вставке он пишется последним)
+        documents_by_oid = {document['oid']: document for document in messages_documents}
+        for event in events:
+            document = documents_by_oid.get(getattr(event, 'message_oid', None), messages_documents[-1])
+            document.setdefault(OUTBOX_FIELD, []).append(convert_event_to_document(event))
+
+        await self._write_collection.insert_many(messages_documents, ordered=True)
+
+    async def get_messages(self, chat_oid: str, filters: GetMessagesFilters) -> list[Message]:
+        """
+        Range-запрос по индексу (chat_oid, created_at, oid): монга читает ровно limit документов
+        с нужной стороны курсора, сколько бы сообщений ни было в чате.
+        """
+        conditions = [{'chat_oid': chat_oid}]
+        if filters.before:
+            conditions.append(_build_cursor_filter(filters.before, '$lt'))
+        if filters.after:
+            conditions.append(_build_cursor_filter(filters.after, '$gt'))
+
+        # after - идем вперед от курсора, иначе - назад от курсора (или от конца истории)
+        sort = MESSAGES_COLLECTION_SORT if filters.after else MESSAGES_COLLECTION_REVERSED_SORT
+        documents = await self._read_collection.find(
+            filter={'$and': conditions},
+            projection=MESSAGE_DOCUMENT_PROJECTION,
+        ).sort(sort).limit(filters.limit).to_list(length=filters.limit)
+
+        if not filters.after:
+            documents.reverse()
+
+        return decode_messages(documents)
+
+    async def iter_messages(self, chat_oid: str, batch_size: int = 1000) -> AsyncIterator[list[Message]]:
+        """
+        Один курсор по индексу (chat_oid, created_at, oid): монга отдает документы пачками по batch_size,
+        следующая пачка запрашивается, только когда предыдущую забрали.
+        """
+        cursor = self._read_collection.find(
+            filter={'chat_oid': chat_oid},
+            projection=MESSAGE_DOCUMENT_PROJECTION,
+        ).sort(MESSAGES_COLLECTION_SORT).batch_size(batch_size)
+
+        try:
+            while documents := await cursor.to_list(length=batch_size):
+                yield decode_messages(documents)
+        finally:
+            # экспорт могли прервать (клиент отключился) - курсор на сервере закрываем сразу
+            await cursor.close()
@@ -0,0 +1,163 @@
+import time
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Iterable
+
+from domain.entities.messages import Message
+from domain.values.messages import Text
+from infra.repositories.cache import CacheStats
+from infra.repositories.filters.messages import GetMessagesFilters
+
+# сообщение в буфере - кортеж, он же ключ сортировки истории: (created_at, oid, text)
+CompactMessage = tuple[datetime, str, str]
+
+# примерная цена хранения сообщения сверх самого текста: кортеж, datetime, строка oid
+COMPACT_MESSAGE_OVERHEAD = 200
+
+
+@dataclass(eq=False)
+class RecentMessages:
+    """
+    Хвост истории одного чата по порядку. complete - в буфере вся история чата (старше сообщений нет).
+    seeded=False - буфер только копит события, пока его заполняют из хранилища, отдавать из него еще нельзя.
+    seeded_at - когда буфер заполнили из хранилища (по часам буфера).
+    """
+    items: list[CompactMessage] = field(default_factory=list)
+    oids: set[str] = field(default_factory=set)
+    complete: bool = False
+    seeded: bool = False
+    seeded_at: float = 0.0
+    size: int = 0
+
+
+@dataclass(eq=False)
+class RecentMessagesBuffer:
+    """
+    Последние capacity сообщений активных чатов в памяти процесса - для самых частых запросов истории
+    ("последние N сообщений") без обращения к монге.
+
+    - пополняется событиями NewMessageReceivedEvent (add_message), дубли по oid отбрасываются;
+    - заполняется из хранилища при первом чтении чата (reserve + seed): события, пришедшие во время
+      чтения, не теряются - reserve создает буфер заранее;
+    - общий объем ограничен max_bytes (оценка по длине текстов): вытесняется целиком чат,
+      который дольше всех не читали и не пополняли;
+    - get_messages отдает страницу с той же семантикой, что и BaseMessagesRepository.get_messages,
+      или None, если страница выходит за пределы буфера - тогда нужно идти в хранилище;
+    - сообщения других процессов приходят с задержкой relay и брокера, а потерянное событие оставило бы
+      в буфере дыру - поэтому чат отдается из буфера не дольше ttl секунд после заполнения, потом буфер
+      чата сбрасывается и заполняется из хранилища заново (ttl=None - без срока).
+    """
+    capacity: int = 100
+    max_bytes: int = 64 * 1024 * 1024
+    ttl: float | None = field(default=None, kw_only=True)
+    clock: Callable[[], float] = field(default=time.monotonic, kw_only=True)
+    stats: CacheStats = field(default_factory=CacheStats, kw_only=True)
+
+    _chats: OrderedDict[str, RecentMessages] = field(default_factory=OrderedDict, init=False, repr=False)
+    _size: int = field(default=0, init=False, repr=False)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def can_serve(self, limit: int) -> bool:
+        return 0 < limit <= self.capacity
+
+    def is_seeded(self, chat_oid: str) -> bool:
+        chat = self._chats.get(chat_oid)
+        return chat is not None and chat.seeded
+
+    def reserve(self, chat_oid: str) -> None:
+        if chat_oid not in self._chats:
+            self._chats[chat_oid] = RecentMessages()
+
+    def seed(self, chat_oid: str, messages: Iterable[Message], complete: bool) -> None:
+        """
+        messages - последние сообщения чата из хранилища (по порядку); complete - старше них в чате ничего нет.
+        """
+        self.reserve(chat_oid)
+        chat = self._chats[chat_oid]
+        for message in messages:
+            self._add(chat, message)
+
+        chat.complete = chat.complete or complete
+        chat.seeded = True
+        chat.seeded_at = self.clock()
+        self._touch(chat_oid)
+
+    def add_message(self, chat_oid: str, message: Message) -> None:
+        # чаты, которые никто не читает, не заводим - их буфер заполнится при первом чтении
+        chat = self._chats.get(chat_oid)
+        if chat is None:
+            return
+
+        self._add(chat, message)
+        self._touch(chat_oid)
+
+    def drop(self, chat_oid: str) -> None:
+        chat = self._chats.pop(chat_oid, None)
+        if chat is not None:
+            self._size -= chat.size
+
+    def get_messages(self, chat_oid: str, filters: GetMessagesFilters) -> list[Message] | None:
+        chat = self._chats.get(chat_oid)
+        if chat is not None and chat.seeded and self.ttl is not None and self.clock() - chat.seeded_at >= self.ttl:
+            # буфер чата устарел - следующее чтение последних сообщений заполнит его из хранилища заново
+            self.drop(chat_oid)
+            chat = None
+        page = self._get_page(chat, filters) if chat is not None and chat.seeded else None
+        if page is None:
+            self.stats.misses += 1
+            return None
+
+        self.stats.hits += 1
+        self._chats.move_to_end(chat_oid)
+        return [
+            Message(oid=oid, created_at=created_at, text=Text.from_trusted(text))
+            for created_at, oid, text in page
+        ]
+
+    def _get_page(self, chat: RecentMessages, filters: GetMessagesFilters) -> list[CompactMessage] | None:
+        items = chat.items
+        if filters.after:
+            after = bisect_right(items, (filters.after.created_at, filters.after.oid, chr(0x10FFFF)))
+            # буфер - непрерывный хвост истории: все, что новее курсора внутри буфера, в нем есть
+            if not chat.complete and after == 0:
+                return None
+            return items[after:after + filters.limit]
+
+        end = bisect_left(items, (filters.before.created_at, filters.before.oid)) if filters.before else len(items)
+        if end < filters.limit and not chat.complete:
+            return None
+        return items[max(end - filters.limit, 0):end]
+
+    def _add(self, chat: RecentMessages, message: Message) -> None:
+        if message.oid in chat.oids:
+            return
+
+        text = message.text.as_generic_type()
+        # монга хранит время с точностью до миллисекунд - так же и здесь, иначе курсоры из буфера
+        # и из монги сравнивались бы по-разному
+        created_at = message.created_at.replace(microsecond=message.created_at.microsecond // 1000 * 1000)
+        insort(chat.items, (created_at, message.oid, text))
+        chat.oids.add(message.oid)
+        self._resize(chat, len(text) + COMPACT_MESSAGE_OVERHEAD)
+
+        if len(chat.items) > self.capacity:
+            _, oid, evicted_text = chat.items.pop(0)
+            chat.oids.discard(oid)
+            chat.complete = False
+            self._resize(chat, -(len(evicted_text) + COMPACT_MESSAGE_OVERHEAD))
+
+    def _resize(self, chat: RecentMessages, delta: int) -> None:
+        chat.size += delta
+        self._size += delta
+
+    def _touch(self, chat_oid: str) -> None:
+        self._chats.move_to_end(chat_oid)
+        while self._size > self.max_bytes and len(self._chats) > 1:
+            _, evicted = self._chats.popitem(last=False)
+            self._size -= evicted.size
+            self.stats.evictions += 1
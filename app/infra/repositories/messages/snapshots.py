@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+import bson
+
+from domain.entities.messages import Chat, Message
+from domain.events.base import BaseEvent
+from domain.values.messages import Title
+from infra.repositories.messages.codecs import decode_messages, encode_message
+from infra.repositories.messages.converters import convert_chat_entity_to_document
+from infra.repositories.messages.memory import MemoryStorage
+from infra.repositories.outbox.converters import convert_document_to_event, convert_event_to_document
+from infra.repositories.outbox.memory import MemoryOutboxRepository
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+# сообщения чата пишутся записями по столько штук - запись BSON не может быть больше 16MB
+SNAPSHOT_MESSAGES_PER_RECORD = 1000
+
+
+@dataclass(eq=False)
+class MemorySnapshotter:
+    """
+    Снимок memory-хранилища (чаты, история, неопубликованный outbox) в файл и восстановление из него -
+    чтобы одноузловой запуск без монги (STORAGE_BACKEND=memory) переживал перезапуск.
+
+    Файл - последовательность BSON-документов в тех же форматах, что и в монге (converters/codecs),
+    пишется во временный файл и подменяет старый атомарно (os.replace) - оборванная запись не портит снимок.
+    save() снимает копии списков в цикле событий, а кодирует и пишет в отдельном потоке.
+    Потеряется то, что записано после последнего снимка (interval секунд, 0 - снимок только при остановке).
+    """
+    storage: MemoryStorage
+    outbox: MemoryOutboxRepository
+    path: str
+    interval: float = field(default=60, kw_only=True)
+
+    def load(self) -> bool:
+        """
+        :return: False, если снимка еще нет
+        """
+        if not Path(self.path).exists():
+            return False
+
+        self.storage.clear()
+        events: list[BaseEvent] = []
+        with open(self.path, 'rb') as snapshot:
+            for record in bson.decode_file_iter(snapshot):
+                kind = record.pop('kind')
+                if kind == 'chat':
+                    self.storage.add_chat(Chat(
+                        title=Title.from_trusted(record['title']),
+                        oid=record['oid'],
+                        created_at=record['created_at'],
+                    ))
+                elif kind == 'messages':
+                    self.storage.add_messages(record['chat_oid'], decode_messages(record['messages']))
+                elif kind == 'event':
+                    events.append(convert_document_to_event(record))
+                elif kind == 'header' and record['version'] != SNAPSHOT_VERSION:
+                    raise ValueError(f'unsupported memory snapshot version: {record["version"]}')
+
+        self.outbox.add_events(events)
+        return True
+
+    async def save(self) -> None:
+        chats = list(self.storage.chats.values())
+        messages = {chat_oid: list(chat_messages) for chat_oid, chat_messages in self.storage.messages.items()}
+        events = self.outbox.get_all_pending_events()
+
+        await asyncio.to_thread(self._write, chats, messages, events)
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.save()
+            except Exception:
+                logger.exception('failed to save memory snapshot to %s', self.path)
+
+    def _write(self, chats: list[Chat], messages: dict[str, list[Message]], events: list[BaseEvent]) -> None:
+        temporary_path = f'{self.path}.tmp'
+        with open(temporary_path, 'wb') as snapshot:
+            snapshot.write(bson.encode({'kind': 'header', 'version': SNAPSHOT_VERSION, 'created_at': datetime.now()}))
+            for chat in chats:
+                snapshot.write(bson.encode({'kind': 'chat', **convert_chat_entity_to_document(chat, embed_messages=False)}))
+            for chat_oid, chat_messages in messages.items():
+                for start in range(0, len(chat_messages), SNAPSHOT_MESSAGES_PER_RECORD):
+                    snapshot.write(bson.encode({
+                        'kind': 'messages',
+                        'chat_oid': chat_oid,
+                        'messages': [
+                            encode_message(message)
+                            for message in chat_messages[start:start + SNAPSHOT_MESSAGES_PER_RECORD]
+                        ],
+                    }))
+            for event in events:
+                snapshot.write(bson.encode({'kind': 'event', **convert_event_to_document(event)}))
+
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+
+        os.replace(temporary_path, self.path)
@@ -0,0 +1,36 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Iterable
+
+from domain.events.base import BaseEvent
+
+
+@dataclass
+class BaseOutboxRepository(ABC):
+    """
+    Outbox - события агрегатов, сохраненные той же записью, что и само изменение агрегата
+    (add_chat / add_message с events). Отсюда их забирает OutboxRelay и отдает в шину событий.
+    Доставка "хотя бы один раз": событие помечается опубликованным только после публикации.
+    """
+
+    @abstractmethod
+    async def get_pending_events(self, limit: int) -> list[BaseEvent]:
+        """
+        Неопубликованные события в порядке их появления (не больше limit).
+        """
+        pass
+
+    @abstractmethod
+    async def mark_published(self, events: Iterable[BaseEvent]) -> None:
+        """
+        events - события, полученные из get_pending_events этого же репозитория.
+        """
+        pass
+
+    async def acquire_relay_lease(self, owner: str, ttl: float) -> bool:
+        """
+        Право публиковать события на ttl секунд (продлевается тем же owner). Публикует только один relay -
+        иначе процессы, опрашивающие outbox одновременно, публиковали бы одни и те же события повторно
+        и в разном порядке. По умолчанию outbox живет в памяти одного процесса - право всегда у него.
+        """
+        return True
@@ -0,0 +1,40 @@
+from dataclasses import asdict
+from datetime import datetime
+from typing import Any, Mapping
+from uuid import UUID
+
+from domain.events.base import BaseEvent
+from domain.events.messages import NewChatCreatedEvent, NewMessageReceivedEvent
+
+# события, которые агрегаты кладут в outbox - по имени класса поднимаем событие обратно
+OUTBOX_EVENT_TYPES: dict[str, type[BaseEvent]] = {
+    event_type.__name__: event_type
+    for event_type in (NewChatCreatedEvent, NewMessageReceivedEvent)
+}
+
+
+def convert_event_to_document(event: BaseEvent) -> dict:
+    payload = asdict(event)
+    event_id = payload.pop('event_id')
+    occurred_at = payload.pop('occurred_at')
+
+    return {
+        'event_id': str(event_id),
+        'event_type': event.__class__.__name__,
+        'payload': payload,
+        'occurred_at': occurred_at,
+    }
+
+
+def convert_events_to_documents(events) -> list[dict]:
+    return [convert_event_to_document(event) for event in events]
+
+
+def convert_document_to_event(event_document: Mapping[str, Any]) -> BaseEvent:
+    event_type = OUTBOX_EVENT_TYPES[event_document['event_type']]
+    return event_type(
+        event_id=UUID(event_document['event_id']),
+        # в записях до появления occurred_at у события его нет - считаем, что событие произошло сейчас
+        occurred_at=event_document.get('occurred_at') or datetime.now(),
+        **event_document['payload'],
+    )
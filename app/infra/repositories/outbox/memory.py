@@ -0,0 +1,26 @@
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from domain.events.base import BaseEvent
+from infra.repositories.outbox.base import BaseOutboxRepository
+
+
+@dataclass
+class MemoryOutboxRepository(BaseOutboxRepository):
+    _events: list[BaseEvent] = field(
+        default_factory=list,
+        kw_only=True
+    )
+
+    def add_events(self, events: Iterable[BaseEvent]) -> None:
+        self._events.extend(events)
+
+    def get_all_pending_events(self) -> list[BaseEvent]:
+        return list(self._events)
+
+    async def get_pending_events(self, limit: int) -> list[BaseEvent]:
+        return self._events[:limit]
+
+    async def mark_published(self, events: Iterable[BaseEvent]) -> None:
+        published_ids = {event.event_id for event in events}
+        self._events = [event for event in self._events if event.event_id not in published_ids]
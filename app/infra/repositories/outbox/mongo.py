@@ -0,0 +1,128 @@
+from dataclasses import dataclass, field
+from typing import Any, Iterable
+
+from motor.core import AgnosticClient
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import DuplicateKeyError
+
+from domain.events.base import BaseEvent
+from infra.repositories.outbox.base import BaseOutboxRepository
+from infra.repositories.outbox.converters import convert_document_to_event
+
+OUTBOX_FIELD = 'outbox'
+PENDING_FILTER = {OUTBOX_FIELD: {'$exists': True}}
+# частичный индекс только по документам с неопубликованными событиями - поиск не зависит от размера коллекции
+OUTBOX_PENDING_INDEX = IndexModel(
+    [(f'{OUTBOX_FIELD}.occurred_at', ASCENDING)],
+    name='outbox_pending',
+    partialFilterExpression=PENDING_FILTER,
+)
+RELAY_LEASE_ID = 'outbox_relay'
+
+
+@dataclass
+class MongoDBOutboxRepository(BaseOutboxRepository):
+    """
+    События лежат массивом outbox прямо в документах агрегатов (чаты, сообщения): без транзакций
+    (standalone монга их не умеет) только запись в один документ атомарна, поэтому событие пишется
+    тем же insert_one / update_one, что и изменение. Когда все события документа опубликованы -
+    поле outbox удаляется и документ выпадает из частичного индекса OUTBOX_PENDING_INDEX.
+
+    mongo_db_collection_names - коллекции, в которые репозитории пишут события (порядок важен:
+    чаты раньше сообщений, что б NewChatCreatedEvent уходил раньше сообщений этого чата).
+    get_pending_events запоминает _id документов выданных событий - mark_published обновляет
+    документы по _id, а не ищет их по event_id полным сканом.
+    Право публиковать (acquire_relay_lease) - документ в mongo_db_leases_collection_name.
+    """
+    mongo_db_client: AgnosticClient
+    mongo_db_db_name: str
+    mongo_db_collection_names: tuple[str, ...]
+    mongo_db_leases_collection_name: str = field(default='outbox_leases', kw_only=True)
+
+    # event_id -> (коллекция, _id документа) выданных и еще не опубликованных событий
+    _locations: dict[str, tuple[str, Any]] = field(default_factory=dict, init=False, repr=False)
+
+    def _collections(self):
+        database = self.mongo_db_client[self.mongo_db_db_name]
+        return [
+            (collection_name, database[collection_name])
+            for collection_name in dict.fromkeys(self.mongo_db_collection_names)
+        ]
+
+    async def get_pending_events(self, limit: int) -> list[BaseEvent]:
+        """
+        limit - на число событий, а не документов: в документе "горячего" чата могут копиться тысячи
+        неопубликованных событий, пачка все равно не больше limit. Остальные события документа
+        остаются в outbox до следующей пачки.
+        """
+        events = []
+        for collection_name, collection in self._collections():
+            remaining = limit - len(events)
+            if remaining <= 0:
+                break
+
+            cursor = collection.find(
+                filter=PENDING_FILTER,
+                # с сервера приходит не больше событий документа, чем осталось места в пачке
+                projection={'_id': 1, OUTBOX_FIELD: {'$slice': remaining}},
+            ).sort(f'{OUTBOX_FIELD}.occurred_at', ASCENDING).limit(remaining)
+            try:
+                async for document in cursor:
+                    for event_document in document[OUTBOX_FIELD][:limit - len(events)]:
+                        events.append(convert_document_to_event(event_document))
+                        self._locations[event_document['event_id']] = (collection_name, document['_id'])
+
+                    if len(events) >= limit:
+                        break
+            finally:
+                await cursor.close()
+
+        return events
+
+    async def mark_published(self, events: Iterable[BaseEvent]) -> None:
+        document_ids: dict[str, set] = {}
+        event_ids = []
+        for event in events:
+            event_id = str(event.event_id)
+            location = self._locations.pop(event_id, None)
+            if location is not None:
+                collection_name, document_id = location
+                document_ids.setdefault(collection_name, set()).add(document_id)
+                event_ids.append(event_id)
+
+        for collection_name, collection in self._collections():
+            ids = list(document_ids.get(collection_name, ()))
+            if not ids:
+                continue
+
+            # оба обновления - по _id: только документы пачки, без скана коллекции
+            await collection.update_many(
+                filter={'_id': {'$in': ids}},
+                update={'$pull': {OUTBOX_FIELD: {'event_id': {'$in': event_ids}}}},
+            )
+            # пустой outbox убираем, если за это время в документ не дописали новых событий
+            await collection.update_many(
+                filter={'_id': {'$in': ids}, OUTBOX_FIELD: {'$size': 0}},
+                update={'$unset': {OUTBOX_FIELD: ''}},
+            )
+
+    async def acquire_relay_lease(self, owner: str, ttl: float) -> bool:
+        """
+        Право у owner, если он его уже держит или срок прежнего владельца истек. Время - часы монги ($$NOW),
+        а не процессов: расхождение часов узлов не дает двум relay работать одновременно.
+        """
+        leases = self.mongo_db_client[self.mongo_db_db_name][self.mongo_db_leases_collection_name]
+        try:
+            await leases.update_one(
+                filter={
+                    '_id': RELAY_LEASE_ID,
+                    '$or': [{'owner': owner}, {'$expr': {'$lt': ['$expires_at', '$$NOW']}}],
+                },
+                update=[{'$set': {'owner': owner, 'expires_at': {'$add': ['$$NOW', int(ttl * 1000)]}}}],
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # документ есть, но фильтр не совпал - право у другого живого relay, upsert уперся в _id
+            return False
+
+        return True
@@ -0,0 +1,57 @@
+from dataclasses import dataclass
+
+from pymongo import ReadPreference
+from pymongo.read_preferences import _ServerMode
+from pymongo.write_concern import WriteConcern
+
+# имена режимов - как в connection string монги (readPreference=...)
+READ_PREFERENCES: dict[str, _ServerMode] = {
+    'primary': ReadPreference.PRIMARY,
+    'primaryPreferred': ReadPreference.PRIMARY_PREFERRED,
+    'secondary': ReadPreference.SECONDARY,
+    'secondaryPreferred': ReadPreference.SECONDARY_PREFERRED,
+    'nearest': ReadPreference.NEAREST,
+}
+
+
+@dataclass(frozen=True)
+class MongoOperationProfile:
+    """
+    Read preference и write concern одного класса операций (создание чата, запись сообщений, чтение истории).
+    None - настройка клиента (connection string), коллекция берется как есть.
+    """
+    read_preference: _ServerMode | None = None
+    write_concern: WriteConcern | None = None
+
+    def apply(self, collection):
+        if self.read_preference is None and self.write_concern is None:
+            return collection
+
+        return collection.with_options(read_preference=self.read_preference, write_concern=self.write_concern)
+
+
+DEFAULT_OPERATION_PROFILE = MongoOperationProfile()
+
+
+def build_operation_profile(
+        read_preference: str | None = None,
+        write_concern: str | None = None,
+        journal: bool | None = None,
+) -> MongoOperationProfile:
+    """
+    Профиль из настроек: read_preference - имя режима (secondaryPreferred, ...),
+    write_concern - w ("majority", имя тега или число узлов), journal - ждать ли записи в журнал.
+    Неизвестное значение - ValueError на старте, а не на первом запросе.
+    """
+    if read_preference is not None and read_preference not in READ_PREFERENCES:
+        raise ValueError(f'unknown read preference: {read_preference}')
+
+    concern = None
+    if write_concern is not None or journal is not None:
+        w = int(write_concern) if write_concern is not None and write_concern.isdigit() else write_concern
+        concern = WriteConcern(w=w, j=journal)
+
+    return MongoOperationProfile(
+        read_preference=READ_PREFERENCES.get(read_preference) if read_preference is not None else None,
+        write_concern=concern,
+    )
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+
+from infra.message_brokers.base import BaseMessageBroker, BaseMessageConsumer
+from infra.websockets.managers import BaseConnectionManager
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(eq=False)
+class BaseWebSocketsBackplane(ABC):
+    """
+    Шина рассылки между процессами (узлами) API: сообщение, принятое одним узлом, доходит до веб-сокетов,
+    которые держат другие. Узел подписывается только на чаты, у которых есть локальные слушатели,
+    и раздает полученное своему connection_manager. payload сериализуется один раз - при публикации.
+    """
+    connection_manager: BaseConnectionManager
+
+    @abstractmethod
+    async def start(self) -> None:
+        pass
+
+    @abstractmethod
+    async def close(self) -> None:
+        pass
+
+    @abstractmethod
+    async def subscribe(self, key: str) -> None:
+        pass
+
+    @abstractmethod
+    async def unsubscribe(self, key: str) -> None:
+        pass
+
+    @abstractmethod
+    async def publish(self, key: str, payload: str) -> None:
+        pass
+
+
+@dataclass(eq=False)
+class MemoryWebSocketsBus:
+    """
+    Общая для узлов "сеть" memory-бэкплейна: кто на какой чат подписан.
+    """
+    subscribers: dict[str, set['MemoryWebSocketsBackplane']] = field(default_factory=dict)
+
+
+@dataclass(eq=False)
+class MemoryWebSocketsBackplane(BaseWebSocketsBackplane):
+    """
+    Бэкплейн внутри одного процесса (один узел или несколько узлов в тестах на общей шине bus).
+    Сообщение получают только узлы, подписанные на чат.
+    """
+    bus: MemoryWebSocketsBus = field(default_factory=MemoryWebSocketsBus, kw_only=True)
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        for key in [key for key, nodes in self.bus.subscribers.items() if self in nodes]:
+            await self.unsubscribe(key)
+
+    async def subscribe(self, key: str) -> None:
+        self.bus.subscribers.setdefault(key, set()).add(self)
+
+    async def unsubscribe(self, key: str) -> None:
+        nodes = self.bus.subscribers.get(key)
+        if nodes is None:
+            return
+
+        nodes.discard(self)
+        if not nodes:
+            del self.bus.subscribers[key]
+
+    async def publish(self, key: str, payload: str) -> None:
+        for node in list(self.bus.subscribers.get(key, ())):
+            await node.connection_manager.send_all(key=key, payload=payload)
+
+
+@dataclass(eq=False)
+class KafkaWebSocketsBackplane(BaseWebSocketsBackplane):
+    """
+    Транспорт - один общий топик kafka с ключом chat_oid. Каждый узел читает его своим консьюмером вне группы
+    (все партиции, с конца - как отдельная группа на узел, но без офсетов, которые остались бы после узла)
+    и отбрасывает сообщения чатов без локальных слушателей по ключу - до декодирования payload.
+    """
+    message_broker: BaseMessageBroker
+    message_consumer: BaseMessageConsumer
+    topic: str
+    max_records: int = field(default=500, kw_only=True)
+    fetch_timeout: float = field(default=0.5, kw_only=True)
+
+    _subscriptions: set[bytes] = field(default_factory=set, init=False, repr=False)
+    _listener: asyncio.Task | None = field(default=None, init=False, repr=False)
+
+    async def start(self) -> None:
+        await self.message_consumer.start()
+        self._listener = asyncio.create_task(self._listen())
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+
+        self._subscriptions.clear()
+        await self.message_consumer.close()
+
+    async def subscribe(self, key: str) -> None:
+        self._subscriptions.add(key.encode())
+
+    async def unsubscribe(self, key: str) -> None:
+        self._subscriptions.discard(key.encode())
+
+    async def publish(self, key: str, payload: str) -> None:
+        await self.message_broker.send_message(topic=self.topic, value=payload.encode(), key=key.encode())
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                messages = await self.message_consumer.get_many(max_records=self.max_records, timeout=self.fetch_timeout)
+                for message in messages:
+                    # сообщение могло уйти до того, как узел отписался от чата
+                    if message.key in self._subscriptions:
+                        await self.connection_manager.send_all(key=message.key.decode(), payload=message.value.decode())
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('websockets backplane failed to deliver messages')
+                await asyncio.sleep(self.fetch_timeout)
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+
+from fastapi import WebSocket, status
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BaseConnectionManager(ABC):
+    """
+    Хаб веб-сокет соединений: подписчики сгруппированы по ключу (chat_oid).
+    """
+
+    @abstractmethod
+    def has_connections(self, key: str) -> bool:
+        pass
+
+    @abstractmethod
+    def count_connections(self) -> int:
+        """
+        Сколько всего соединений держит хаб (по всем ключам).
+        """
+        pass
+
+    @abstractmethod
+    async def accept_connection(self, websocket: WebSocket, key: str) -> None:
+        pass
+
+    @abstractmethod
+    async def remove_connection(self, websocket: WebSocket, key: str) -> None:
+        pass
+
+    @abstractmethod
+    async def send_all(self, key: str, payload: str) -> None:
+        """
+        payload уже сериализован - один раз на рассылку, а не на каждый сокет.
+        """
+        pass
+
+
+@dataclass(eq=False)
+class WebSocketConnection:
+    websocket: WebSocket
+    send_queue: asyncio.Queue[str]
+    sender: asyncio.Task | None = None
+
+
+@dataclass
+class ConnectionManager(BaseConnectionManager):
+    """
+    У каждого соединения своя очередь отправки на send_queue_size сообщений и своя задача-отправщик,
+    поэтому send_all только раскладывает payload по очередям и не ждет сеть. Если очередь клиента
+    переполнена (клиент не успевает читать), соединение закрывается с кодом 1013 (try again later) -
+    клиент переподключится и догрузит историю через REST, а остальные участники чата его не ждут.
+    """
+    send_queue_size: int = field(default=100, kw_only=True)
+
+    connections_map: dict[str, dict[WebSocket, WebSocketConnection]] = field(
+        default_factory=dict,
+        init=False,
+        repr=False,
+    )
+    _closing_tasks: set[asyncio.Task] = field(default_factory=set, init=False, repr=False)
+
+    def has_connections(self, key: str) -> bool:
+        return key in self.connections_map
+
+    def count_connections(self) -> int:
+        return sum(len(connections) for connections in self.connections_map.values())
+
+    async def accept_connection(self, websocket: WebSocket, key: str) -> None:
+        connection = WebSocketConnection(websocket=websocket, send_queue=asyncio.Queue(maxsize=self.send_queue_size))
+        connection.sender = asyncio.create_task(self._send_loop(connection, key))
+        self.connections_map.setdefault(key, {})[websocket] = connection
+
+    async def remove_connection(self, websocket: WebSocket, key: str) -> None:
+        connection = self._pop_connection(websocket, key)
+        if connection is not None:
+            connection.sender.cancel()
+
+    async def send_all(self, key: str, payload: str) -> None:
+        for connection in list(self.connections_map.get(key, {}).values()):
+            try:
+                connection.send_queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                logger.warning('websocket dropped: send queue is full (chat %s)', key)
+                self._drop_connection(connection, key)
+
+    def _pop_connection(self, websocket: WebSocket, key: str) -> WebSocketConnection | None:
+        connections = self.connections_map.get(key)
+        if not connections:
+            return None
+
+        connection = connections.pop(websocket, None)
+        if not connections:
+            # пустые комнаты не храним - has_connections отвечает по наличию ключа
+            del self.connections_map[key]
+        return connection
+
+    def _drop_connection(self, connection: WebSocketConnection, key: str) -> None:
+        self._pop_connection(connection.websocket, key)
+        connection.sender.cancel()
+
+        task = asyncio.create_task(self._close(connection.websocket))
+        self._closing_tasks.add(task)
+        task.add_done_callback(self._closing_tasks.discard)
+
+    async def _send_loop(self, connection: WebSocketConnection, key: str) -> None:
+        while True:
+            payload = await connection.send_queue.get()
+            try:
+                await connection.websocket.send_text(payload)
+            except Exception:
+                # клиент отвалился - эндпоинт тоже увидит disconnect, здесь просто перестаем слать
+                self._pop_connection(connection.websocket, key)
+                return
+
+    @staticmethod
+    async def _close(websocket: WebSocket) -> None:
+        try:
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        except Exception:
+            pass
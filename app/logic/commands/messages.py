@@ -3,10 +3,12 @@
 from dataclasses import dataclass
 
 from domain.entities.messages import Chat, Message
+from domain.exceptions.base import ApplicationException
 from domain.values.messages import Title, Text
 from infra.repositories.messages.base import BaseChatsRepository, BaseMessagesRepository
+from infra.repositories.messages.recent import RecentMessagesBuffer
 from logic.commands.base import BaseCommand, CommandHandler
-from logic.exceptions.messages import ChatWithThatTitleAlreadyExitsException, ChatNotFoundException
+from logic.exceptions.messages import ChatNotFoundException
 
 
 @dataclass(frozen=True)
@@ -31,18 +33,17 @@ class CreateChatCommandHandler(CommandHandler[CreateChatCommand, Chat]):
     #     if self.chat_repository.check_chat_exists_by_title(command.title):
     async def handle(self, command: CreateChatCommand) -> Chat:
         # if await self.chat_repository.check_chat_exists_by_title(command.title):
-        if await self.chats_repository.check_chat_exists_by_title(command.title):
-            raise ChatWithThatTitleAlreadyExitsException(command.title)
-
+        # отдельной проверки названия больше нет - add_chat сам кидает ChatWithThatTitleAlreadyExitsException
+        # (в монге это уникальный индекс), так проверка и вставка не могут разъехаться при гонке
         title = Title(value=command.title)
 
         # chat = Chat(title=title)
         # создадим класс в чате лучше на создание чата И РЕГИСТРАЦИЮ ИВЕНТА(что новый чат был создан)
         new_chat = Chat.create_chat(title=title)
 
-        # TODO: считать ивенты
         # await self.chat_repository.add_chat(new_chat)
-        await self.chats_repository.add_chat(new_chat)
+        # ивенты агрегата уходят в outbox той же записью, что и чат - дальше их доставит OutboxRelay
+        await self.chats_repository.add_chat(new_chat, events=new_chat.pull_events())
 
         # print("command.title", command.title)
 
@@ -63,9 +64,11 @@ class CreateMessageCommand(BaseCommand):
 class CreateMessageCommandHandler(CommandHandler[CreateMessageCommand, Message]):
     message_repository: BaseMessagesRepository
     chats_repository: BaseChatsRepository
+    recent_messages: RecentMessagesBuffer
 
     async def handle(self, command: CreateMessageCommand) -> Message:
-        chat = await self.chats_repository.get_chat_by_oid(oid=command.chat_oid)
+        # только метаданные чата - история не нужна, что б дописать одно сообщение
+        chat = await self.chats_repository.get_chat_metadata_by_oid(oid=command.chat_oid)
         if not chat:
             # если чат по айди н существует, то
             raise ChatNotFoundException(chat_oid=command.chat_oid)
@@ -76,6 +79,70 @@ class CreateMessageCommandHandler(CommandHandler[CreateMessageCommand, Message])
         chat.add_message(message=message)
 
         # 2. и записуем ее в месседж репозиторий (мемори, монго) (чат_айди и сам месседж)
-        await self.message_repository.add_message(chat_oid=command.chat_oid, message=message)
+        #    вместе с ивентами чата (NewMessageReceivedEvent) - в outbox той же записью
+        await self.message_repository.add_message(
+            chat_oid=command.chat_oid,
+            message=message,
+            events=chat.pull_events(),
+        )
+        # свой процесс видит сообщение сразу, остальные - по событию из брокера
+        self.recent_messages.add_message(chat_oid=command.chat_oid, message=message)
+
+        return message
+
+
+@dataclass(frozen=True)
+class BulkCreateMessagesCommand(BaseCommand):
+    chat_oid: str
+    texts: list[str]
+
+
+@dataclass(frozen=True)
+class BulkCreateMessageResult:
+    """
+    Результат по одному тексту пачки: либо созданное сообщение, либо ошибка валидации.
+    """
+    text: str
+    message: Message | None = None
+    error: str | None = None
+
+
+@dataclass(frozen=True)
+class BulkCreateMessagesCommandHandler(CommandHandler[BulkCreateMessagesCommand, list[BulkCreateMessageResult]]):
+    """
+    Пачка сообщений в один чат: чат загружается один раз, тексты валидируются за один проход,
+    все валидные сообщения пишутся одной записью (add_messages). Невалидный текст не валит пачку -
+    ошибка возвращается в его результате.
+    """
+    message_repository: BaseMessagesRepository
+    chats_repository: BaseChatsRepository
+    recent_messages: RecentMessagesBuffer
+
+    async def handle(self, command: BulkCreateMessagesCommand) -> list[BulkCreateMessageResult]:
+        chat = await self.chats_repository.get_chat_metadata_by_oid(oid=command.chat_oid)
+        if not chat:
+            raise ChatNotFoundException(chat_oid=command.chat_oid)
 
-        return message
\ No newline at end of file
+        results = []
+        messages = []
+        for text in command.texts:
+            try:
+                message = Message(text=Text(value=text))
+            except ApplicationException as exception:
+                results.append(BulkCreateMessageResult(text=text, error=exception.message))
+                continue
+
+            chat.add_message(message=message)
+            messages.append(message)
+            results.append(BulkCreateMessageResult(text=text, message=message))
+
+        if messages:
+            await self.message_repository.add_messages(
+                chat_oid=command.chat_oid,
+                messages=messages,
+                events=chat.pull_events(),
+            )
+            for message in messages:
+                self.recent_messages.add_message(chat_oid=command.chat_oid, message=message)
+
+        return results
@@ -0,0 +1,196 @@
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from zlib import crc32
+
+from infra.message_brokers.base import BaseMessageConsumer, BrokerMessage
+from infra.message_brokers.converters import convert_broker_message_to_event
+from logic.mediator import Mediator
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(eq=False)
+class PartitionOffsets:
+    """
+    Офсеты одной партиции, которые сейчас в работе. Сообщения партиции обрабатываются разными воркерами
+    и завершаются не по порядку, поэтому коммитить можно только до первого незавершенного сообщения.
+    """
+    _in_flight: deque[int] = field(default_factory=deque, init=False)
+    _done: set[int] = field(default_factory=set, init=False)
+    committable: int | None = field(default=None, init=False)
+
+    def add(self, offset: int) -> None:
+        self._in_flight.append(offset)
+
+    def mark_done(self, offset: int) -> None:
+        self._done.add(offset)
+        while self._in_flight and self._in_flight[0] in self._done:
+            finished = self._in_flight.popleft()
+            self._done.discard(finished)
+            self.committable = finished + 1
+
+
+@dataclass(eq=False)
+class EventsConsumer:
+    """
+    Читает события из брокера и публикует их через Mediator.publish_event пулом из workers воркеров.
+
+    - порядок: сообщение попадает к воркеру по хэшу ключа (chat_oid), у воркера очередь FIFO -
+      события одного чата обрабатываются строго по очереди, разные чаты и партиции - параллельно;
+    - ограничение работы в полете: у каждого воркера очередь на queue_size сообщений; если очередь
+      заполнена, партиция сообщения ставится на паузу (брокер перестает ее выбирать) и возобновляется,
+      только когда все переполненные ею очереди разобраны до половины;
+    - офсеты коммитятся пачкой раз в commit_interval секунд и только после успешной обработки
+      (at-least-once). Сообщение, на котором обработчик упал max_retries раз подряд, пишется в лог
+      и пропускается, чтобы не блокировать партицию.
+    """
+    consumer: BaseMessageConsumer
+    mediator: Mediator
+    workers: int = field(default=16, kw_only=True)
+    queue_size: int = field(default=100, kw_only=True)
+    max_records: int = field(default=500, kw_only=True)
+    fetch_timeout: float = field(default=0.5, kw_only=True)
+    commit_interval: float = field(default=1.0, kw_only=True)
+    max_retries: int = field(default=3, kw_only=True)
+    retry_delay: float = field(default=0.1, kw_only=True)
+
+    _queues: list[asyncio.Queue[BrokerMessage]] = field(default_factory=list, init=False, repr=False)
+    _offsets: dict[tuple[str, int], PartitionOffsets] = field(default_factory=dict, init=False, repr=False)
+    _committed: dict[tuple[str, int], int] = field(default_factory=dict, init=False, repr=False)
+    # партиция на паузе -> очереди воркеров, которые ее держат
+    _blocked: dict[tuple[str, int], set[asyncio.Queue]] = field(default_factory=dict, init=False, repr=False)
+    _stopping: asyncio.Event = field(default_factory=asyncio.Event, init=False, repr=False)
+
+    def stop(self) -> None:
+        """
+        Мягкая остановка: run() перестает читать новые сообщения, дорабатывает очереди и коммитит офсеты.
+        """
+        self._stopping.set()
+
+    async def run(self) -> None:
+        self._stopping.clear()
+        self._queues = [asyncio.Queue(maxsize=self.queue_size) for _ in range(self.workers)]
+        self._blocked.clear()
+        worker_tasks = [asyncio.create_task(self._work(queue)) for queue in self._queues]
+        commit_task = asyncio.create_task(self._commit_periodically())
+
+        try:
+            while not self._stopping.is_set():
+                messages = await self.consumer.get_many(max_records=self.max_records, timeout=self.fetch_timeout)
+                await self._dispatch(messages)
+
+            for queue in self._queues:
+                await queue.join()
+        finally:
+            for task in (*worker_tasks, commit_task):
+                task.cancel()
+            await asyncio.gather(*worker_tasks, commit_task, return_exceptions=True)
+            await self.commit()
+
+    async def commit(self) -> None:
+        offsets = {
+            partition: partition_offsets.committable
+            for partition, partition_offsets in self._offsets.items()
+            if partition_offsets.committable is not None
+            and partition_offsets.committable != self._committed.get(partition)
+        }
+        if not offsets:
+            return
+
+        await self.consumer.commit(offsets)
+        self._committed.update(offsets)
+
+    async def _dispatch(self, messages: list[BrokerMessage]) -> None:
+        for message in messages:
+            partition = (message.topic, message.partition)
+            self._offsets.setdefault(partition, PartitionOffsets()).add(message.offset)
+
+            queue = self._queues[crc32(message.key or b'') % self.workers]
+            if queue.full():
+                # воркер не успевает - брокер не выбирает новые сообщения партиции, пока воркер не разгрузится
+                self._block(partition, queue)
+            await queue.put(message)
+
+    def _block(self, partition: tuple[str, int], queue: asyncio.Queue[BrokerMessage]) -> None:
+        queues = self._blocked.setdefault(partition, set())
+        if not queues:
+            self.consumer.pause([partition])
+        queues.add(queue)
+
+    def _unblock(self, queue: asyncio.Queue[BrokerMessage]) -> None:
+        """
+        Очередь разобрана до половины - снимаем паузу с партиций, которые больше ничем не держатся.
+        Порог ниже размера очереди, чтобы партиция не дергалась pause/resume на каждом сообщении.
+        """
+        if not self._blocked or queue.qsize() > self.queue_size // 2:
+            return
+
+        resumed = []
+        for partition, queues in self._blocked.items():
+            queues.discard(queue)
+            if not queues:
+                resumed.append(partition)
+        for partition in resumed:
+            del self._blocked[partition]
+
+        if resumed:
+            self.consumer.resume(resumed)
+
+    async def _work(self, queue: asyncio.Queue[BrokerMessage]) -> None:
+        while True:
+            message = await queue.get()
+            try:
+                await self._handle(message)
+                # при отмене посреди обработки офсет не считается обработанным - сообщение придет снова
+                self._offsets[(message.topic, message.partition)].mark_done(message.offset)
+            finally:
+                queue.task_done()
+                self._unblock(queue)
+
+    async def _handle(self, message: BrokerMessage) -> None:
+        try:
+            event = convert_broker_message_to_event(message.value)
+        except Exception:
+            logger.exception('malformed message skipped (%s:%s@%s)', message.topic, message.partition, message.offset)
+            return
+
+        if not self.mediator.has_event_handlers(event.__class__):
+            return
+
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                await self.mediator.publish_event([event])
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                if attempt == self.max_retries:
+                    logger.exception(
+                        'event %s skipped after %s attempts (%s:%s@%s)',
+                        event.event_id, attempt, message.topic, message.partition, message.offset,
+                    )
+                    return
+                await asyncio.sleep(self.retry_delay * attempt)
+
+    async def _commit_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.commit_interval)
+            try:
+                await self.commit()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('failed to commit consumer offsets')
+
+
+@dataclass(eq=False)
+class BroadcastEventsConsumer(EventsConsumer):
+    """
+    Консьюмер вне группы: каждый процесс сам читает весь поток (например, чтобы обновить свои кэши в памяти).
+    Офсеты не коммитятся - после перезапуска читаем с конца топика.
+    """
+
+    async def commit(self) -> None:
+        pass
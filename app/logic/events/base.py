@@ -16,5 +16,5 @@ class EventHandler(ABC, Generic[ET, ER]):
     Этот класс принимает событие и определяет, как его обработать.
     """
     @abstractmethod
-    def handle(self, event: ET) -> None:
+    async def handle(self, event: ET) -> ER:
         pass
@@ -1,16 +1,96 @@
 # app.logic.events.messages.py
-
+import json
 from dataclasses import dataclass
 
-from domain.events.base import BaseEvent
+# сами события - доменные (их регистрирует агрегат Chat), здесь они реэкспортируются для логики
+from domain.events.messages import NewChatCreatedEvent, NewMessageReceivedEvent  # noqa: F401
+from infra.message_brokers.base import BaseMessageBroker
+from infra.message_brokers.converters import convert_event_to_broker_message
+from domain.entities.messages import Message
+from domain.values.messages import Text
+from infra.repositories.messages.cached import CachedChatsRepository
+from infra.repositories.messages.recent import RecentMessagesBuffer
+from infra.websockets.backplanes import BaseWebSocketsBackplane
+from logic.events.base import EventHandler
+
+
+@dataclass(frozen=True)
+class NewMessageReceivedEventHandler(EventHandler[NewMessageReceivedEvent, None]):
+    """
+    Отправляет событие в брокер. Ключ - chat_oid: все сообщения чата попадают в одну партицию,
+    поэтому консьюмеры читают их в том же порядке.
+    """
+    message_broker: BaseMessageBroker
+    broker_topic: str
+
+    async def handle(self, event: NewMessageReceivedEvent) -> None:
+        await self.message_broker.send_message(
+            topic=self.broker_topic,
+            value=convert_event_to_broker_message(event),
+            key=event.chat_oid.encode(),
+        )
+
+
+@dataclass(frozen=True)
+class NewMessageReceivedWebSocketsEventHandler(EventHandler[NewMessageReceivedEvent, None]):
+    """
+    Рассылает новое сообщение подписчикам чата (/chat/{chat_oid}/ws) на всех узлах через бэкплейн.
+    Сообщение сериализуется один раз на рассылку - здесь: в консьюмере событий (kafka-бэкплейн)
+    или в relay процесса API (memory-бэкплейн).
+    """
+    backplane: BaseWebSocketsBackplane
+
+    async def handle(self, event: NewMessageReceivedEvent) -> None:
+        await self.backplane.publish(
+            key=event.chat_oid,
+            payload=json.dumps({'oid': event.message_oid, 'text': event.message_text, 'chat_oid': event.chat_oid}),
+        )
+
 
 @dataclass(frozen=True)
-class NewMessageReceivedEvent(BaseEvent):
-    message_text: str
-    message_oid: str
-    chat_oid: str
+class NewChatCreatedBrokerEventHandler(EventHandler[NewChatCreatedEvent, None]):
+    """
+    Отправляет событие создания чата в брокер (ключ - chat_oid): его читает слушатель событий каждого процесса API.
+    """
+    message_broker: BaseMessageBroker
+    broker_topic: str
+
+    async def handle(self, event: NewChatCreatedEvent) -> None:
+        await self.message_broker.send_message(
+            topic=self.broker_topic,
+            value=convert_event_to_broker_message(event),
+            key=event.chat_oid.encode(),
+        )
+
 
 @dataclass(frozen=True)
-class NewChatCreatedEvent(BaseEvent):
-    chat_oid: str
-    chat_title: str
+class NewChatCreatedEventHandler(EventHandler[NewChatCreatedEvent, None]):
+    """
+    Снимает из кэша чатов процесса negative-записи ("такого чата нет") для только что созданного чата.
+    Событие приходит из брокера - в каждый процесс API, включая тот, что создал чат.
+    """
+    chats_repository: CachedChatsRepository
+
+    async def handle(self, event: NewChatCreatedEvent) -> None:
+        self.chats_repository.invalidate(oid=event.chat_oid, title=event.chat_title)
+
+
+@dataclass(frozen=True)
+class NewMessageReceivedRecentMessagesEventHandler(EventHandler[NewMessageReceivedEvent, None]):
+    """
+    Дописывает новое сообщение в буфер последних сообщений процесса (если этот чат в нем есть).
+    """
+    recent_messages: RecentMessagesBuffer
+
+    async def handle(self, event: NewMessageReceivedEvent) -> None:
+        if event.message_created_at is None:
+            return
+
+        self.recent_messages.add_message(
+            chat_oid=event.chat_oid,
+            message=Message(
+                oid=event.message_oid,
+                created_at=event.message_created_at,
+                text=Text.from_trusted(event.message_text),
+            ),
+        )
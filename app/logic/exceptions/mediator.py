@@ -16,4 +16,29 @@ class CommandHandlersNotRegisteredException(LogicException):
     command_type: type
     @property
     def message(self):
-        return f"Not found command handlers for: {self.event_type}"
\ No newline at end of file
+        return f"Not found command handlers for: {self.command_type}"
+
+
+@dataclass(eq=False)
+class QueryHandlersNotRegisteredException(LogicException):
+    query_type: type
+    @property
+    def message(self):
+        return f"Not found query handler for: {self.query_type}"
+
+
+@dataclass(eq=False)
+class MediatorFrozenException(LogicException):
+    @property
+    def message(self):
+        return "Mediator is frozen, handlers can't be registered after startup"
+
+
+@dataclass(eq=False)
+class HandlerTimeoutException(LogicException):
+    handler_type: type
+    timeout: float
+
+    @property
+    def message(self):
+        return f"Handler {self.handler_type.__name__} did not finish in {self.timeout}s"
@@ -18,3 +18,17 @@ class ChatNotFoundException(LogicException):
     def message(self):
         return f"Chat with {self.chat_oid=} not found"  # синтаксис автоматически вставляет имя переменной вместе с её значением в строк
 
+
+@dataclass(eq=False)
+class InvalidMessagesCursorException(LogicException):
+    cursor: str
+    @property
+    def message(self):
+        return f"Invalid messages cursor: {self.cursor}"
+
+
+@dataclass(eq=False)
+class AmbiguousMessagesCursorException(LogicException):
+    @property
+    def message(self):
+        return "Only one of 'before' and 'after' cursors can be passed"
@@ -3,12 +3,37 @@ from functools import lru_cache
 from punq import Container, Scope  # Импорт контейнера для управления зависимостями
 
 from motor.motor_asyncio import AsyncIOMotorClient
+from infra.metrics.prometheus import PrometheusMetrics
 from infra.repositories.messages.base import BaseChatsRepository, BaseMessagesRepository
 
-from infra.repositories.messages.mongo import MongoDBChatsRepository, MongoDBMessagesRepository
+from infra.repositories.messages.cached import CachedChatsRepository
+from infra.repositories.messages.coalescing import CoalescingMessagesRepository
+from infra.repositories.messages.instrumented import InstrumentedChatsRepository, InstrumentedMessagesRepository
+from infra.repositories.messages.memory import MemoryChatsRepository, MemoryMessagesRepository, MemoryStorage
+from infra.repositories.messages.recent import RecentMessagesBuffer
+from infra.repositories.messages.snapshots import MemorySnapshotter
+from infra.repositories.messages.mongo import MongoDBChatsRepository, MongoDBMessagesRepository, \
+    MongoDBCollectionMessagesRepository
 from logic.commands.messages import CreateChatCommand, CreateChatCommandHandler, CreateMessageCommand, \
-    CreateMessageCommandHandler
+    CreateMessageCommandHandler, BulkCreateMessagesCommand, BulkCreateMessagesCommandHandler
+from infra.message_brokers.base import BaseMessageBroker, BaseMessageConsumer, BaseMessageConsumerFactory
+from infra.message_brokers.kafka import KafkaMessageBroker, KafkaMessageConsumerFactory
+from infra.message_brokers.memory import MemoryMessageBroker, MemoryMessageConsumerFactory
+from infra.repositories.outbox.base import BaseOutboxRepository
+from infra.repositories.outbox.memory import MemoryOutboxRepository
+from infra.repositories.outbox.mongo import MongoDBOutboxRepository
+from infra.repositories.clients import create_mongo_db_client
+from infra.repositories.profiles import build_operation_profile
+from logic.consumers import BroadcastEventsConsumer, EventsConsumer
+from infra.websockets.backplanes import BaseWebSocketsBackplane, KafkaWebSocketsBackplane, MemoryWebSocketsBackplane
+from infra.websockets.managers import BaseConnectionManager, ConnectionManager
+from logic.events.messages import NewMessageReceivedEvent, NewMessageReceivedEventHandler, \
+    NewMessageReceivedWebSocketsEventHandler, NewChatCreatedEvent, NewChatCreatedEventHandler, \
+    NewChatCreatedBrokerEventHandler, NewMessageReceivedRecentMessagesEventHandler
 from logic.mediator import Mediator
+from logic.outbox import OutboxRelay
+from logic.queries.messages import GetChatQuery, GetChatQueryHandler, GetMessagesQuery, GetMessagesQueryHandler, \
+    GetChatMetadataQuery, GetChatMetadataQueryHandler, ExportChatQuery, ExportChatQueryHandler
 from settings.config import Config
 
 
@@ -25,7 +50,7 @@ def init_container():
     return _init_container()
 
 
-def _init_container() -> Container:
+def _init_container(config: Config | None = None) -> Container:
     """
     Регистрация зависимостей в контейнере.
     Контейнер позволяет связывать абстракции с конкретными реализациями.
@@ -59,45 +84,215 @@ def _init_container() -> Container:
     # 0.2 **Instance**: Лучше подходит для ситуаций, когда объект должен быть создан один раз с немедленной
     # инициализацией всех его зависимостей и параметров, обеспечивая консистентность и предсказуемость на
     # протяжении всего времени работы приложения.
-    container.register(Config, instance=Config(), scope=Scope.singleton)
-    config: Config = container.resolve(Config)
-    def create_mongo_db_client():
-        return AsyncIOMotorClient(
-            config.mongodb_connection_uri,
-            serverSelectionTimeoutMS=3000,
-        )
-    container.register(AsyncIOMotorClient, factory=create_mongo_db_client, scope=Scope.singleton)
-    client = container.resolve(AsyncIOMotorClient)  # т.к. клиент синглтон, то можно его зарезолвить здесь
+    container.register(Config, instance=config or Config(), scope=Scope.singleton)
+    config = container.resolve(Config)
+    # свой реестр метрик на контейнер (процесс API) - отдается на GET /metrics
+    container.register(PrometheusMetrics, instance=PrometheusMetrics(), scope=Scope.singleton)
+    metrics: PrometheusMetrics = container.resolve(PrometheusMetrics)
+
+    # клиент создается при первом обращении монго-репозитория: с STORAGE_BACKEND=memory пул монги не открывается
+    container.register(
+        AsyncIOMotorClient,
+        factory=lambda: create_mongo_db_client(config),
+        scope=Scope.singleton,
+    )
+    messages_in_collection = config.mongo_db_messages_layout == 'collection'
+    chat_create_profile = build_operation_profile(
+        write_concern=config.mongodb_chat_create_write_concern,
+        journal=config.mongodb_chat_create_journal,
+    )
+    message_append_profile = build_operation_profile(
+        write_concern=config.mongodb_message_append_write_concern,
+        journal=config.mongodb_message_append_journal,
+    )
+    history_read_profile = build_operation_profile(read_preference=config.mongodb_history_read_preference)
+
     def init_chats_mongodb_repository() -> MongoDBChatsRepository:
         return MongoDBChatsRepository(
-            mongo_db_client=client,
+            mongo_db_client=container.resolve(AsyncIOMotorClient),
             mongo_db_db_name=config.mongo_db_db_name,
             mongo_db_collection_name=config.mongo_db_collection_name,
+            mongo_db_messages_collection_name=(
+                config.mongo_db_messages_collection_name if messages_in_collection else None
+            ),
+            write_profile=chat_create_profile,
+            read_profile=history_read_profile,
+        )
+
+    def init_chats_repository() -> BaseChatsRepository:
+        chats_repository = init_chats_mongodb_repository()
+        if config.metrics_enabled:
+            # замеряем обращения к монге - под кэшем, попадания в кэш считаются отдельно
+            chats_repository = InstrumentedChatsRepository(repository=chats_repository, metrics=metrics)
+        if not config.chats_cache_enabled:
+            return chats_repository
+
+        # метаданные чатов почти не меняются - читаем их из кэша, а не из монги на каждую команду
+        cached_repository = CachedChatsRepository(
+            repository=chats_repository,
+            max_size=config.chats_cache_max_size,
+            ttl=config.chats_cache_ttl,
+            negative_ttl=config.chats_cache_negative_ttl,
+        )
+        metrics.track_cache('chats', cached_repository.chats_cache.stats)
+        metrics.track_cache('chat_titles', cached_repository.titles_cache.stats)
+        return cached_repository
+
+    def init_messages_repository() -> BaseMessagesRepository:
+        messages_repository = init_messages_mongodb_repository()
+        if config.metrics_enabled:
+            messages_repository = InstrumentedMessagesRepository(repository=messages_repository, metrics=metrics)
+        if not config.mongo_db_messages_coalesce_window_ms:
+            return messages_repository
+
+        # групповая запись: параллельные add_message в один чат уходят в монгу одной записью
+        return CoalescingMessagesRepository(
+            repository=messages_repository,
+            window=config.mongo_db_messages_coalesce_window_ms / 1000,
+            max_items=config.mongo_db_messages_coalesce_max_items,
         )
 
-    def init_messages_mongodb_repository() -> MongoDBMessagesRepository:
+    def init_messages_mongodb_repository() -> BaseMessagesRepository:
+        if messages_in_collection:
+            # сообщения отдельными документами - документ чата не растёт вместе с историей
+            return MongoDBCollectionMessagesRepository(
+                mongo_db_client=container.resolve(AsyncIOMotorClient),
+                mongo_db_db_name=config.mongo_db_db_name,
+                mongo_db_collection_name=config.mongo_db_messages_collection_name,
+                write_profile=message_append_profile,
+                read_profile=history_read_profile,
+            )
+
         return MongoDBMessagesRepository(
-            mongo_db_client=client,
+            mongo_db_client=container.resolve(AsyncIOMotorClient),
             mongo_db_db_name=config.mongo_db_db_name,
             mongo_db_collection_name=config.mongo_db_collection_name,
+            write_profile=message_append_profile,
+            read_profile=history_read_profile,
         )
     # container.register(BaseChatRepository, MemoryChatRepository)  # без скоупа реквест в swagger будет выполняться в
     # MemoryChatRepository, т.е. не будет сохранен в бд и каждый реквест будет уникальным(не получим 400)...
     # поэтмоу этот контейнер делаем синглтоном
     # container.register(BaseChatRepository, MemoryChatRepository, scope=Scope.singleton)
     # container.register(BaseChatRepository, MongoDBChatRepository, scope=Scope.singleton)
-    container.register(BaseChatsRepository, factory=init_chats_mongodb_repository, scope=Scope.singleton)  # factory -
+    container.register(BaseChatsRepository, factory=init_chats_repository, scope=Scope.singleton)  # factory -
     # Используется, когда создание экземпляра требует предварительной конфигурации или передачи специфических параметров
-    container.register(BaseMessagesRepository, factory=init_messages_mongodb_repository, scope=Scope.singleton)
+    container.register(BaseMessagesRepository, factory=init_messages_repository, scope=Scope.singleton)
+
+    # буфер последних сообщений - общий для команд (пишут) и запросов истории (читают)
+    def create_recent_messages_buffer() -> RecentMessagesBuffer:
+        recent_messages = RecentMessagesBuffer(
+            capacity=config.recent_messages_capacity,
+            max_bytes=config.recent_messages_max_bytes,
+            ttl=config.recent_messages_ttl,
+        )
+        metrics.track_cache('recent_messages', recent_messages.stats)
+        return recent_messages
+    container.register(RecentMessagesBuffer, factory=create_recent_messages_buffer, scope=Scope.singleton)
+
+    def init_outbox_mongodb_repository() -> MongoDBOutboxRepository:
+        # коллекции, в которые репозитории пишут события вместе с агрегатами: сначала чаты, потом сообщения
+        collection_names = [config.mongo_db_collection_name]
+        if messages_in_collection:
+            collection_names.append(config.mongo_db_messages_collection_name)
+
+        return MongoDBOutboxRepository(
+            mongo_db_client=container.resolve(AsyncIOMotorClient),
+            mongo_db_db_name=config.mongo_db_db_name,
+            mongo_db_collection_names=tuple(collection_names),
+            mongo_db_leases_collection_name=config.mongo_db_outbox_leases_collection_name,
+        )
+    container.register(BaseOutboxRepository, factory=init_outbox_mongodb_repository, scope=Scope.singleton)
+
+    if config.storage_backend == 'memory':
+        register_memory_storage(container, config)
+
+    # 0.3. брокер сообщений - один продюсер на процесс (стартует/закрывается в lifespan приложения)
+    def create_message_broker() -> BaseMessageBroker:
+        return KafkaMessageBroker(
+            bootstrap_servers=config.kafka_url,
+            linger_ms=config.kafka_linger_ms,
+            max_batch_size=config.kafka_max_batch_size,
+            compression_type=config.kafka_compression_type,
+        )
+    container.register(BaseMessageBroker, factory=create_message_broker, scope=Scope.singleton)
+
+    # консьюмеры процесса - через фабрику (группа консьюмеров событий, слушатель событий, узел бэкплейна)
+    container.register(
+        BaseMessageConsumerFactory,
+        factory=lambda: KafkaMessageConsumerFactory(bootstrap_servers=config.kafka_url),
+        scope=Scope.singleton,
+    )
+
+    def create_message_consumer() -> BaseMessageConsumer:
+        return container.resolve(BaseMessageConsumerFactory).create_consumer(
+            topics=(config.new_message_received_topic,),
+            group_id=config.kafka_consumer_group_id,
+        )
+    container.register(BaseMessageConsumer, factory=create_message_consumer, scope=Scope.singleton)
+
+    # 0.4. хаб веб-сокетов - один на процесс, держит соединения всех чатов; бэкплейн связывает хабы процессов
+    def create_connection_manager() -> BaseConnectionManager:
+        connection_manager = ConnectionManager(send_queue_size=config.websocket_send_queue_size)
+        metrics.track_websocket_connections(connection_manager.count_connections)
+        return connection_manager
+    container.register(BaseConnectionManager, factory=create_connection_manager, scope=Scope.singleton)
+
+    def create_websockets_backplane() -> BaseWebSocketsBackplane:
+        connection_manager = container.resolve(BaseConnectionManager)
+        if config.websocket_backplane == 'memory':
+            return MemoryWebSocketsBackplane(connection_manager=connection_manager)
+
+        return KafkaWebSocketsBackplane(
+            connection_manager=connection_manager,
+            message_broker=container.resolve(BaseMessageBroker),
+            # свой консьюмер на каждый узел: вне группы и с конца топика - узлу нужны только новые сообщения
+            message_consumer=container.resolve(BaseMessageConsumerFactory).create_consumer(
+                topics=(config.websocket_backplane_topic,),
+            ),
+            topic=config.websocket_backplane_topic,
+        )
+    container.register(BaseWebSocketsBackplane, factory=create_websockets_backplane, scope=Scope.singleton)
 
     # 1. регистрируем команды
     # Регистрация CreateChatCommandHandler так, что его зависимости будут автоматически разрешены контейнером
-    container.register(CreateChatCommandHandler)
+    # обработчики без состояния - создаются один раз вместе с медиатором (Scope.singleton)
+    container.register(CreateChatCommandHandler, scope=Scope.singleton)
     # Используем container.resolve(CreateChatCommandHandler) для автоматического создания
     # экземпляра CreateChatCommandHandler с его зависимостями, вместо прямого вызова
     # CreateChatCommandHandler(), чтобы получить гибкость и возможность подмены зависимостей.
-    container.register(CreateMessageCommandHandler)
+    container.register(CreateMessageCommandHandler, scope=Scope.singleton)
+    container.register(BulkCreateMessagesCommandHandler, scope=Scope.singleton)
 
+    # 1.1. регистрируем запросы
+    container.register(GetChatQueryHandler, scope=Scope.singleton)
+    container.register(GetMessagesQueryHandler, scope=Scope.singleton)
+    container.register(GetChatMetadataQueryHandler, scope=Scope.singleton)
+    container.register(ExportChatQueryHandler, scope=Scope.singleton)
+
+    # 1.2. регистрируем обработчики событий
+    def init_new_message_received_event_handler() -> NewMessageReceivedEventHandler:
+        return NewMessageReceivedEventHandler(
+            message_broker=container.resolve(BaseMessageBroker),
+            broker_topic=config.new_message_received_topic,
+        )
+    container.register(
+        NewMessageReceivedEventHandler,
+        factory=init_new_message_received_event_handler,
+        scope=Scope.singleton,
+    )
+    container.register(NewMessageReceivedWebSocketsEventHandler, scope=Scope.singleton)
+
+    def init_new_chat_created_broker_event_handler() -> NewChatCreatedBrokerEventHandler:
+        return NewChatCreatedBrokerEventHandler(
+            message_broker=container.resolve(BaseMessageBroker),
+            broker_topic=config.new_chat_created_topic,
+        )
+    container.register(
+        NewChatCreatedBrokerEventHandler,
+        factory=init_new_chat_created_broker_event_handler,
+        scope=Scope.singleton,
+    )
 
     # 2.регистрируем оьект медиатора
     def init_mediator() -> Mediator:
@@ -112,7 +307,12 @@ def _init_container() -> Container:
         Таким образом, когда медиатору нужен обработчик (CreateChatCommandHandler), он просто обращается к контейнеру,
         и контейнер создает и возвращает нужный объект.
         """
-        mediator = Mediator()
+        mediator = Mediator(
+            concurrent_dispatch=config.mediator_concurrent_dispatch,
+            max_concurrency=config.mediator_max_concurrency,
+            handler_timeout=config.mediator_handler_timeout,
+            metrics=metrics if config.metrics_enabled else None,
+        )
         # mediator.register_command(
         #     CreateChatCommand,
         #     [CreateChatCommandHandler(chat_repository=chat_repository)],
@@ -126,10 +326,165 @@ def _init_container() -> Container:
             CreateMessageCommand,
             [container.resolve(CreateMessageCommandHandler)],  # Разрешение зависимости через контейнер
         )
-        return mediator
+        mediator.register_command(
+            BulkCreateMessagesCommand,
+            [container.resolve(BulkCreateMessagesCommandHandler)],
+        )
+        mediator.register_query(
+            GetChatQuery,
+            container.resolve(GetChatQueryHandler),
+        )
+        mediator.register_query(
+            GetMessagesQuery,
+            container.resolve(GetMessagesQueryHandler),
+        )
+        mediator.register_query(
+            GetChatMetadataQuery,
+            container.resolve(GetChatMetadataQueryHandler),
+        )
+        mediator.register_query(
+            ExportChatQuery,
+            container.resolve(ExportChatQueryHandler),
+        )
+        new_message_handlers = [container.resolve(NewMessageReceivedEventHandler)]
+        if config.websocket_backplane == 'memory':
+            # один процесс - рассылаем по сокетам прямо из relay; с kafka-бэкплейном это делает консьюмер событий
+            new_message_handlers.append(container.resolve(NewMessageReceivedWebSocketsEventHandler))
+        mediator.register_event(NewMessageReceivedEvent, new_message_handlers)
+        # кэши чатов процессов сбрасывает слушатель событий каждого процесса - здесь событие только уходит в брокер
+        mediator.register_event(NewChatCreatedEvent, [container.resolve(NewChatCreatedBrokerEventHandler)])
+        # регистрация закончена - дальше на каждый запрос только поиск обработчика в замороженной таблице
+        return mediator.freeze()
+
+    container.register(Mediator, factory=init_mediator, scope=Scope.singleton)  # указывает factory на саму себя
+    # (init_mediator), потому что именно эта функция (а не просто вызов конструктора Mediator) обеспечивает
+    # полноценное создание и настройку экземпляра Mediator. Scope.singleton - медиатор собирается один раз,
+    # а не на каждый HTTP-запрос.
+
+    # 3. фоновая доставка событий из outbox в медиатор (запускается в lifespan приложения)
+    def init_outbox_relay() -> OutboxRelay:
+        return OutboxRelay(
+            outbox_repository=container.resolve(BaseOutboxRepository),
+            mediator=container.resolve(Mediator),
+            batch_size=config.outbox_batch_size,
+            poll_interval=config.outbox_poll_interval,
+            lease_ttl=config.outbox_relay_lease_ttl,
+        )
+    container.register(OutboxRelay, factory=init_outbox_relay, scope=Scope.singleton)
+
+    # 4. консьюмер событий из брокера (отдельный процесс - application/consumers/main.py)
+    def init_events_consumer() -> EventsConsumer:
+        # у консьюмера свой медиатор: здесь только обработчики, которые реагируют на уже опубликованные в брокер
+        # события. Медиатор API нельзя - его NewMessageReceivedEventHandler отправил бы событие обратно в брокер
+        consumer_mediator = Mediator(
+            concurrent_dispatch=config.mediator_concurrent_dispatch,
+            max_concurrency=config.mediator_max_concurrency,
+            handler_timeout=config.mediator_handler_timeout,
+        )
+        if config.websocket_backplane == 'kafka':
+            # рассылка по веб-сокетам: одно сообщение группы консьюмеров - одна публикация в бэкплейн,
+            # relay процесса API только отправляет событие в брокер
+            consumer_mediator.register_event(
+                NewMessageReceivedEvent,
+                [container.resolve(NewMessageReceivedWebSocketsEventHandler)],
+            )
+
+        return EventsConsumer(
+            consumer=container.resolve(BaseMessageConsumer),
+            mediator=consumer_mediator.freeze(),
+            workers=config.consumer_workers,
+            queue_size=config.consumer_queue_size,
+            max_records=config.consumer_max_records,
+            commit_interval=config.consumer_commit_interval,
+        )
+    container.register(EventsConsumer, factory=init_events_consumer, scope=Scope.singleton)
+
+    # 5. слушатель событий процесса API: обновляет кэши в памяти этого процесса событиями всех процессов -
+    # новые сообщения в буфер последних сообщений, созданные чаты - в кэш чатов (каждый процесс читает поток сам,
+    # запускается в lifespan приложения, если есть что обновлять)
+    def init_events_listener() -> BroadcastEventsConsumer:
+        listener_mediator = Mediator()
+        recent_messages = container.resolve(RecentMessagesBuffer)
+        if recent_messages.capacity:
+            listener_mediator.register_event(
+                NewMessageReceivedEvent,
+                [NewMessageReceivedRecentMessagesEventHandler(recent_messages=recent_messages)],
+            )
+        chats_repository = container.resolve(BaseChatsRepository)
+        if isinstance(chats_repository, CachedChatsRepository):
+            listener_mediator.register_event(
+                NewChatCreatedEvent,
+                [NewChatCreatedEventHandler(chats_repository=chats_repository)],
+            )
+
+        return BroadcastEventsConsumer(
+            # вне группы - каждый процесс читает поток сам
+            consumer=container.resolve(BaseMessageConsumerFactory).create_consumer(
+                topics=(config.new_message_received_topic, config.new_chat_created_topic),
+            ),
+            mediator=listener_mediator.freeze(),
+            workers=1,
+        )
+    container.register(BroadcastEventsConsumer, factory=init_events_listener, scope=Scope.singleton)
+
+    return container
+
 
-    container.register(Mediator, factory=init_mediator)  # указывает factory на саму себя (init_mediator),
-    # потому что именно эта функция (а не просто вызов конструктора Mediator) обеспечивает полноценное создание
-    # и настройку экземпляра Mediator.
+def register_memory_storage(container: Container, config: Config) -> None:
+    """
+    Чаты, сообщения и outbox - в памяти процесса (STORAGE_BACKEND=memory, тесты, бенчмарки).
+    Репозитории делят одно хранилище и один outbox; кэш чатов и групповая запись здесь не нужны.
+    """
+    container.register(MemoryStorage, scope=Scope.singleton)
+    # один memory-outbox на все memory-репозитории (они получают его через контейнер)
+    container.register(MemoryOutboxRepository, scope=Scope.singleton)
+    container.register(
+        BaseOutboxRepository,
+        factory=lambda: container.resolve(MemoryOutboxRepository),
+        scope=Scope.singleton,
+    )
+    container.register(BaseChatsRepository, MemoryChatsRepository, scope=Scope.singleton)
+    container.register(BaseMessagesRepository, MemoryMessagesRepository, scope=Scope.singleton)
+
+    def init_memory_snapshotter() -> MemorySnapshotter:
+        return MemorySnapshotter(
+            storage=container.resolve(MemoryStorage),
+            outbox=container.resolve(MemoryOutboxRepository),
+            path=config.memory_snapshot_path,
+            interval=config.memory_snapshot_interval,
+        )
+    container.register(MemorySnapshotter, factory=init_memory_snapshotter, scope=Scope.singleton)
 
+
+def register_memory_broker(container: Container) -> None:
+    """
+    Брокер в памяти процесса: продюсер и все консьюмеры (через фабрику консьюмеров) работают с одним
+    MemoryMessageBroker, веб-сокеты - через memory-бэкплейн. Kafka не нужна (тесты, бенчмарки).
+    """
+    container.register(MemoryMessageBroker, scope=Scope.singleton)
+    container.register(
+        BaseMessageBroker,
+        factory=lambda: container.resolve(MemoryMessageBroker),
+        scope=Scope.singleton,
+    )
+    container.register(
+        BaseMessageConsumerFactory,
+        factory=lambda: MemoryMessageConsumerFactory(broker=container.resolve(MemoryMessageBroker)),
+        scope=Scope.singleton,
+    )
+    container.register(
+        BaseWebSocketsBackplane,
+        factory=lambda: MemoryWebSocketsBackplane(connection_manager=container.resolve(BaseConnectionManager)),
+        scope=Scope.singleton,
+    )
+
+
+def init_memory_container() -> Container:
+    """
+    Продовый контейнер, в котором хранилище и брокер - в памяти процесса: приложение целиком без монги и kafka
+    (тесты, бенчмарки). Каждый вызов - новый контейнер с пустым хранилищем.
+    """
+    # STORAGE_BACKEND=memory - memory-хранилище регистрирует сам _init_container
+    container = _init_container(Config(STORAGE_BACKEND='memory'))
+    register_memory_broker(container)
     return container
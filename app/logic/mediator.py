@@ -1,11 +1,18 @@
+import asyncio
 from collections import defaultdict
+from contextlib import nullcontext
 from dataclasses import dataclass, field
-from typing import  Iterable
+from itertools import chain
+from types import MappingProxyType
+from typing import  Iterable, Mapping
 
 from domain.events.base import BaseEvent
 from logic.commands.base import CommandHandler, CT, CR, BaseCommand
 from logic.events.base import EventHandler, ET, ER
-from logic.exceptions.mediator import EventHandlersNotRegisteredException, CommandHandlersNotRegisteredException
+from logic.exceptions.mediator import EventHandlersNotRegisteredException, CommandHandlersNotRegisteredException, \
+    QueryHandlersNotRegisteredException, MediatorFrozenException, HandlerTimeoutException
+from logic.metrics import BaseMediatorMetrics
+from logic.queries.base import BaseQuery, QueryHandler, QT, QR
 
 
 @dataclass(eq=False)
@@ -15,6 +22,18 @@ class Mediator:
 
     - events_map: словарь, где ключом является тип события (ET), а значением список обработчиков событий (EventHandler).
     - commands_map: аналогичный словарь для команд и их обработчиков.
+    - queries_map: словарь запросов - у запроса (в отличие от команд и событий) ровно один обработчик.
+
+    Медиатор собирается один раз на старте (синглтон в контейнере) и замораживается (freeze):
+    карты становятся неизменяемыми (тип -> tuple обработчиков), а поиск обработчиков с учетом MRO
+    (обработчик базового класса команды/события подходит и наследникам) кешируется по типу -
+    на каждый запрос остается один поиск в словаре.
+
+    - concurrent_dispatch: разные обработчики (несколько обработчиков команды или события) выполняются
+      одновременно, а не по очереди; события пачки каждый обработчик получает по порядку;
+    - max_concurrency: сколько обработчиков одного вызова могут работать одновременно (None - без лимита);
+    - handler_timeout: таймаут на один вызов обработчика в секундах (None - без таймаута);
+    - metrics: время и ошибки команд/запросов и задержка публикации событий (None - без метрик).
     """
 
     events_map: dict[ET, list[EventHandler]] = field(
@@ -27,12 +46,102 @@ class Mediator:
         kw_only=True
     )
 
+    queries_map: dict[QT, QueryHandler] = field(
+        default_factory=dict,
+        kw_only=True
+    )
+
+    concurrent_dispatch: bool = field(default=False, kw_only=True)
+    max_concurrency: int | None = field(default=None, kw_only=True)
+    handler_timeout: float | None = field(default=None, kw_only=True)
+    metrics: BaseMediatorMetrics | None = field(default=None, kw_only=True)
+
+    _is_frozen: bool = field(default=False, init=False, repr=False)
+    # кеш поиска по MRO: тип -> обработчики (в т.ч. для незарегистрированных наследников)
+    _events_dispatch: dict[type, tuple[EventHandler, ...]] = field(default_factory=dict, init=False, repr=False)
+    _commands_dispatch: dict[type, tuple[CommandHandler, ...]] = field(default_factory=dict, init=False, repr=False)
+    _queries_dispatch: dict[type, QueryHandler | None] = field(default_factory=dict, init=False, repr=False)
+
+    @property
+    def is_frozen(self) -> bool:
+        return self._is_frozen
+
+    def freeze(self) -> 'Mediator':
+        """
+        Заканчивает регистрацию: карты превращаются в неизменяемые (MappingProxyType + tuple),
+        а таблица диспетчеризации заранее заполняется для всех зарегистрированных типов.
+        """
+        self.events_map = MappingProxyType({event: tuple(handlers) for event, handlers in self.events_map.items()})
+        self.commands_map = MappingProxyType(
+            {command: tuple(handlers) for command, handlers in self.commands_map.items()}
+        )
+        self.queries_map = MappingProxyType(dict(self.queries_map))
+        self._is_frozen = True
+
+        for event in self.events_map:
+            self._get_event_handlers(event)
+        for command in self.commands_map:
+            self._get_command_handlers(command)
+        for query in self.queries_map:
+            self._get_query_handler(query)
+
+        return self
+
+    def has_event_handlers(self, event_type: type) -> bool:
+        return bool(self._get_event_handlers(event_type))
+
+    def _check_not_frozen(self) -> None:
+        if self._is_frozen:
+            raise MediatorFrozenException()
+
+        # регистрация меняет результат поиска - сбрасываем кеш
+        self._events_dispatch.clear()
+        self._commands_dispatch.clear()
+        self._queries_dispatch.clear()
+
+    def _get_event_handlers(self, event_type: type) -> tuple[EventHandler, ...]:
+        """
+        Событие получают обработчики его класса и всех базовых классов (подписка на базовое событие).
+        """
+        handlers = self._events_dispatch.get(event_type)
+        if handlers is None:
+            handlers = self._events_dispatch[event_type] = tuple(chain.from_iterable(
+                self.events_map.get(base, ()) for base in event_type.__mro__
+            ))
+        return handlers
+
+    def _get_command_handlers(self, command_type: type) -> tuple[CommandHandler, ...]:
+        """
+        Команду обрабатывают обработчики ближайшего по MRO зарегистрированного класса.
+        """
+        handlers = self._commands_dispatch.get(command_type)
+        if handlers is None:
+            handlers = self._commands_dispatch[command_type] = tuple(
+                self._find_nearest(self.commands_map, command_type) or ()
+            )
+        return handlers
+
+    def _get_query_handler(self, query_type: type) -> QueryHandler | None:
+        try:
+            return self._queries_dispatch[query_type]
+        except KeyError:
+            handler = self._queries_dispatch[query_type] = self._find_nearest(self.queries_map, query_type)
+            return handler
+
+    @staticmethod
+    def _find_nearest(handlers_map: Mapping[type, object], handled_type: type):
+        for base in handled_type.__mro__:
+            if base in handlers_map:
+                return handlers_map[base]
+        return None
+
     def register_event(self, event: ET, event_handlers: Iterable[EventHandler[ET, ER]]) -> None:
         """
         Регистрирует обработчик события.
         - event: объект события (ET).
         - event_handler: обработчик, связанный с этим событием.
         """
+        self._check_not_frozen()
         # Получаем класс события и добавляем обработчик в список для данного типа событий
         self.events_map[event].extend(event_handlers)
 
@@ -42,34 +151,46 @@ class Mediator:
         - command: тип команды (CT).
         - command_handler: обработчик, который должен быть вызван при получении команды.
         """
+        self._check_not_frozen()
         # Получаем класс команды и добавляем обработчик в список для данного типа команд
         self.commands_map[command].extend(command_handlers)
 
+    def register_query(self, query: QT, query_handler: QueryHandler[QT, QR]) -> None:
+        """
+        Регистрирует обработчик запроса (чтение данных без изменения состояния).
+        """
+        self._check_not_frozen()
+        self.queries_map[query] = query_handler
+
     # def handle_event(self, event: BaseEvent) -> Iterable[ER]:
     async def publish_event(self, events: Iterable[BaseEvent]) -> Iterable[ER]:
         """
         Собранные в пачке ивенты он публиукет в Кафку
 
-        Обрабатывает событие, находя соответствующий обработчик в events_map.
-        - event: объект события (BaseEvent).
+        Обрабатывает пачку событий (можно разных типов): обработчики ищутся один раз на тип события,
+        результаты возвращаются в порядке событий, а для каждого события - в порядке обработчиков.
+        - events: объекты событий (BaseEvent).
         """
-        event_type = events.__class__  # Получаем тип события
-        handlers = self.events_map.get(event_type)  # Получаем обработчики для данного типа события
+        events = list(events)
+        handlers_by_type: dict[type, tuple[EventHandler, ...]] = {}
+        for event in events:
+            event_type = event.__class__  # Получаем тип события (а не тип самой пачки)
+            if event_type in handlers_by_type:
+                continue
 
-        if not handlers:
-            raise EventHandlersNotRegisteredException(event_type)  # Исключение, если нет зарегистрированных обработчиков
+            handlers = self._get_event_handlers(event_type)  # Получаем обработчики для данного типа события
+            if not handlers:
+                raise EventHandlersNotRegisteredException(event_type)  # Исключение, если нет зарегистрированных обработчиков
+            handlers_by_type[event_type] = handlers
 
-        result = []
-        # Вызываем метод handle у каждого обработчика
-        # return [handler.handle(event) for handler in handlers]
-        # return [await handler.handle(event) for handler in handlers]
-        for event in events:
-            result.extend([await handler.handle(event) for handler in handlers])
-            # [выражение for элемент in итерируемый_объект]
-            # await Позволяет ждать результата асинхронного вызова без блокировки основного потока выполнения
-            # для асин метода (async def handle(self, event)) объекта handler
+        if self.metrics is not None:
+            self.metrics.observe_publish_lag(events)
 
-        return result
+        return await self._dispatch([
+            (handler, event)
+            for event in events
+            for handler in handlers_by_type[event.__class__]
+        ])
 
     # def handle_command(self, command: BaseEvent) -> Iterable[CR]:
     async def handle_command(self, command: BaseCommand) -> Iterable[CR]:
@@ -81,12 +202,88 @@ class Mediator:
         #  (<class 'logic.commands.messages.CreateChatCommand'>,
         #  defaultdict(<class 'list'>, {<class 'logic.commands.messages.CreateChatCommand'>: [CreateChatCommandHandler(chat_repository=MemoryChatRepository(_saved_chats=[]))]}))
         command_type = command.__class__  # Получаем тип события
-        handlers = self.commands_map.get(command_type)  # Получаем обработчики для данного типа события
+        handlers = self._get_command_handlers(command_type)  # Получаем обработчики для данного типа события
 
         if not handlers:
             raise CommandHandlersNotRegisteredException(command_type)  # Исключение, если нет зарегистрированных обработчиков
 
         # Вызываем метод handle у каждого обработчика
         # return [handler.handle(command) for handler in handlers]
-        return [await handler.handle(command) for handler in handlers]
+        if self.metrics is None:
+            return await self._dispatch([(handler, command) for handler in handlers])
+
+        with self.metrics.time_command(command_type):
+            return await self._dispatch([(handler, command) for handler in handlers])
+
+    async def handle_query(self, query: BaseQuery) -> QR:
+        """
+        Находит обработчик запроса в queries_map и возвращает его результат.
+        """
+        query_type = query.__class__
+        handler = self._get_query_handler(query_type)
+
+        if not handler:
+            raise QueryHandlersNotRegisteredException(query_type)
+
+        if self.metrics is None:
+            return await handler.handle(query)
+
+        with self.metrics.time_query(query_type):
+            return await handler.handle(query)
+
+    async def _dispatch(self, calls: list[tuple[CommandHandler | EventHandler, BaseCommand | BaseEvent]]) -> list:
+        """
+        Вызывает handler.handle(item) для каждой пары и возвращает результаты в том же порядке.
+
+        concurrent_dispatch=False - по очереди, как раньше. Иначе разные обработчики работают одновременно
+        в asyncio.TaskGroup (не больше max_concurrency вызовов за раз), но каждый обработчик получает свои
+        события строго по очереди, в порядке пачки - порядок событий одного чата (и их отправки в kafka)
+        не зависит от планировщика. Первая ошибка отменяет остальные вызовы и пробрасывается как есть
+        (если упал один обработчик) или ExceptionGroup (если несколько).
+        """
+        if not self.concurrent_dispatch or len(calls) < 2:
+            return [await self._run_handler(handler, item) for handler, item in calls]
+
+        # позиции вызовов каждого обработчика (по id - обработчики не обязаны быть хешируемыми)
+        positions_by_handler: dict[int, list[int]] = {}
+        for position, (handler, _) in enumerate(calls):
+            positions_by_handler.setdefault(id(handler), []).append(position)
+
+        if len(positions_by_handler) == 1:
+            return [await self._run_handler(handler, item) for handler, item in calls]
+
+        results = [None] * len(calls)
+
+        async def run_in_order(positions: list[int]) -> None:
+            for position in positions:
+                handler, item = calls[position]
+                results[position] = await self._run_handler(handler, item, semaphore)
+
+        # семафор на вызов, а не на медиатор: медиатор - синглтон и может жить дольше одного event loop
+        semaphore = asyncio.Semaphore(self.max_concurrency) if self.max_concurrency else None
+        try:
+            async with asyncio.TaskGroup() as task_group:
+                for positions in positions_by_handler.values():
+                    task_group.create_task(run_in_order(positions))
+        except BaseExceptionGroup as exception_group:
+            if len(exception_group.exceptions) == 1:
+                raise exception_group.exceptions[0]
+            raise
+
+        return results
+
+    async def _run_handler(
+            self,
+            handler: CommandHandler | EventHandler,
+            item: BaseCommand | BaseEvent,
+            semaphore: asyncio.Semaphore | None = None,
+    ):
+        async with semaphore or nullcontext():
+            if self.handler_timeout is None:
+                return await handler.handle(item)
 
+            try:
+                async with asyncio.timeout(self.handler_timeout):
+                    return await handler.handle(item)
+            except TimeoutError:
+                raise HandlerTimeoutException(handler_type=handler.__class__, timeout=self.handler_timeout)
@@ -0,0 +1,28 @@
+from abc import ABC, abstractmethod
+from contextlib import AbstractContextManager
+from dataclasses import dataclass
+from typing import Iterable
+
+from domain.events.base import BaseEvent
+
+
+@dataclass(eq=False)
+class BaseMediatorMetrics(ABC):
+    """
+    Замеры медиатора. Реализация (prometheus) - в infra.metrics, сам медиатор знает только этот интерфейс.
+
+    - time_command / time_query - контекстный менеджер вокруг одного вызова: время и ошибки по типу команды/запроса;
+    - observe_publish_lag - задержка от occurred_at событий до их публикации.
+    """
+
+    @abstractmethod
+    def time_command(self, command_type: type) -> AbstractContextManager:
+        pass
+
+    @abstractmethod
+    def time_query(self, query_type: type) -> AbstractContextManager:
+        pass
+
+    @abstractmethod
+    def observe_publish_lag(self, events: Iterable[BaseEvent]) -> None:
+        pass
@@ -0,0 +1,71 @@
+import asyncio
+import logging
+import os
+import socket
+from dataclasses import dataclass, field
+from uuid import uuid4
+
+from infra.repositories.outbox.base import BaseOutboxRepository
+from logic.mediator import Mediator
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(eq=False)
+class OutboxRelay:
+    """
+    Фоновая доставка событий из outbox в шину событий (Mediator.publish_event).
+
+    HTTP-запрос только пишет агрегат вместе с его событиями и не ждет брокер - события забираются
+    отсюда пачками по batch_size. Событие помечается опубликованным только после успешной публикации,
+    поэтому при падении оно будет доставлено повторно (at-least-once, обработчикам нужен event_id
+    для дедупликации). События, на которые никто не подписан, просто помечаются опубликованными.
+
+    relay запускается в каждом воркере API, но публикует только держатель права (acquire_relay_lease
+    на lease_ttl секунд, продлевается каждый круг): одновременные опросы нескольких процессов
+    публиковали бы одни и те же события и ломали порядок событий чата. Упал держатель - через
+    lease_ttl право забирает другой процесс.
+    """
+    outbox_repository: BaseOutboxRepository
+    mediator: Mediator
+    batch_size: int = field(default=100, kw_only=True)
+    poll_interval: float = field(default=0.5, kw_only=True)
+    lease_ttl: float = field(default=10, kw_only=True)
+    owner: str = field(default_factory=lambda: f'{socket.gethostname()}:{os.getpid()}:{uuid4().hex}', kw_only=True)
+
+    async def drain_once(self) -> int:
+        """
+        Публикует одну пачку событий.
+        :return: сколько событий забрано из outbox
+        """
+        events = await self.outbox_repository.get_pending_events(limit=self.batch_size)
+        if not events:
+            return 0
+
+        deliverable = [event for event in events if self.mediator.has_event_handlers(event.__class__)]
+        if deliverable:
+            await self.mediator.publish_event(deliverable)
+
+        await self.outbox_repository.mark_published(events)
+        return len(events)
+
+    async def run(self) -> None:
+        """
+        Крутится до отмены задачи: пока outbox отдает полные пачки - забираем без пауз,
+        иначе ждем poll_interval. Ошибка публикации не останавливает relay - пачка уйдет на следующем круге.
+        Без права публиковать relay только ждет, пока оно освободится.
+        """
+        while True:
+            try:
+                if await self.outbox_repository.acquire_relay_lease(owner=self.owner, ttl=self.lease_ttl):
+                    drained = await self.drain_once()
+                else:
+                    drained = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('outbox relay failed to publish events')
+                drained = 0
+
+            if drained < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
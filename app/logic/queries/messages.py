@@ -0,0 +1,170 @@
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+from domain.entities.messages import Chat, Message
+from infra.repositories.filters.messages import GetMessagesFilters, MessagesCursor
+from infra.repositories.messages.base import BaseChatsRepository, BaseMessagesRepository
+from infra.repositories.messages.recent import RecentMessagesBuffer
+from logic.exceptions.messages import ChatNotFoundException, InvalidMessagesCursorException, \
+    AmbiguousMessagesCursorException
+from logic.queries.base import BaseQuery, QueryHandler
+
+
+@dataclass(frozen=True)
+class GetChatQuery(BaseQuery):
+    chat_oid: str
+
+
+@dataclass(frozen=True)
+class GetChatQueryHandler(QueryHandler[GetChatQuery, Chat]):
+    chats_repository: BaseChatsRepository
+
+    async def handle(self, query: GetChatQuery) -> Chat:
+        chat = await self.chats_repository.get_chat_by_oid(oid=query.chat_oid)
+        if not chat:
+            raise ChatNotFoundException(chat_oid=query.chat_oid)
+
+        return chat
+
+
+@dataclass(frozen=True)
+class GetChatMetadataQuery(BaseQuery):
+    chat_oid: str
+
+
+@dataclass(frozen=True)
+class GetChatMetadataQueryHandler(QueryHandler[GetChatMetadataQuery, Chat]):
+    """
+    Чат без истории сообщений - когда нужно только убедиться, что чат есть (например, перед подпиской на веб-сокет).
+    """
+    chats_repository: BaseChatsRepository
+
+    async def handle(self, query: GetChatMetadataQuery) -> Chat:
+        chat = await self.chats_repository.get_chat_metadata_by_oid(oid=query.chat_oid)
+        if not chat:
+            raise ChatNotFoundException(chat_oid=query.chat_oid)
+
+        return chat
+
+
+@dataclass(frozen=True)
+class MessagesPage:
+    """
+    Страница истории: before - курсор для страницы постарше, after - для страницы поновее
+    (None - в эту сторону сообщений больше нет).
+    """
+    items: list[Message]
+    limit: int
+    before: MessagesCursor | None = None
+    after: MessagesCursor | None = None
+
+
+@dataclass(frozen=True)
+class ExportChatQuery(BaseQuery):
+    chat_oid: str
+    batch_size: int = 1000
+
+
+@dataclass(frozen=True)
+class ChatExport:
+    """
+    Метаданные чата и его история пачками. Пачки читаются из хранилища по мере итерации batches.
+    """
+    chat: Chat
+    batches: AsyncIterator[list[Message]]
+
+
+@dataclass(frozen=True)
+class ExportChatQueryHandler(QueryHandler[ExportChatQuery, ChatExport]):
+    """
+    Экспорт всей истории чата без загрузки ее в память целиком: сразу проверяется только существование чата,
+    сообщения читает уже тот, кто итерирует batches.
+    """
+    chats_repository: BaseChatsRepository
+    messages_repository: BaseMessagesRepository
+
+    async def handle(self, query: ExportChatQuery) -> ChatExport:
+        chat = await self.chats_repository.get_chat_metadata_by_oid(oid=query.chat_oid)
+        if not chat:
+            raise ChatNotFoundException(chat_oid=query.chat_oid)
+
+        return ChatExport(
+            chat=chat,
+            batches=self.messages_repository.iter_messages(chat_oid=query.chat_oid, batch_size=query.batch_size),
+        )
+
+
+@dataclass(frozen=True)
+class GetMessagesQuery(BaseQuery):
+    chat_oid: str
+    limit: int = 20
+    before: str | None = None
+    after: str | None = None
+
+
+@dataclass(frozen=True)
+class GetMessagesQueryHandler(QueryHandler[GetMessagesQuery, MessagesPage]):
+    chats_repository: BaseChatsRepository
+    messages_repository: BaseMessagesRepository
+    recent_messages: RecentMessagesBuffer
+
+    async def handle(self, query: GetMessagesQuery) -> MessagesPage:
+        if query.before and query.after:
+            raise AmbiguousMessagesCursorException()
+
+        before = self._decode_cursor(query.before)
+        after = self._decode_cursor(query.after)
+
+        if not await self.chats_repository.get_chat_metadata_by_oid(oid=query.chat_oid):
+            raise ChatNotFoundException(chat_oid=query.chat_oid)
+
+        # на одно сообщение больше, чем просили - так без count() узнаем, есть ли что-то дальше
+        filters = GetMessagesFilters(limit=query.limit + 1, before=before, after=after)
+        messages = None
+        if self.recent_messages.can_serve(filters.limit):
+            messages = self.recent_messages.get_messages(chat_oid=query.chat_oid, filters=filters)
+        if messages is None:
+            messages = await self._get_messages_from_repository(chat_oid=query.chat_oid, filters=filters)
+        has_more = len(messages) > query.limit
+        if after:
+            items = messages[:query.limit]
+            has_older, has_newer = True, has_more
+        else:
+            items = messages[-query.limit:] if has_more else messages
+            has_older, has_newer = has_more, before is not None
+
+        return MessagesPage(
+            items=items,
+            limit=query.limit,
+            before=MessagesCursor.from_message(items[0]) if items and has_older else None,
+            after=MessagesCursor.from_message(items[-1]) if items and has_newer else None,
+        )
+
+    async def _get_messages_from_repository(self, chat_oid: str, filters: GetMessagesFilters) -> list[Message]:
+        """
+        Промах буфера. Если это запрос последних сообщений - заодно заполняем буфер чата хвостом истории,
+        следующие такие запросы обойдутся без хранилища.
+        """
+        if filters.before or filters.after or not self.recent_messages.can_serve(filters.limit):
+            return await self.messages_repository.get_messages(chat_oid=chat_oid, filters=filters)
+
+        capacity = self.recent_messages.capacity
+        self.recent_messages.reserve(chat_oid)
+        recent = await self.messages_repository.get_messages(
+            chat_oid=chat_oid,
+            filters=GetMessagesFilters(limit=capacity),
+        )
+        self.recent_messages.seed(chat_oid=chat_oid, messages=recent, complete=len(recent) < capacity)
+
+        messages = self.recent_messages.get_messages(chat_oid=chat_oid, filters=filters)
+        return messages if messages is not None else recent[-filters.limit:]
+
+    @staticmethod
+    def _decode_cursor(cursor: str | None) -> MessagesCursor | None:
+        if cursor is None:
+            return None
+
+        try:
+            return MessagesCursor.decode(cursor)
+        except ValueError:
+            raise InvalidMessagesCursorException(cursor=cursor)
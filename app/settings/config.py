@@ -1,5 +1,7 @@
 # 1. про Settings знает все наше приложение(domain, logic, infra, api)
 # 2. здесь хранятся все наши константы, конектион стринг и и т.д.
+from typing import Literal
+
 from pydantic import Field
 from pydantic_settings import BaseSettings
 import os
@@ -9,9 +11,123 @@ class Config(BaseSettings):
     # mongodb_connection_uri: str = Field(os.getenv("MONGODB_CONNECTION_URI"))  # забираем с .env
     mongodb_connection_uri: str = "mongodb://mongodb:27017"
     # mongodb_connection_uri: str = Field(alias="MONGODB_CONNECTION_URI")  # забираем с .env
+    # пул соединений клиента монги (на процесс): min/max соединений, через сколько мс простоя соединение
+    # закрывается, сколько мс запрос ждет свободное соединение (пусто - без ограничений, как у драйвера)
+    mongodb_min_pool_size: int = Field(default=0, alias='MONGODB_MIN_POOL_SIZE')
+    mongodb_max_pool_size: int = Field(default=100, alias='MONGODB_MAX_POOL_SIZE')
+    mongodb_max_idle_time_ms: int | None = Field(default=None, alias='MONGODB_MAX_IDLE_TIME_MS')
+    mongodb_wait_queue_timeout_ms: int | None = Field(default=None, alias='MONGODB_WAIT_QUEUE_TIMEOUT_MS')
+    mongodb_server_selection_timeout_ms: int = Field(default=3000, alias='MONGODB_SERVER_SELECTION_TIMEOUT_MS')
+    # сжатие трафика с монгой, через запятую в порядке предпочтения: zstd, snappy, zlib
+    # (zstd и snappy - нужны пакеты zstandard / python-snappy); пусто - без сжатия
+    mongodb_compressors: str | None = Field(default=None, alias='MONGODB_COMPRESSORS')
+    # профили операций (пусто - как задано в connection string):
+    # write concern - w ("majority", число узлов или тег) и journal (ждать ли записи в журнал),
+    # read preference - primary, primaryPreferred, secondary, secondaryPreferred, nearest
+    mongodb_chat_create_write_concern: str | None = Field(default=None, alias='MONGODB_CHAT_CREATE_WRITE_CONCERN')
+    mongodb_chat_create_journal: bool | None = Field(default=None, alias='MONGODB_CHAT_CREATE_JOURNAL')
+    mongodb_message_append_write_concern: str | None = Field(
+        default=None,
+        alias='MONGODB_MESSAGE_APPEND_WRITE_CONCERN',
+    )
+    mongodb_message_append_journal: bool | None = Field(default=None, alias='MONGODB_MESSAGE_APPEND_JOURNAL')
+    # чтение истории (GET чата, страницы сообщений, экспорт) можно отдать secondary - ценой отставания реплики
+    mongodb_history_read_preference: str | None = Field(default=None, alias='MONGODB_HISTORY_READ_PREFERENCE')
+
+    # где хранятся чаты и сообщения: mongo - в монге, memory - в памяти процесса (один узел и один воркер,
+    # без монги); memory-хранилище переживает перезапуск, если задан memory_snapshot_path - снимок пишется
+    # раз в memory_snapshot_interval секунд (0 - только при остановке) и читается на старте
+    storage_backend: Literal['mongo', 'memory'] = Field(default='mongo', alias='STORAGE_BACKEND')
+    memory_snapshot_path: str | None = Field(default=None, alias='MEMORY_SNAPSHOT_PATH')
+    memory_snapshot_interval: float = Field(default=60, alias='MEMORY_SNAPSHOT_INTERVAL')
 
     mongo_db_db_name: str = Field(default='chat_db', alias="MONGODB_CHAT_DATABASE")
     mongo_db_collection_name: str = Field(default='chat_collection', alias='MONGODB_CHAT_COLLECTION')
+    mongo_db_messages_collection_name: str = Field(default='messages_collection', alias='MONGODB_MESSAGES_COLLECTION')
+    # embedded - сообщения массивом внутри документа чата (старый формат)
+    # collection - сообщения в отдельной коллекции mongo_db_messages_collection_name
+    #   (перенос старых данных: python -m infra.repositories.messages.migrations)
+    mongo_db_messages_layout: Literal['embedded', 'collection'] = Field(
+        default='embedded',
+        alias='MONGODB_MESSAGES_LAYOUT',
+    )
+    # групповая запись сообщений (opt-in): сообщения одного чата копятся до window мс или max_items штук
+    # и пишутся одной записью - меньше обращений к монге для "горячих" чатов; 0 - каждое сообщение пишется сразу
+    mongo_db_messages_coalesce_window_ms: float = Field(default=0, alias='MONGODB_MESSAGES_COALESCE_WINDOW_MS')
+    mongo_db_messages_coalesce_max_items: int = Field(default=100, alias='MONGODB_MESSAGES_COALESCE_MAX_ITEMS')
+    # кэш метаданных чатов в памяти процесса: до max_size чатов на ttl секунд,
+    # "чата нет" помнится negative_ttl секунд (столько другой процесс может не видеть только что созданный чат)
+    chats_cache_enabled: bool = Field(default=True, alias='CHATS_CACHE_ENABLED')
+    chats_cache_max_size: int = Field(default=10_000, alias='CHATS_CACHE_MAX_SIZE')
+    chats_cache_ttl: float = Field(default=300, alias='CHATS_CACHE_TTL')
+    chats_cache_negative_ttl: float = Field(default=5, alias='CHATS_CACHE_NEGATIVE_TTL')
+    # буфер последних сообщений активных чатов в памяти процесса: до capacity сообщений на чат,
+    # всего не больше max_bytes (вытесняются целые чаты); 0 - выключен (по умолчанию). Сообщения других процессов
+    # приходят событиями из kafka (топик new_message_received_topic) с задержкой relay - при нескольких воркерах
+    # автор может не сразу увидеть свое сообщение, если читает через другой воркер. Буфер чата живет ttl секунд
+    # с заполнения, потом перечитывается из хранилища (и заодно закрывает дыры от потерянных событий)
+    recent_messages_capacity: int = Field(default=0, alias='RECENT_MESSAGES_CAPACITY')
+    recent_messages_max_bytes: int = Field(default=64 * 1024 * 1024, alias='RECENT_MESSAGES_MAX_BYTES')
+    recent_messages_ttl: float | None = Field(default=5, alias='RECENT_MESSAGES_TTL')
+    # диагностика на старте: explain() по каждому запросу репозиториев,
+    # warn - пишет в лог запросы без индекса (COLLSCAN), fail - не дает приложению стартовать
+    mongo_db_explain_queries: Literal['off', 'warn', 'fail'] = Field(default='off', alias='MONGODB_EXPLAIN_QUERIES')
+
+    # медиатор: разные обработчики команд/событий выполняются одновременно (не больше max_concurrency),
+    # события пачки каждый обработчик получает по порядку;
+    # handler_timeout - таймаут одного обработчика в секундах (пусто - без таймаута)
+    mediator_concurrent_dispatch: bool = Field(default=True, alias='MEDIATOR_CONCURRENT_DISPATCH')
+    mediator_max_concurrency: int | None = Field(default=64, alias='MEDIATOR_MAX_CONCURRENCY')
+    mediator_handler_timeout: float | None = Field(default=None, alias='MEDIATOR_HANDLER_TIMEOUT')
+
+    # outbox: события агрегатов пишутся вместе с ними в монгу, а фоновый relay доставляет их пачками.
+    # при нескольких воркерах relay достаточно включить в одном (доставка at-least-once в любом случае)
+    outbox_relay_enabled: bool = Field(default=True, alias='OUTBOX_RELAY_ENABLED')
+    outbox_batch_size: int = Field(default=100, alias='OUTBOX_BATCH_SIZE')
+    outbox_poll_interval: float = Field(default=0.5, alias='OUTBOX_POLL_INTERVAL')
+    # relay работает во всех воркерах, но публикует один - держатель права на outbox_relay_lease_ttl секунд
+    # (документ в коллекции mongo_db_outbox_leases_collection_name); упал держатель - право переходит через ttl
+    outbox_relay_lease_ttl: float = Field(default=10, alias='OUTBOX_RELAY_LEASE_TTL')
+    mongo_db_outbox_leases_collection_name: str = Field(
+        default='outbox_leases',
+        alias='MONGODB_OUTBOX_LEASES_COLLECTION',
+    )
+
+    # kafka: продюсер собирает сообщения в пачки (linger_ms / max_batch_size байт) и сжимает их
+    kafka_url: str = Field(default='kafka:29092', alias='KAFKA_URL')
+    kafka_linger_ms: int = Field(default=5, alias='KAFKA_LINGER_MS')
+    kafka_max_batch_size: int = Field(default=64 * 1024, alias='KAFKA_MAX_BATCH_SIZE')
+    kafka_compression_type: Literal['gzip', 'snappy', 'lz4', 'zstd'] | None = Field(
+        default='gzip',
+        alias='KAFKA_COMPRESSION_TYPE',
+    )
+    new_message_received_topic: str = Field(default='new-messages', alias='NEW_MESSAGE_RECEIVED_TOPIC')
+    # созданные чаты - каждый процесс API сбрасывает по ним negative-записи своего кэша чатов
+    new_chat_created_topic: str = Field(default='new-chats', alias='NEW_CHAT_CREATED_TOPIC')
+
+    # консьюмер событий (python -m application.consumers.main): workers воркеров, у каждого очередь
+    # на consumer_queue_size сообщений, офсеты коммитятся раз в consumer_commit_interval секунд
+    kafka_consumer_group_id: str = Field(default='chat-events', alias='KAFKA_CONSUMER_GROUP_ID')
+    consumer_workers: int = Field(default=16, alias='CONSUMER_WORKERS')
+    consumer_queue_size: int = Field(default=100, alias='CONSUMER_QUEUE_SIZE')
+    consumer_max_records: int = Field(default=500, alias='CONSUMER_MAX_RECORDS')
+    consumer_commit_interval: float = Field(default=1.0, alias='CONSUMER_COMMIT_INTERVAL')
+
+    # веб-сокеты: сколько сообщений может ждать отправки одному клиенту, дальше клиент отключается
+    websocket_send_queue_size: int = Field(default=100, alias='WEBSOCKET_SEND_QUEUE_SIZE')
+    # бэкплейн - доставка сообщений до сокетов других процессов/узлов API:
+    # kafka - через топик websocket_backplane_topic, публикует консьюмер событий (application.consumers.main);
+    # memory - только внутри процесса (один воркер), публикует relay процесса API
+    websocket_backplane: Literal['kafka', 'memory'] = Field(default='kafka', alias='WEBSOCKET_BACKPLANE')
+    websocket_backplane_topic: str = Field(default='chat-websockets', alias='WEBSOCKET_BACKPLANE_TOPIC')
+
+    # экспорт истории чата: сколько сообщений читается из хранилища и отправляется клиенту за раз
+    chat_export_batch_size: int = Field(default=1000, alias='CHAT_EXPORT_BATCH_SIZE')
+
+    # метрики prometheus (GET /metrics): время команд, запросов и вызовов монго-репозиториев, задержка
+    # публикации событий; False - медиатор и репозитории не замеряются (эндпоинт отдает только счетчики кэшей,
+    # веб-сокеты и время старта)
+    metrics_enabled: bool = Field(default=True, alias='METRICS_ENABLED')
 
     class Config:
         env_file = "../../.env"
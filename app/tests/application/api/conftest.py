@@ -9,7 +9,8 @@ from tests.fixtures import init_dummy_container
 @pytest.fixture
 def app() -> FastAPI:
     app = create_app()
-    app.dependency_overrides[init_container] = init_dummy_container
+    container = init_dummy_container()  # один контейнер на приложение - иначе memory-репозиторий пустой на каждый запрос
+    app.dependency_overrides[init_container] = lambda: container
     return app
 
 @pytest.fixture
@@ -0,0 +1,57 @@
+from dataclasses import dataclass
+
+import pytest
+from fastapi import FastAPI, status
+from fastapi.testclient import TestClient
+from punq import Scope
+
+from infra.message_brokers.base import BaseMessageBroker
+from infra.message_brokers.memory import MemoryMessageBroker
+from infra.websockets.backplanes import BaseWebSocketsBackplane, MemoryWebSocketsBackplane
+from infra.websockets.managers import ConnectionManager
+from logic.init import init_container
+
+
+def test_lifespan_warms_up_before_requests(app: FastAPI):
+    assert TestClient(app).get('/health').json()['startup_seconds'] is None
+
+    # with - запускает lifespan: старт до первого запроса и остановка после последнего
+    with TestClient(app) as client:
+        response = client.get('/health')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()['startup_seconds'] > 0
+
+        create_response = client.post(url=app.url_path_for('create_chat_handler'), json={'title': 'title'})
+        assert create_response.status_code == status.HTTP_201_CREATED
+
+
+@dataclass
+class ClosingRecordingBroker(MemoryMessageBroker):
+    closed: bool = False
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+@dataclass(eq=False)
+class FailingBackplane(MemoryWebSocketsBackplane):
+    async def start(self) -> None:
+        raise RuntimeError('backplane is unavailable')
+
+
+def test_lifespan_closes_started_components_when_startup_fails(app: FastAPI):
+    container = app.dependency_overrides[init_container]()
+    broker = ClosingRecordingBroker()
+    container.register(BaseMessageBroker, instance=broker, scope=Scope.singleton)
+    container.register(
+        BaseWebSocketsBackplane,
+        instance=FailingBackplane(connection_manager=ConnectionManager()),
+        scope=Scope.singleton,
+    )
+
+    with pytest.raises(RuntimeError):
+        with TestClient(app):
+            pass
+
+    # брокер стартовал раньше бэкплейна - при неудачном старте его закрывает сам lifespan
+    assert broker.closed
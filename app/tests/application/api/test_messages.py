@@ -1,3 +1,4 @@
+import json
 
 from faker import Faker
 from fastapi import FastAPI, status
@@ -5,6 +6,8 @@ from httpx import Response
 from fastapi.testclient import TestClient
 import pytest
 
+from application.api.messages.schema import BULK_MESSAGES_MAX_ITEMS
+
 
 @pytest.mark.asyncio
 async def test_create_chat_success(
@@ -26,6 +29,21 @@ async def test_create_chat_success(
     assert json_data['title'] == title
 
 
+@pytest.mark.asyncio
+async def test_create_chat_failed_title_already_exists(
+        app: FastAPI,
+        client: TestClient,
+        faker: Faker
+):
+    url = app.url_path_for('create_chat_handler')
+    title = faker.text()[:100]
+    assert client.post(url=url, json={'title': title}).is_success
+
+    response: Response = client.post(url=url, json={'title': title})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST, response.json()
+    assert response.json()['detail']['error']
+
+
 @pytest.mark.asyncio
 async def test_create_chat_failed_text_too_long(
         app: FastAPI,
@@ -53,3 +71,117 @@ async def test_create_chat_failed_text_empty_title(
 
     json_data = response.json()
     assert json_data['detail']['error']  # просто что пришла ошиюбка
+
+
+@pytest.mark.asyncio
+async def test_get_chat_success(
+        app: FastAPI,
+        client: TestClient,
+        faker: Faker
+):
+    title = faker.text()[:100]
+    create_response: Response = client.post(url=app.url_path_for('create_chat_handler'), json={'title': title})
+    chat_oid = create_response.json()['oid']
+
+    response: Response = client.get(url=app.url_path_for('get_chat_with_messages_handler', chat_oid=chat_oid))
+    assert response.status_code == status.HTTP_200_OK, response.json()
+
+    json_data = response.json()
+    assert json_data['oid'] == chat_oid
+    assert json_data['title'] == title
+    assert json_data['messages'] == []
+
+
+@pytest.mark.asyncio
+async def test_get_chat_not_found(
+        app: FastAPI,
+        client: TestClient,
+        faker: Faker
+):
+    response: Response = client.get(url=app.url_path_for('get_chat_with_messages_handler', chat_oid=faker.uuid4()))
+    assert response.status_code == status.HTTP_400_BAD_REQUEST, response.json()
+    assert response.json()['detail']['error']
+
+
+@pytest.mark.asyncio
+async def test_get_chat_messages_invalid_cursor(
+        app: FastAPI,
+        client: TestClient,
+        faker: Faker
+):
+    create_response: Response = client.post(
+        url=app.url_path_for('create_chat_handler'),
+        json={'title': faker.text()[:100]},
+    )
+    url = app.url_path_for('get_chat_messages_handler', chat_oid=create_response.json()['oid'])
+
+    response: Response = client.get(url=url, params={'before': 'not-a-cursor'})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST, response.json()
+    assert response.json()['detail']['error']
+
+
+@pytest.mark.asyncio
+async def test_get_chat_messages_chat_not_found(
+        app: FastAPI,
+        client: TestClient,
+        faker: Faker
+):
+    url = app.url_path_for('get_chat_messages_handler', chat_oid=faker.uuid4())
+
+    response: Response = client.get(url=url)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST, response.json()
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_messages_chat_not_found(
+        app: FastAPI,
+        client: TestClient,
+        faker: Faker,
+):
+    url = app.url_path_for('bulk_create_messages_handler', chat_oid=faker.uuid4())
+    response: Response = client.post(url=url, json={'texts': [faker.text()]})
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST, response.json()
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_messages_too_many_items(
+        app: FastAPI,
+        client: TestClient,
+        faker: Faker,
+):
+    url = app.url_path_for('bulk_create_messages_handler', chat_oid=faker.uuid4())
+    response: Response = client.post(url=url, json={'texts': ['text'] * (BULK_MESSAGES_MAX_ITEMS + 1)})
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_create_messages_then_read_and_export_chat(
+        app: FastAPI,
+        client: TestClient,
+        faker: Faker,
+):
+    create_response: Response = client.post(url=app.url_path_for('create_chat_handler'), json={'title': faker.text()[:100]})
+    chat_oid = create_response.json()['oid']
+
+    message_response: Response = client.post(
+        url=app.url_path_for('create_message_handler', chat_oid=chat_oid),
+        json={'text': 'first'},
+    )
+    assert message_response.status_code == status.HTTP_201_CREATED, message_response.json()
+    bulk_response: Response = client.post(
+        url=app.url_path_for('bulk_create_messages_handler', chat_oid=chat_oid),
+        json={'texts': ['second', 'third']},
+    )
+    assert bulk_response.status_code == status.HTTP_200_OK, bulk_response.json()
+
+    chat_response: Response = client.get(url=app.url_path_for('get_chat_with_messages_handler', chat_oid=chat_oid))
+    assert sorted(message['text'] for message in chat_response.json()['messages']) == ['first', 'second', 'third']
+
+    export_url = app.url_path_for('export_chat_handler', chat_oid=chat_oid)
+    assert client.get(url=export_url).json() == chat_response.json()
+
+    ndjson_response: Response = client.get(url=export_url, params={'format': 'ndjson'})
+    assert ndjson_response.headers['content-type'] == 'application/x-ndjson'
+    assert [json.loads(line) for line in ndjson_response.text.splitlines()] == chat_response.json()['messages']
@@ -0,0 +1,20 @@
+from fastapi import FastAPI, status
+from fastapi.testclient import TestClient
+
+
+def test_metrics_endpoint_exposes_handlers_and_startup(app: FastAPI):
+    with TestClient(app) as client:
+        create_response = client.post(url=app.url_path_for('create_chat_handler'), json={'title': 'title'})
+        chat_oid = create_response.json()['oid']
+        client.get(url=app.url_path_for('get_chat_with_messages_handler', chat_oid=chat_oid))
+
+        response = client.get('/metrics')
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers['content-type'].startswith('text/plain')
+    body = response.text
+    assert 'chat_command_duration_seconds_count{command="CreateChatCommand"} 1.0' in body
+    assert 'chat_query_duration_seconds_count{query="GetChatQuery"} 1.0' in body
+    assert 'chat_websocket_connections 0.0' in body
+    assert 'chat_cache_hits_total{cache="recent_messages"}' in body
+    assert 'chat_startup_seconds' in body
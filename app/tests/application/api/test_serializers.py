@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from domain.entities.messages import Chat, Message
+from domain.values.messages import Text, Title
+from infra.repositories.filters.messages import MessagesCursor
+from infra.repositories.messages.codecs import decode_message, encode_message
+from application.api.messages.schema import ChatDetailSchema, GetMessagesQueryResponseSchema
+from application.api.messages.serializers import serialize_chat, serialize_messages_page, stream_chat_json, \
+    stream_messages_ndjson
+from logic.queries.messages import MessagesPage
+
+
+def test_serializers_match_schemas():
+    messages = [Message(text=Text(f'message {number}')) for number in range(3)]
+    chat = Chat(title=Title('title'), messages=messages)
+    page = MessagesPage(
+        items=messages,
+        limit=3,
+        before=MessagesCursor(created_at=messages[0].created_at, oid=messages[0].oid),
+    )
+
+    assert serialize_chat(chat) == ChatDetailSchema.from_entity(chat).model_dump_json().encode()
+    assert serialize_messages_page(page) == GetMessagesQueryResponseSchema.from_page(page).model_dump_json().encode()
+
+
+def test_message_codec_roundtrip():
+    message = Message(text=Text('hello world'))
+    decoded = decode_message({'_id': 'ignored', **encode_message(message)})
+
+    assert (decoded.oid, decoded.created_at, decoded.text) == (message.oid, message.created_at, message.text)
+    assert decoded.pull_events() == []
+
+
+async def iterate_batches(messages: list[Message], batch_size: int):
+    for start in range(0, len(messages), batch_size):
+        yield messages[start:start + batch_size]
+
+
+@pytest.mark.asyncio
+async def test_streamed_export_matches_full_serialization():
+    messages = [Message(text=Text(f'message {number}')) for number in range(5)]
+    chat = Chat(title=Title('title'), messages=messages)
+
+    chunks = [chunk async for chunk in stream_chat_json(chat, iterate_batches(messages, batch_size=2))]
+    assert b''.join(chunks) == serialize_chat(chat)
+    empty_chat = Chat(title=Title('empty'))
+    assert b''.join([chunk async for chunk in stream_chat_json(empty_chat, iterate_batches([], 2))]) == (
+        serialize_chat(empty_chat)
+    )
+
+    lines = b''.join([chunk async for chunk in stream_messages_ndjson(iterate_batches(messages, batch_size=2))])
+    assert [json.loads(line)['oid'] for line in lines.splitlines()] == [message.oid for message in messages]
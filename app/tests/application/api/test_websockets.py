@@ -0,0 +1,44 @@
+import pytest
+from faker import Faker
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from domain.events.messages import NewMessageReceivedEvent
+from infra.websockets.managers import BaseConnectionManager
+from logic.consumers import EventsConsumer
+from logic.init import init_container
+from logic.mediator import Mediator
+
+
+def test_websocket_receives_new_messages(
+        app: FastAPI,
+        client: TestClient,
+        faker: Faker,
+):
+    chat_oid = client.post(url=app.url_path_for('create_chat_handler'), json={'title': faker.text()[:100]}).json()['oid']
+    container = app.dependency_overrides[init_container]()
+
+    events_consumer = container.resolve(EventsConsumer)
+
+    with client.websocket_connect(app.url_path_for('websocket_chat_handler', chat_oid=chat_oid)) as websocket:
+        event = NewMessageReceivedEvent(message_text=faker.text()[:100], message_oid=faker.uuid4(), chat_oid=chat_oid)
+        # в приложении события публикует OutboxRelay - в тесте публикуем сами, в цикле событий приложения:
+        # relay отправляет событие в брокер, а по сокетам его рассылает консьюмер событий
+        websocket.portal.call(container.resolve(Mediator).publish_event, [event])
+        websocket.portal.call(events_consumer.consumer.start)
+        consumer_run = websocket.portal.start_task_soon(events_consumer.run)
+
+        assert websocket.receive_json() == {'oid': event.message_oid, 'text': event.message_text, 'chat_oid': chat_oid}
+
+        websocket.portal.call(events_consumer.stop)
+        consumer_run.result(timeout=5)
+
+    assert not container.resolve(BaseConnectionManager).has_connections(chat_oid)
+
+
+def test_websocket_chat_not_found(app: FastAPI, client: TestClient):
+    with client.websocket_connect(app.url_path_for('websocket_chat_handler', chat_oid='unknown')) as websocket:
+        assert 'error' in websocket.receive_json()
+        with pytest.raises(WebSocketDisconnect):
+            websocket.receive_text()
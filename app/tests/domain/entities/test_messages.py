@@ -0,0 +1,50 @@
+import pytest
+
+from domain.entities.messages import Chat, LazyMessages, Message
+from domain.exceptions.messages import ChatMessagesNotLoadedException
+from domain.values.messages import Text, Title
+
+
+def test_lazy_messages_loaded_only_on_read():
+    stored_message = Message(text=Text('stored'))
+    loader_calls = []
+
+    def loader():
+        loader_calls.append(1)
+        return [stored_message]
+
+    chat = Chat(title=Title('title'), messages=LazyMessages(loader=loader))
+    new_message = Message(text=Text('new'))
+
+    chat.add_message(new_message)
+    assert not loader_calls
+
+    assert list(chat.messages) == [stored_message, new_message]
+    assert len(chat.messages) == 2
+    assert len(loader_calls) == 1
+
+
+def test_lazy_messages_metadata_only_chat():
+    chat = Chat(title=Title('title'), messages=LazyMessages(chat_oid='chat-oid'))
+    message = Message(text=Text('hello world'))
+
+    chat.add_message(message)
+    events = chat.pull_events()
+    assert len(events) == 1
+    assert events[0].message_oid == message.oid
+
+    with pytest.raises(ChatMessagesNotLoadedException):
+        list(chat.messages)
+
+
+def test_entities_are_slotted_and_allocate_events_lazily():
+    chat = Chat(title=Title('title'))
+    message = Message(text=Text('hello world'))
+
+    assert not hasattr(message, '__dict__')
+    assert not hasattr(message.text, '__dict__')
+    assert message.pull_events() == []
+
+    chat.add_message(message)
+    assert len(chat.pull_events()) == 1
+    assert chat.pull_events() == []
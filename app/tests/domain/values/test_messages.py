@@ -71,3 +71,14 @@ def test_add_chat_to_events():
     assert new_event.message_oid == message.oid
     assert new_event.message_text == message.text.as_generic_type()
     assert new_event.message_oid == message.oid
+
+
+def test_value_objects_from_trusted_skip_validation():
+    text = Text.from_trusted('hello world')
+    assert text == Text('hello world')
+    assert hash(text) == hash(Text('hello world'))
+
+    # хранилищу верим: ограничения проверяются только на пути команд
+    assert Title.from_trusted('t' * 256).as_generic_type() == 't' * 256
+    with pytest.raises(TitleToolLongException):
+        Title('t' * 256)
@@ -1,8 +1,6 @@
-from punq import Container, Scope
+from punq import Container
 
-from infra.repositories.messages.base import BaseChatsRepository
-from infra.repositories.messages.memory import MemoryChatsRepository
-from logic.init import _init_container
+from logic.init import init_memory_container
 
 
 def init_dummy_container() -> Container:
@@ -12,11 +10,6 @@ def init_dummy_container() -> Container:
     вместо повторения содержимого в данный метод из init_container,
     мы его для BaseChatRepository вызываем ПРОДОВСКИЙ(init_container с МонгоДбРеп), НО ПРИ ЭТОМ
     - перегестрируем методы, которые нам нужны(для теста с МемориДбРеп) для данной функции (container.register(1,2))
+    Чаты, сообщения, outbox и брокер - в памяти (logic.init.init_memory_container, им же пользуются бенчмарки).
     """
-    container = _init_container()
-
-    container.register(BaseChatsRepository, MemoryChatsRepository, scope=Scope.singleton)
-    return container
-
-
-
+    return init_memory_container()
@@ -0,0 +1,122 @@
+import asyncio
+from dataclasses import dataclass, field
+
+import pytest
+
+from domain.entities.messages import Chat
+from domain.events.messages import NewChatCreatedEvent
+from domain.values.messages import Title
+from infra.message_brokers.memory import MemoryMessageBroker, MemoryMessageConsumer
+from infra.repositories.cache import MISSING, LRUCache
+from infra.repositories.messages.cached import CachedChatsRepository
+from infra.repositories.messages.memory import MemoryChatsRepository
+from logic.consumers import BroadcastEventsConsumer
+from logic.events.messages import NewChatCreatedBrokerEventHandler, NewChatCreatedEventHandler
+from logic.mediator import Mediator
+
+
+@dataclass
+class CountingChatsRepository(MemoryChatsRepository):
+    calls: list[str] = field(default_factory=list, kw_only=True)
+
+    async def get_chat_metadata_by_oid(self, oid: str) -> Chat | None:
+        self.calls.append(oid)
+        return await super().get_chat_metadata_by_oid(oid)
+
+
+@dataclass
+class FakeClock:
+    now: float = 0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_lru_cache_evicts_least_recently_used_and_expired():
+    clock = FakeClock()
+    cache = LRUCache(max_size=2, ttl=10, clock=clock)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+
+    assert cache.get('b') is MISSING
+    clock.now = 11
+    assert cache.get('a') is MISSING
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.evictions) == (1, 2, 1)
+
+
+@pytest.mark.asyncio
+async def test_cached_chats_repository_reads_through_once():
+    repository = CountingChatsRepository()
+    chat = Chat(title=Title('title'))
+    await repository.add_chat(chat)
+    cached_repository = CachedChatsRepository(repository=repository)
+
+    first = await cached_repository.get_chat_metadata_by_oid(chat.oid)
+    second = await cached_repository.get_chat_metadata_by_oid(chat.oid)
+
+    assert first.oid == second.oid == chat.oid
+    assert first.title == chat.title
+    assert first is not second
+    assert repository.calls == [chat.oid]
+    assert (cached_repository.chats_cache.stats.hits, cached_repository.chats_cache.stats.misses) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_cached_chats_repository_negative_entry_invalidated_by_event():
+    repository = CountingChatsRepository()
+    cached_repository = CachedChatsRepository(repository=repository)
+    chat = Chat(title=Title('title'))
+
+    assert await cached_repository.get_chat_metadata_by_oid(chat.oid) is None
+    assert await cached_repository.get_chat_by_oid(chat.oid) is None
+    assert repository.calls == [chat.oid]
+
+    # чат создан в обход этого кэша (другим процессом) - узнаем о нем из события
+    await repository.add_chat(chat)
+    assert await cached_repository.get_chat_metadata_by_oid(chat.oid) is None
+
+    handler = NewChatCreatedEventHandler(chats_repository=cached_repository)
+    await handler.handle(NewChatCreatedEvent(chat_oid=chat.oid, chat_title=chat.title.as_generic_type()))
+
+    assert (await cached_repository.get_chat_metadata_by_oid(chat.oid)).oid == chat.oid
+
+
+@pytest.mark.asyncio
+async def test_chat_created_by_other_process_reaches_cache_through_broker():
+    broker = MemoryMessageBroker()
+    # процесс, создавший чат: relay отправляет событие в брокер
+    relay_mediator = Mediator()
+    relay_mediator.register_event(
+        NewChatCreatedEvent,
+        [NewChatCreatedBrokerEventHandler(message_broker=broker, broker_topic='new-chats')],
+    )
+    relay_mediator.freeze()
+
+    # другой процесс: negative-запись в кэше и слушатель событий на том же брокере
+    repository = CountingChatsRepository()
+    cached_repository = CachedChatsRepository(repository=repository, negative_ttl=300)
+    listener_mediator = Mediator()
+    listener_mediator.register_event(NewChatCreatedEvent, [NewChatCreatedEventHandler(chats_repository=cached_repository)])
+    listener = BroadcastEventsConsumer(
+        consumer=MemoryMessageConsumer(broker=broker, topics=('new-chats',)),
+        mediator=listener_mediator.freeze(),
+        workers=1,
+        fetch_timeout=0.01,
+    )
+    await listener.consumer.start()
+    listener_task = asyncio.create_task(listener.run())
+
+    chat = Chat(title=Title('title'))
+    assert await cached_repository.get_chat_metadata_by_oid(chat.oid) is None
+
+    await repository.add_chat(chat)
+    await relay_mediator.publish_event([NewChatCreatedEvent(chat_oid=chat.oid, chat_title=chat.title.as_generic_type())])
+    async with asyncio.timeout(5):
+        while cached_repository.chats_cache.get(chat.oid) is not MISSING:
+            await asyncio.sleep(0.01)
+
+    listener.stop()
+    await listener_task
+    assert (await cached_repository.get_chat_metadata_by_oid(chat.oid)).oid == chat.oid
@@ -0,0 +1,213 @@
+import asyncio
+import random
+from dataclasses import dataclass, field
+
+import pytest
+from punq import Container, Scope
+
+from domain.events.messages import NewMessageReceivedEvent
+from infra.message_brokers.converters import convert_event_to_broker_message
+from infra.message_brokers.memory import MemoryMessageBroker, MemoryMessageConsumer
+from infra.repositories.messages.recent import RecentMessagesBuffer
+from logic.consumers import BroadcastEventsConsumer, EventsConsumer
+from logic.events.base import EventHandler
+from logic.events.messages import NewMessageReceivedEventHandler, NewMessageReceivedRecentMessagesEventHandler, \
+    NewMessageReceivedWebSocketsEventHandler
+from logic.mediator import Mediator
+from settings.config import Config
+
+TOPIC = 'new-messages'
+
+
+@dataclass(frozen=True)
+class SlowRecordingEventHandler(EventHandler[NewMessageReceivedEvent, None]):
+    handled: list = field(default_factory=list)
+    max_delay: float = 0.002
+
+    async def handle(self, event: NewMessageReceivedEvent) -> None:
+        await asyncio.sleep(random.uniform(0, self.max_delay))
+        self.handled.append(event)
+
+
+@dataclass(frozen=True)
+class GatedRecordingEventHandler(EventHandler[NewMessageReceivedEvent, None]):
+    """
+    Обрабатывает событие, только когда тест выпустит его через gate.release().
+    """
+    gate: asyncio.Semaphore = field(default_factory=lambda: asyncio.Semaphore(0))
+    handled: list = field(default_factory=list)
+
+    async def handle(self, event: NewMessageReceivedEvent) -> None:
+        await self.gate.acquire()
+        self.handled.append(event)
+
+
+async def produce_events(broker: MemoryMessageBroker, count: int, chats: int) -> list[NewMessageReceivedEvent]:
+    events = [
+        NewMessageReceivedEvent(message_text=f'text {index}', message_oid=str(index), chat_oid=f'chat-{index % chats}')
+        for index in range(count)
+    ]
+    for event in events:
+        await broker.send_message(topic=TOPIC, value=convert_event_to_broker_message(event), key=event.chat_oid.encode())
+    return events
+
+
+async def consume_until(events_consumer: EventsConsumer, handler: SlowRecordingEventHandler, count: int) -> None:
+    task = asyncio.create_task(events_consumer.run())
+    async with asyncio.timeout(5):
+        while len(handler.handled) < count:
+            await asyncio.sleep(0.01)
+    events_consumer.stop()
+    await task
+
+
+def build_mediator(handler: EventHandler) -> Mediator:
+    mediator = Mediator(concurrent_dispatch=True)
+    mediator.register_event(NewMessageReceivedEvent, [handler])
+    return mediator.freeze()
+
+
+@pytest.mark.asyncio
+async def test_consumer_keeps_chat_order_and_commits_offsets():
+    broker = MemoryMessageBroker(partitions=4)
+    events = await produce_events(broker, count=200, chats=10)
+
+    handler = SlowRecordingEventHandler()
+    message_consumer = MemoryMessageConsumer(broker=broker, topics=(TOPIC,))
+    events_consumer = EventsConsumer(
+        consumer=message_consumer,
+        mediator=build_mediator(handler),
+        workers=4,
+        queue_size=5,
+        fetch_timeout=0.01,
+        commit_interval=0.01,
+    )
+
+    await message_consumer.start()
+    await consume_until(events_consumer, handler, count=len(events))
+
+    for chat_index in range(10):
+        chat_oid = f'chat-{chat_index}'
+        assert [event.message_oid for event in handler.handled if event.chat_oid == chat_oid] == [
+            event.message_oid for event in events if event.chat_oid == chat_oid
+        ]
+
+    assert message_consumer.committed == {
+        (TOPIC, partition): len(broker.get_messages(TOPIC, partition))
+        for partition in range(broker.partitions)
+        if broker.get_messages(TOPIC, partition)
+    }
+    assert not message_consumer.paused
+
+
+@pytest.mark.asyncio
+async def test_consumer_pauses_partitions_when_queues_are_full():
+    broker = MemoryMessageBroker(partitions=1)
+    await produce_events(broker, count=20, chats=1)
+
+    handler = SlowRecordingEventHandler(max_delay=0.01)
+    message_consumer = MemoryMessageConsumer(broker=broker, topics=(TOPIC,))
+    events_consumer = EventsConsumer(
+        consumer=message_consumer,
+        mediator=build_mediator(handler),
+        workers=1,
+        queue_size=2,
+        fetch_timeout=0.01,
+    )
+
+    await message_consumer.start()
+    task = asyncio.create_task(events_consumer.run())
+    await asyncio.sleep(0.005)
+    assert message_consumer.paused == {(TOPIC, 0)}
+
+    async with asyncio.timeout(5):
+        while len(handler.handled) < 20:
+            await asyncio.sleep(0.01)
+    events_consumer.stop()
+    await task
+
+    assert not message_consumer.paused
+    assert message_consumer.committed == {(TOPIC, 0): 20}
+
+
+@pytest.mark.asyncio
+async def test_consumer_keeps_partition_paused_until_queue_drains():
+    broker = MemoryMessageBroker(partitions=1)
+    await produce_events(broker, count=20, chats=1)
+
+    handler = GatedRecordingEventHandler()
+    message_consumer = MemoryMessageConsumer(broker=broker, topics=(TOPIC,))
+    fetched = []
+    get_many = message_consumer.get_many
+
+    async def record_get_many(max_records: int, timeout: float):
+        messages = await get_many(max_records=max_records, timeout=timeout)
+        fetched.extend(messages)
+        return messages
+
+    message_consumer.get_many = record_get_many
+    events_consumer = EventsConsumer(
+        consumer=message_consumer,
+        mediator=build_mediator(handler),
+        workers=1,
+        queue_size=4,
+        max_records=6,
+        fetch_timeout=0.01,
+    )
+
+    async def release(count: int) -> None:
+        for _ in range(count):
+            expected = len(handler.handled) + 1
+            handler.gate.release()
+            async with asyncio.timeout(5):
+                while len(handler.handled) < expected:
+                    await asyncio.sleep(0.001)
+        # даем циклу чтения несколько опросов брокера
+        await asyncio.sleep(0.05)
+
+    await message_consumer.start()
+    task = asyncio.create_task(events_consumer.run())
+    await asyncio.sleep(0.05)
+    # первая пачка - 6 сообщений: одно у воркера, 4 в очереди, последнее ждет места
+    assert len(fetched) == 6
+    assert message_consumer.paused == {(TOPIC, 0)}
+
+    # вся пачка уже в очереди, но воркер еще не разобрал ее до половины -
+    # партиция остается на паузе и новые сообщения не выбираются
+    await release(3)
+    assert len(fetched) == 6
+    assert message_consumer.paused == {(TOPIC, 0)}
+
+    # очередь разобрана до половины - чтение партиции продолжается
+    await release(1)
+    assert len(fetched) > 6
+
+    await release(20 - len(handler.handled))
+    events_consumer.stop()
+    await task
+
+    assert not message_consumer.paused
+    assert message_consumer.committed == {(TOPIC, 0): 20}
+
+
+def test_websockets_fan_out_runs_in_events_consumer(container: Container, mediator: Mediator):
+    consumer_handlers = container.resolve(EventsConsumer).mediator.events_map[NewMessageReceivedEvent]
+    relay_handlers = mediator.events_map[NewMessageReceivedEvent]
+
+    # с kafka-бэкплейном relay API только отправляет событие в брокер, по сокетам рассылает консьюмер
+    assert [handler.__class__ for handler in consumer_handlers] == [NewMessageReceivedWebSocketsEventHandler]
+    assert [handler.__class__ for handler in relay_handlers] == [NewMessageReceivedEventHandler]
+
+
+def test_events_listener_uses_production_wiring_with_injected_consumer(container: Container):
+    container.register(RecentMessagesBuffer, instance=RecentMessagesBuffer(capacity=10), scope=Scope.singleton)
+    config = container.resolve(Config)
+
+    listener = container.resolve(BroadcastEventsConsumer)
+
+    # тестовый контейнер подменяет только фабрику консьюмеров - топики и обработчики те же, что в проде
+    assert isinstance(listener.consumer, MemoryMessageConsumer)
+    assert listener.consumer.topics == (config.new_message_received_topic, config.new_chat_created_topic)
+    assert [handler.__class__ for handler in listener.mediator.events_map[NewMessageReceivedEvent]] == [
+        NewMessageReceivedRecentMessagesEventHandler,
+    ]
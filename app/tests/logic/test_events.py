@@ -0,0 +1,143 @@
+import asyncio
+import json
+
+import pytest
+
+from domain.events.messages import NewMessageReceivedEvent
+from infra.message_brokers.converters import convert_broker_message_to_event
+from infra.message_brokers.memory import MemoryMessageBroker, MemoryMessageConsumer
+from infra.websockets.backplanes import KafkaWebSocketsBackplane, MemoryWebSocketsBackplane, MemoryWebSocketsBus
+from infra.websockets.managers import ConnectionManager
+from logic.events.messages import NewMessageReceivedEventHandler, NewMessageReceivedWebSocketsEventHandler
+from logic.mediator import Mediator
+
+
+@pytest.mark.asyncio
+async def test_new_message_events_sent_to_broker_partitioned_by_chat():
+    broker = MemoryMessageBroker(partitions=4)
+    mediator = Mediator(concurrent_dispatch=True, max_concurrency=8)
+    mediator.register_event(
+        NewMessageReceivedEvent,
+        [NewMessageReceivedEventHandler(message_broker=broker, broker_topic='new-messages')],
+    )
+    mediator.freeze()
+
+    events = [
+        NewMessageReceivedEvent(message_text=f'text {index}', message_oid=str(index), chat_oid=f'chat-{index % 3}')
+        for index in range(30)
+    ]
+    await mediator.publish_event(events)
+
+    messages = broker.get_messages('new-messages')
+    assert len(messages) == len(events)
+
+    for chat_oid in ('chat-0', 'chat-1', 'chat-2'):
+        chat_messages = [message for message in messages if message.key == chat_oid.encode()]
+        # все события чата - в одной партиции и в порядке публикации
+        assert len({message.partition for message in chat_messages}) == 1
+        assert [convert_broker_message_to_event(message.value).message_oid for message in chat_messages] == [
+            event.message_oid for event in events if event.chat_oid == chat_oid
+        ]
+
+
+class FakeWebSocket:
+    def __init__(self, blocked: bool = False):
+        self.sent: list[str] = []
+        self.closed_with: int | None = None
+        self._unblocked = asyncio.Event()
+        if not blocked:
+            self._unblocked.set()
+
+    async def send_text(self, payload: str) -> None:
+        await self._unblocked.wait()
+        self.sent.append(payload)
+
+    async def close(self, code: int) -> None:
+        self.closed_with = code
+
+
+@pytest.mark.asyncio
+async def test_websockets_broadcast_does_not_wait_for_slow_client():
+    connection_manager = ConnectionManager(send_queue_size=2)
+    backplane = MemoryWebSocketsBackplane(connection_manager=connection_manager)
+    await backplane.subscribe('chat')
+    handler = NewMessageReceivedWebSocketsEventHandler(backplane=backplane)
+    fast_websocket, slow_websocket = FakeWebSocket(), FakeWebSocket(blocked=True)
+    await connection_manager.accept_connection(websocket=fast_websocket, key='chat')
+    await connection_manager.accept_connection(websocket=slow_websocket, key='chat')
+
+    events = [NewMessageReceivedEvent(message_text=f'text {index}', message_oid=str(index), chat_oid='chat') for index in range(5)]
+    for event in events:
+        await handler.handle(event)
+        await asyncio.sleep(0)  # отправщики успевают забрать сообщение из очереди
+
+    assert [json.loads(payload)['oid'] for payload in fast_websocket.sent] == [event.message_oid for event in events]
+    # очередь медленного клиента переполнилась - его отключили, остальным рассылка продолжается
+    assert slow_websocket.closed_with == 1013
+    assert list(connection_manager.connections_map['chat']) == [fast_websocket]
+
+
+@pytest.mark.asyncio
+async def test_websockets_backplane_delivers_only_to_subscribed_nodes():
+    bus = MemoryWebSocketsBus()
+    sender, listener, idle = (
+        MemoryWebSocketsBackplane(connection_manager=ConnectionManager(), bus=bus) for _ in range(3)
+    )
+    websocket = FakeWebSocket()
+    await listener.connection_manager.accept_connection(websocket=websocket, key='chat')
+    await listener.subscribe('chat')
+
+    event = NewMessageReceivedEvent(message_text='hello', message_oid='oid', chat_oid='chat')
+    await NewMessageReceivedWebSocketsEventHandler(backplane=sender).handle(event)
+    await asyncio.sleep(0)
+
+    assert [json.loads(payload)['text'] for payload in websocket.sent] == ['hello']
+    assert bus.subscribers == {'chat': {listener}}
+
+    await listener.unsubscribe('chat')
+    assert not bus.subscribers
+
+
+def make_kafka_backplane(broker: MemoryMessageBroker) -> KafkaWebSocketsBackplane:
+    return KafkaWebSocketsBackplane(
+        connection_manager=ConnectionManager(),
+        message_broker=broker,
+        message_consumer=MemoryMessageConsumer(broker=broker, topics=('chat-websockets',)),
+        topic='chat-websockets',
+        fetch_timeout=0.01,
+    )
+
+
+@pytest.mark.asyncio
+async def test_kafka_backplane_delivers_shared_topic_only_to_local_subscriptions():
+    broker = MemoryMessageBroker(partitions=2)
+    listener, idle = make_kafka_backplane(broker), make_kafka_backplane(broker)
+    # публикует консьюмер событий - сам он слушателей не держит и не стартует
+    publisher = make_kafka_backplane(broker)
+    for node in (listener, idle):
+        await node.start()
+
+    websocket, other_websocket = FakeWebSocket(), FakeWebSocket()
+    await listener.connection_manager.accept_connection(websocket=websocket, key='chat')
+    await listener.subscribe('chat')
+    await idle.connection_manager.accept_connection(websocket=other_websocket, key='other-chat')
+    await idle.subscribe('other-chat')
+
+    event = NewMessageReceivedEvent(message_text='hello', message_oid='oid', chat_oid='chat')
+    await NewMessageReceivedWebSocketsEventHandler(backplane=publisher).handle(event)
+    async with asyncio.timeout(5):
+        while not websocket.sent:
+            await asyncio.sleep(0.01)
+
+    assert [json.loads(payload)['text'] for payload in websocket.sent] == ['hello']
+    # одна запись в общий топик на все узлы, узел без слушателей чата отбрасывает ее по ключу
+    assert len(broker.get_messages('chat-websockets')) == 1
+    assert not other_websocket.sent
+
+    await listener.unsubscribe('chat')
+    await publisher.publish('chat', 'after unsubscribe')
+    await asyncio.sleep(0.05)
+    assert len(websocket.sent) == 1
+
+    for node in (listener, idle):
+        await node.close()
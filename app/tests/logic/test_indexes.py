@@ -0,0 +1,102 @@
+import logging
+from dataclasses import dataclass, field
+
+import pytest
+
+from infra.exceptions.repositories import QueriesNotCoveredByIndexException
+from infra.repositories.indexes import IndexUsageProbe, _find_stages, ensure_indexes, verify_indexes_usage
+
+COLLSCAN_PLAN = {'stage': 'SORT', 'inputStage': {'stage': 'COLLSCAN'}}
+IXSCAN_PLAN = {'stage': 'FETCH', 'inputStage': {'stage': 'IXSCAN', 'indexName': 'oid_unique'}}
+# $or - план из нескольких веток: одна ветка без индекса делает полный скан всего запроса
+OR_PLAN = {'stage': 'SUBPLAN', 'inputStage': {'stage': 'OR', 'inputStages': [IXSCAN_PLAN, COLLSCAN_PLAN]}}
+
+
+@dataclass
+class FakeCursor:
+    plan: dict
+    sorts: list = field(default_factory=list)
+
+    def sort(self, sort) -> 'FakeCursor':
+        self.sorts.append(sort)
+        return self
+
+    async def explain(self) -> dict:
+        return {'queryPlanner': {'winningPlan': self.plan}}
+
+
+@dataclass
+class FakeCollection:
+    # план explain() по имени поля в filter
+    plans: dict[str, dict]
+    cursors: list[FakeCursor] = field(default_factory=list)
+
+    def find(self, filter) -> FakeCursor:
+        cursor = FakeCursor(plan=self.plans[next(iter(filter))])
+        self.cursors.append(cursor)
+        return cursor
+
+
+@dataclass
+class StubRepository:
+    mongo_db_client: dict
+    probes: list[IndexUsageProbe]
+    mongo_db_db_name: str = 'chat_db'
+    mongo_db_collection_name: str = 'chats'
+    indexes_created: int = 0
+
+    async def create_indexes(self) -> None:
+        self.indexes_created += 1
+
+    def get_index_usage_probes(self) -> list[IndexUsageProbe]:
+        return self.probes
+
+
+def make_repository(probes: list[IndexUsageProbe]) -> StubRepository:
+    client = {'chat_db': {
+        'chats': FakeCollection(plans={'oid': IXSCAN_PLAN, 'title': COLLSCAN_PLAN}),
+        'messages': FakeCollection(plans={'chat_oid': OR_PLAN}),
+    }}
+    return StubRepository(mongo_db_client=client, probes=probes)
+
+
+def test_find_stages_walks_nested_plans():
+    assert list(_find_stages(IXSCAN_PLAN)) == ['FETCH', 'IXSCAN']
+    assert 'COLLSCAN' in set(_find_stages(OR_PLAN))
+    assert 'COLLSCAN' not in set(_find_stages({'stage': 'LIMIT', 'inputStage': IXSCAN_PLAN}))
+
+
+@pytest.mark.asyncio
+async def test_ensure_indexes_applies_every_repository_registry():
+    repositories = [make_repository([]), make_repository([])]
+
+    await ensure_indexes(repositories)
+
+    assert [repository.indexes_created for repository in repositories] == [1, 1]
+
+
+@pytest.mark.asyncio
+async def test_verify_indexes_usage_warns_about_collection_scans(caplog):
+    repository = make_repository([
+        IndexUsageProbe(name='by_oid', filter={'oid': ''}),
+        IndexUsageProbe(name='by_title', filter={'title': ''}),
+        IndexUsageProbe(name='messages', filter={'chat_oid': ''}, sort=[('created_at', 1)], collection_name='messages'),
+    ])
+
+    with caplog.at_level(logging.WARNING):
+        not_covered = await verify_indexes_usage([repository])
+
+    assert not_covered == ['StubRepository.by_title', 'StubRepository.messages']
+    assert 'StubRepository.by_title' in caplog.text
+    # sort пробы доходит до explain() - план с сортировкой может отличаться от плана без нее
+    assert repository.mongo_db_client['chat_db']['messages'].cursors[0].sorts == [[('created_at', 1)]]
+
+
+@pytest.mark.asyncio
+async def test_verify_indexes_usage_fails_when_asked():
+    covered = make_repository([IndexUsageProbe(name='by_oid', filter={'oid': ''})])
+    assert await verify_indexes_usage([covered], fail=True) == []
+
+    not_covered = make_repository([IndexUsageProbe(name='by_title', filter={'title': ''})])
+    with pytest.raises(QueriesNotCoveredByIndexException):
+        await verify_indexes_usage([not_covered], fail=True)
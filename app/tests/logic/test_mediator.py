@@ -0,0 +1,169 @@
+import asyncio
+from dataclasses import dataclass, field
+
+import pytest
+from punq import Container
+
+from domain.events.base import BaseEvent
+from infra.metrics.prometheus import PrometheusMetrics
+from logic.commands.base import BaseCommand, CommandHandler
+from logic.events.base import EventHandler
+from logic.exceptions.mediator import CommandHandlersNotRegisteredException, MediatorFrozenException, \
+    HandlerTimeoutException
+from logic.mediator import Mediator
+
+
+@dataclass(frozen=True)
+class EchoCommand(BaseCommand):
+    text: str
+
+
+@dataclass(frozen=True)
+class LoudEchoCommand(EchoCommand):
+    pass
+
+
+@dataclass(frozen=True)
+class EchoCommandHandler(CommandHandler[EchoCommand, str]):
+    async def handle(self, command: EchoCommand) -> str:
+        return command.text
+
+
+@dataclass(frozen=True)
+class FailingCommandHandler(CommandHandler[EchoCommand, str]):
+    async def handle(self, command: EchoCommand) -> str:
+        raise ValueError(command.text)
+
+
+@dataclass(frozen=True)
+class PingEvent(BaseEvent):
+    value: int
+
+
+@dataclass(frozen=True)
+class PongEvent(BaseEvent):
+    value: int
+
+
+@dataclass(frozen=True)
+class RecordingEventHandler(EventHandler[BaseEvent, str]):
+    name: str
+    delay: float = 0
+
+    async def handle(self, event: BaseEvent) -> str:
+        await asyncio.sleep(self.delay)
+        return f'{self.name}:{event.value}'
+
+
+@pytest.mark.asyncio
+async def test_mediator_dispatches_command_subclass_by_mro():
+    mediator = Mediator()
+    mediator.register_command(EchoCommand, [EchoCommandHandler()])
+    mediator.freeze()
+
+    assert await mediator.handle_command(LoudEchoCommand(text='hello')) == ['hello']
+
+
+@pytest.mark.asyncio
+async def test_mediator_frozen_rejects_registration():
+    mediator = Mediator().freeze()
+
+    with pytest.raises(MediatorFrozenException):
+        mediator.register_command(EchoCommand, [EchoCommandHandler()])
+
+    with pytest.raises(CommandHandlersNotRegisteredException):
+        await mediator.handle_command(EchoCommand(text='hello'))
+
+
+def test_mediator_is_container_singleton(container: Container):
+    mediator = container.resolve(Mediator)
+
+    assert mediator is container.resolve(Mediator)
+    assert mediator.is_frozen
+
+
+@pytest.mark.asyncio
+async def test_mediator_publish_mixed_events_batch():
+    mediator = Mediator(concurrent_dispatch=True, max_concurrency=2)
+    mediator.register_event(PingEvent, [RecordingEventHandler(name='ping')])
+    mediator.register_event(PongEvent, [RecordingEventHandler(name='pong'), RecordingEventHandler(name='pong2')])
+    mediator.freeze()
+
+    results = await mediator.publish_event([PingEvent(value=1), PongEvent(value=2), PingEvent(value=3)])
+
+    assert results == ['ping:1', 'pong:2', 'pong2:2', 'ping:3']
+
+
+@pytest.mark.asyncio
+async def test_mediator_concurrent_handlers_run_together():
+    mediator = Mediator(concurrent_dispatch=True)
+    mediator.register_event(PingEvent, [RecordingEventHandler(name=str(index), delay=0.05) for index in range(10)])
+    mediator.freeze()
+
+    loop = asyncio.get_running_loop()
+    started_at = loop.time()
+    results = await mediator.publish_event([PingEvent(value=1)])
+
+    assert len(results) == 10
+    assert loop.time() - started_at < 0.05 * 5
+
+
+@dataclass(frozen=True)
+class OrderRecordingEventHandler(EventHandler[BaseEvent, int]):
+    received: list = field(default_factory=list, hash=False, compare=False)
+
+    async def handle(self, event: BaseEvent) -> int:
+        # задержка обратна номеру: при вызове "каждая пара - своя задача" поздние события обгоняли бы ранние
+        await asyncio.sleep(0.001 * (5 - event.value % 5))
+        self.received.append(event.value)
+        return event.value
+
+
+@pytest.mark.asyncio
+async def test_mediator_concurrent_dispatch_keeps_batch_order_per_handler():
+    first, second = OrderRecordingEventHandler(), OrderRecordingEventHandler()
+    mediator = Mediator(concurrent_dispatch=True, max_concurrency=4)
+    mediator.register_event(PingEvent, [first, second])
+    mediator.freeze()
+
+    values = list(range(20))
+    results = await mediator.publish_event([PingEvent(value=value) for value in values])
+
+    assert first.received == values
+    assert second.received == values
+    assert results == [value for value in values for _ in range(2)]
+
+
+@pytest.mark.asyncio
+async def test_mediator_handler_timeout():
+    mediator = Mediator(concurrent_dispatch=True, handler_timeout=0.01)
+    mediator.register_event(PingEvent, [RecordingEventHandler(name='slow', delay=1), RecordingEventHandler(name='fast')])
+    mediator.freeze()
+
+    with pytest.raises(HandlerTimeoutException):
+        await mediator.publish_event([PingEvent(value=1)])
+
+
+@pytest.mark.asyncio
+async def test_mediator_records_command_and_publish_lag_metrics():
+    metrics = PrometheusMetrics()
+    mediator = Mediator(metrics=metrics)
+    mediator.register_command(EchoCommand, [EchoCommandHandler()])
+    mediator.register_command(LoudEchoCommand, [FailingCommandHandler()])
+    mediator.register_event(PingEvent, [RecordingEventHandler(name='ping')])
+    mediator.freeze()
+
+    await mediator.handle_command(EchoCommand(text='hello'))
+    await mediator.handle_command(EchoCommand(text='hello'))
+    with pytest.raises(ValueError):
+        await mediator.handle_command(LoudEchoCommand(text='boom'))
+    await mediator.publish_event([PingEvent(value=1)])
+
+    def sample(name: str, **labels) -> float | None:
+        return metrics.registry.get_sample_value(name, labels)
+
+    assert sample('chat_command_duration_seconds_count', command='EchoCommand') == 2
+    assert sample('chat_command_errors_total', command='EchoCommand') == 0
+    assert sample('chat_command_duration_seconds_count', command='LoudEchoCommand') == 1
+    assert sample('chat_command_errors_total', command='LoudEchoCommand') == 1
+    assert sample('chat_event_publish_lag_seconds_count', event='PingEvent') == 1
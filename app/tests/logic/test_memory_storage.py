@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from domain.entities.messages import Chat, Message
+from domain.values.messages import Text, Title
+from infra.repositories.filters.messages import GetMessagesFilters, MessagesCursor
+from infra.repositories.messages.base import BaseChatsRepository
+from infra.repositories.messages.memory import MemoryChatsRepository, MemoryMessagesRepository, MemoryStorage
+from infra.repositories.messages.snapshots import MemorySnapshotter
+from infra.repositories.outbox.base import BaseOutboxRepository
+from infra.repositories.outbox.memory import MemoryOutboxRepository
+from logic.consumers import BroadcastEventsConsumer, EventsConsumer
+from logic.init import init_memory_container
+from logic.mediator import Mediator
+from logic.outbox import OutboxRelay
+
+
+def make_message(text: str, seconds: int) -> Message:
+    return Message(text=Text(text), created_at=datetime(2024, 1, 1) + timedelta(seconds=seconds))
+
+
+@pytest.mark.asyncio
+async def test_memory_repositories_share_storage_and_keep_history_order():
+    storage, outbox = MemoryStorage(), MemoryOutboxRepository()
+    chats_repository = MemoryChatsRepository(storage=storage, outbox=outbox)
+    messages_repository = MemoryMessagesRepository(storage=storage, outbox=outbox)
+
+    chat = Chat.create_chat(title=Title('title'))
+    await chats_repository.add_chat(chat, events=chat.pull_events())
+    assert await chats_repository.check_chat_exists_by_title('title')
+
+    first, second, late = make_message('first', 1), make_message('second', 3), make_message('late', 2)
+    await messages_repository.add_messages(chat.oid, [first, second])
+    # сообщение, созданное раньше уже записанных, встает на свое место
+    await messages_repository.add_message(chat.oid, late)
+
+    loaded = await chats_repository.get_chat_by_oid(chat.oid)
+    assert [message.oid for message in loaded.messages] == [first.oid, late.oid, second.oid]
+
+    page = await messages_repository.get_messages(
+        chat.oid, GetMessagesFilters(limit=1, before=MessagesCursor.from_message(second)),
+    )
+    assert [message.oid for message in page] == [late.oid]
+
+
+@pytest.mark.asyncio
+async def test_memory_snapshot_roundtrip(tmp_path):
+    storage, outbox = MemoryStorage(), MemoryOutboxRepository()
+    chats_repository = MemoryChatsRepository(storage=storage, outbox=outbox)
+    messages_repository = MemoryMessagesRepository(storage=storage, outbox=outbox)
+
+    chat = Chat.create_chat(title=Title('title'))
+    await chats_repository.add_chat(chat, events=chat.pull_events())
+    messages = [make_message(f'text {number}', number) for number in range(2500)]
+    await messages_repository.add_messages(chat.oid, messages)
+
+    path = str(tmp_path / 'memory.snapshot')
+    assert not MemorySnapshotter(storage=MemoryStorage(), outbox=MemoryOutboxRepository(), path=path).load()
+    await MemorySnapshotter(storage=storage, outbox=outbox, path=path).save()
+
+    restored_storage, restored_outbox = MemoryStorage(), MemoryOutboxRepository()
+    assert MemorySnapshotter(storage=restored_storage, outbox=restored_outbox, path=path).load()
+
+    restored_chats = MemoryChatsRepository(storage=restored_storage, outbox=restored_outbox)
+    restored_chat = await restored_chats.get_chat_by_oid(chat.oid)
+    assert restored_chat.title == chat.title
+    assert [message.oid for message in restored_chat.messages] == [message.oid for message in messages]
+    assert await restored_chats.check_chat_exists_by_title('title')
+
+    pending = await restored_outbox.get_pending_events(limit=10)
+    assert [event.event_id for event in pending] == [event.event_id for event in outbox.get_all_pending_events()]
+
+
+def test_memory_container_never_creates_mongo_client(monkeypatch: pytest.MonkeyPatch):
+    def create_client(*args, **kwargs):
+        raise AssertionError('mongo client is not needed with STORAGE_BACKEND=memory')
+
+    monkeypatch.setattr(AsyncIOMotorClient, '__init__', create_client)
+    container = init_memory_container()
+
+    for dependency in (Mediator, OutboxRelay, EventsConsumer, BroadcastEventsConsumer):
+        container.resolve(dependency)
+    assert isinstance(container.resolve(BaseChatsRepository), MemoryChatsRepository)
+    assert isinstance(container.resolve(BaseOutboxRepository), MemoryOutboxRepository)
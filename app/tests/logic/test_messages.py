@@ -1,12 +1,20 @@
+import asyncio
+from dataclasses import dataclass, field
+
 import pytest
 from faker import Faker
+from punq import Container, Scope
 
-from domain.entities.messages import Chat
-from domain.values.messages import Title
-from infra.repositories.messages.base import BaseChatsRepository
-from logic.commands.messages import CreateChatCommand
-from logic.exceptions.messages import ChatWithThatTitleAlreadyExitsException
+from domain.entities.messages import Chat, Message
+from domain.events.messages import NewMessageReceivedEvent
+from domain.values.messages import Text, Title
+from infra.repositories.messages.base import BaseChatsRepository, BaseMessagesRepository
+from infra.repositories.messages.coalescing import CoalescingMessagesRepository
+from logic.commands.messages import CreateChatCommand, BulkCreateMessagesCommand
+from logic.exceptions.messages import ChatWithThatTitleAlreadyExitsException, ChatNotFoundException
 from logic.mediator import Mediator
+from infra.repositories.messages.recent import RecentMessagesBuffer
+from logic.queries.messages import ExportChatQuery, GetMessagesQuery
 
 
 @pytest.mark.asyncio  # Маркировка теста как асинхронного, чтобы pytest мог корректно выполнять его
@@ -20,7 +28,7 @@ async def test_create_chat_command_success(
     chat, *_ = await mediator.handle_command(CreateChatCommand(title=title_text))
 
     # Проверка, что созданный чат действительно существует в репозитории.
-    assert chat_repository.check_chat_exists_by_title(title=chat.title.as_generic_type())
+    assert await chat_repository.check_chat_exists_by_title(title=chat.title.as_generic_type())
 
 
 @pytest.mark.asyncio
@@ -33,14 +41,155 @@ async def test_create_chat_command_title_already_exists(
     chat = Chat(title=Title(title_text))
 
     # Добавление чата в репозиторий
-    chat_repository.add_chat(chat)
+    await chat_repository.add_chat(chat)
 
-    assert chat in chat_repository._saved_chats
+    assert chat.oid in chat_repository.storage.chats
 
     # Проверка, что исключение возникает при создании чата с тем же названием
     with pytest.raises(ChatWithThatTitleAlreadyExitsException):
         await mediator.handle_command(CreateChatCommand(title=title_text))
 
-    assert len(chat_repository._saved_chats) == 1
+    assert len(chat_repository.storage.chats) == 1
+
+
+
+
+@dataclass
+class RecordingMessagesRepository(BaseMessagesRepository):
+    writes: list = field(default_factory=list)
+    error: Exception | None = None
+
+    async def add_message(self, chat_oid, message, events=()):
+        self.writes.append((chat_oid, [message], list(events)))
+
+    async def add_messages(self, chat_oid, messages, events=()):
+        await asyncio.sleep(0)
+        if self.error:
+            raise self.error
+        self.writes.append((chat_oid, list(messages), list(events)))
+
+    async def get_messages(self, chat_oid, filters):
+        return []
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_messages_one_write_with_per_item_results(container: Container, faker: Faker):
+    messages_repository = RecordingMessagesRepository()
+    container.register(BaseMessagesRepository, instance=messages_repository, scope=Scope.singleton)
+    mediator = container.resolve(Mediator)
+
+    chat, *_ = await mediator.handle_command(CreateChatCommand(title=faker.text()[:100]))
+    texts = ['first', '', 'second']
+    results, *_ = await mediator.handle_command(BulkCreateMessagesCommand(chat_oid=chat.oid, texts=texts))
+
+    assert [result.text for result in results] == texts
+    assert results[1].message is None and results[1].error
+    assert all(result.message and not result.error for result in (results[0], results[2]))
+
+    # одна запись на пачку: только валидные сообщения и по событию на каждое
+    assert len(messages_repository.writes) == 1
+    chat_oid, messages, events = messages_repository.writes[0]
+    assert chat_oid == chat.oid
+    assert messages == [results[0].message, results[2].message]
+    assert [event.message_oid for event in events] == [message.oid for message in messages]
+    assert all(isinstance(event, NewMessageReceivedEvent) for event in events)
+
+
+@pytest.mark.asyncio
+async def test_coalescing_repository_groups_appends_per_chat():
+    messages_repository = RecordingMessagesRepository()
+    repository = CoalescingMessagesRepository(repository=messages_repository, window=0.01, max_items=4)
+    messages = [Message(text=Text(f'text {index}')) for index in range(10)]
+
+    await asyncio.gather(
+        *(repository.add_message(chat_oid='chat', message=message) for message in messages),
+        repository.add_message(chat_oid='other', message=Message(text=Text('other'))),
+    )
+
+    chat_writes = [written for chat_oid, written, _ in messages_repository.writes if chat_oid == 'chat']
+    # пачки по max_items, остаток - по окну; порядок сообщений не меняется
+    assert [len(written) for written in chat_writes] == [4, 4, 2]
+    assert [message for written in chat_writes for message in written] == messages
+    assert len(messages_repository.writes) == 4
+
+
+@pytest.mark.asyncio
+async def test_coalescing_repository_write_error_reaches_every_caller():
+    messages_repository = RecordingMessagesRepository(error=RuntimeError('write failed'))
+    repository = CoalescingMessagesRepository(repository=messages_repository, window=0.01)
+
+    results = await asyncio.gather(
+        *(repository.add_message(chat_oid='chat', message=Message(text=Text(str(index)))) for index in range(3)),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+@dataclass
+class HistoryMessagesRepository(RecordingMessagesRepository):
+    """
+    История по порядку, страницы после курсора (after) - как у хранилища
+    """
+    history: list[Message] = field(default_factory=list)
+    reads: int = 0
+
+    async def get_messages(self, chat_oid, filters):
+        self.reads += 1
+        after = (filters.after.created_at, filters.after.oid)
+        return [message for message in self.history if (message.created_at, message.oid) > after][:filters.limit]
+
+
+@pytest.mark.asyncio
+async def test_export_chat_reads_history_in_batches(container: Container, faker: Faker):
+    messages_repository = HistoryMessagesRepository(history=[Message(text=Text(f'text {number}')) for number in range(5)])
+    container.register(BaseMessagesRepository, instance=messages_repository, scope=Scope.singleton)
+    mediator = container.resolve(Mediator)
+
+    with pytest.raises(ChatNotFoundException):
+        await mediator.handle_query(ExportChatQuery(chat_oid=faker.uuid4()))
+
+    chat, *_ = await mediator.handle_command(CreateChatCommand(title=faker.text()[:100]))
+    export = await mediator.handle_query(ExportChatQuery(chat_oid=chat.oid, batch_size=2))
+    # история читается только по мере итерации
+    assert export.chat.oid == chat.oid and messages_repository.reads == 0
+
+    batches = [[message.oid for message in batch] async for batch in export.batches]
+    assert batches == [
+        [message.oid for message in messages_repository.history[start:start + 2]] for start in range(0, 5, 2)
+    ]
+    assert messages_repository.reads == 3
+
+
+@pytest.mark.asyncio
+async def test_get_messages_query_pages_through_history(container: Container, faker: Faker):
+    # маленький буфер последних сообщений - старые страницы читаются уже из memory-репозитория
+    container.register(RecentMessagesBuffer, instance=RecentMessagesBuffer(capacity=5), scope=Scope.singleton)
+    mediator = container.resolve(Mediator)
+
+    chat, *_ = await mediator.handle_command(CreateChatCommand(title=faker.text()[:100]))
+    texts = [f'text {number}' for number in range(23)]
+    results, *_ = await mediator.handle_command(BulkCreateMessagesCommand(chat_oid=chat.oid, texts=texts))
+    # порядок истории - (created_at, oid): сообщения пачки могут получить одинаковое время
+    messages = sorted((result.message for result in results), key=lambda message: (message.created_at, message.oid))
+    oids = [message.oid for message in messages]
+
+    # назад от последних сообщений до начала истории
+    pages, before = [], None
+    while True:
+        page = await mediator.handle_query(GetMessagesQuery(chat_oid=chat.oid, limit=10, before=before))
+        pages.insert(0, [message.oid for message in page.items])
+        if not page.before:
+            break
+        before = page.before.encode()
 
+    assert pages == [oids[:3], oids[3:13], oids[13:]]
 
+    # и вперед от первой страницы
+    first_page = await mediator.handle_query(GetMessagesQuery(chat_oid=chat.oid, limit=3, before=before))
+    assert [message.oid for message in first_page.items] == oids[:3]
+    next_page = await mediator.handle_query(
+        GetMessagesQuery(chat_oid=chat.oid, limit=10, after=first_page.after.encode()),
+    )
+    assert [message.oid for message in next_page.items] == oids[3:13]
+    assert next_page.after is not None
@@ -0,0 +1,36 @@
+from dataclasses import dataclass
+
+import pytest
+
+from domain.entities.messages import Chat
+from domain.values.messages import Title
+from infra.metrics.prometheus import PrometheusMetrics
+from infra.repositories.messages.instrumented import InstrumentedChatsRepository
+from infra.repositories.messages.memory import MemoryChatsRepository
+from logic.exceptions.messages import ChatWithThatTitleAlreadyExitsException
+
+
+@dataclass
+class BrokenChatsRepository(MemoryChatsRepository):
+    async def get_chat_metadata_by_oid(self, oid: str) -> Chat | None:
+        raise ConnectionError('storage is down')
+
+
+@pytest.mark.asyncio
+async def test_instrumented_repository_counts_calls_and_failures():
+    metrics = PrometheusMetrics()
+    repository = InstrumentedChatsRepository(repository=BrokenChatsRepository(), metrics=metrics)
+
+    await repository.add_chat(Chat(title=Title('title')))
+    # дубль названия - ответ хранилища, а не сбой
+    with pytest.raises(ChatWithThatTitleAlreadyExitsException):
+        await repository.add_chat(Chat(title=Title('title')))
+    with pytest.raises(ConnectionError):
+        await repository.get_chat_metadata_by_oid('oid')
+
+    def sample(name: str, method: str) -> float | None:
+        return metrics.registry.get_sample_value(name, {'repository': 'BrokenChatsRepository', 'method': method})
+
+    assert sample('chat_repository_duration_seconds_count', 'add_chat') == 2
+    assert sample('chat_repository_errors_total', 'add_chat') == 0
+    assert sample('chat_repository_errors_total', 'get_chat_metadata_by_oid') == 1
@@ -0,0 +1,53 @@
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReadPreference
+from pymongo.write_concern import WriteConcern
+
+from infra.repositories.clients import create_mongo_db_client
+from infra.repositories.messages.mongo import MongoDBCollectionMessagesRepository
+from infra.repositories.profiles import DEFAULT_OPERATION_PROFILE, build_operation_profile
+from settings.config import Config
+
+
+def test_build_operation_profile_parses_settings():
+    assert build_operation_profile() == DEFAULT_OPERATION_PROFILE
+
+    profile = build_operation_profile(read_preference='secondaryPreferred', write_concern='majority', journal=True)
+    assert profile.read_preference == ReadPreference.SECONDARY_PREFERRED
+    assert profile.write_concern == WriteConcern(w='majority', j=True)
+
+    assert build_operation_profile(write_concern='1').write_concern == WriteConcern(w=1)
+    with pytest.raises(ValueError):
+        build_operation_profile(read_preference='secondaries')
+
+
+def test_repository_applies_profiles_per_operation_class():
+    # connect=False - клиент не ходит в сеть, пока нет запросов
+    client = AsyncIOMotorClient('mongodb://localhost:27017', connect=False)
+    repository = MongoDBCollectionMessagesRepository(
+        mongo_db_client=client,
+        mongo_db_db_name='chat_db',
+        mongo_db_collection_name='messages_collection',
+        write_profile=build_operation_profile(write_concern='1', journal=False),
+        read_profile=build_operation_profile(read_preference='secondary'),
+    )
+
+    assert repository._write_collection.write_concern == WriteConcern(w=1, j=False)
+    assert repository._write_collection.read_preference == ReadPreference.PRIMARY
+    assert repository._read_collection.read_preference == ReadPreference.SECONDARY
+    assert repository._read_collection.write_concern == client.write_concern
+    # индексы и прочие служебные запросы - с настройками клиента
+    assert repository._collection.read_preference == ReadPreference.PRIMARY
+
+    client.close()
+
+
+def test_mongo_client_is_built_from_pool_settings():
+    config = Config(MONGODB_MAX_POOL_SIZE=7, MONGODB_SERVER_SELECTION_TIMEOUT_MS=1234)
+    # одна фабрика на приложение и миграции - пул и таймауты из конфига у всех клиентов
+    client = create_mongo_db_client(config)
+
+    assert client.options.pool_options.max_pool_size == 7
+    assert client.options.server_selection_timeout == 1.234
+
+    client.close()
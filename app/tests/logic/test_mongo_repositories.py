@@ -0,0 +1,237 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+import pytest
+
+from domain.entities.messages import Message
+from domain.events.messages import NewMessageReceivedEvent
+from domain.values.messages import Text
+from infra.repositories.filters.messages import GetMessagesFilters
+from infra.repositories.messages.codecs import encode_message
+from infra.repositories.messages.mongo import MongoDBCollectionMessagesRepository, MongoDBMessagesRepository
+from infra.repositories.outbox.converters import convert_event_to_document
+from infra.repositories.outbox.mongo import MongoDBOutboxRepository
+
+
+@dataclass
+class FakeCursor:
+    documents: list[dict]
+    closed: bool = False
+
+    def sort(self, *args, **kwargs) -> 'FakeCursor':
+        return self
+
+    def limit(self, limit: int) -> 'FakeCursor':
+        self.documents = self.documents[:limit]
+        return self
+
+    async def to_list(self, length: int) -> list[dict]:
+        batch, self.documents = self.documents[:length], self.documents[length:]
+        return batch
+
+    async def close(self) -> None:
+        self.closed = True
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in self.documents:
+            yield document
+
+
+@dataclass
+class FakeCollection:
+    """
+    Коллекция в памяти с той частью запросов, которой пользуются репозитории: insert_many, update_one
+    с $push, aggregate страницы истории и экспорта; find и update_many только запоминают вызов
+    (find отдает все документы с outbox).
+    """
+    documents: list[dict] = field(default_factory=list)
+    calls: list[tuple[str, dict]] = field(default_factory=list)
+    cursors: list[FakeCursor] = field(default_factory=list)
+
+    def find(self, filter: dict, projection: dict | None = None) -> FakeCursor:
+        self.calls.append(('find', {'filter': filter}))
+        self.cursors.append(cursor := FakeCursor([document for document in self.documents if 'outbox' in document]))
+        return cursor
+
+    def aggregate(self, pipeline: list[dict], **kwargs) -> FakeCursor:
+        """
+        Только конвейеры репозиториев: $match по oid, затем либо $project страницы ($slice по $sortArray
+        без курсоров), либо экспорт - $unwind массива, $replaceRoot, $sort, $project.
+        """
+        self.calls.append(('aggregate', {'pipeline': pipeline, **kwargs}))
+        stages = {name: value for stage in pipeline for name, value in stage.items()}
+        documents = [document for document in self.documents if document['oid'] == stages['$match']['oid']]
+        if '$unwind' not in stages:
+            documents = [
+                {name: self._evaluate(document, value) for name, value in stages['$project'].items() if value}
+                for document in documents
+            ]
+        else:
+            documents = [item for document in documents for item in document[stages['$unwind'].lstrip('$')]]
+            documents.sort(key=lambda item: tuple(item[key] for key in stages['$sort']))
+        self.cursors.append(cursor := FakeCursor(documents))
+        return cursor
+
+    def _evaluate(self, document: dict, expression):
+        if isinstance(expression, str):
+            return document[expression.lstrip('$')]
+        if '$slice' in expression:
+            items, count = expression['$slice']
+            items = self._evaluate(document, items)
+            return items[:count] if count >= 0 else items[count:]
+
+        sort = expression['$sortArray']['sortBy']
+        return sorted(
+            self._evaluate(document, expression['$sortArray']['input']),
+            key=lambda item: tuple(item[key] for key in sort),
+        )
+
+    async def insert_many(self, documents: list[dict], ordered: bool = True):
+        self.calls.append(('insert_many', {'ordered': ordered}))
+        self.documents.extend(documents)
+
+    async def update_many(self, filter: dict, update: dict):
+        self.calls.append(('update_many', {'filter': filter, 'update': update}))
+
+    async def update_one(self, filter: dict, update: dict):
+        self.calls.append(('update_one', {'filter': filter, 'update': update}))
+        document = next(document for document in self.documents if document['oid'] == filter['oid'])
+        for name, value in update.get('$push', {}).items():
+            document.setdefault(name, []).extend(value['$each'] if '$each' in value else [value])
+
+
+class FakeDatabase(dict):
+    """
+    База - словарь коллекций, клиент - словарь баз: client[db_name][collection_name], как у motor.
+    """
+
+    def __missing__(self, collection_name: str) -> FakeCollection:
+        collection = self[collection_name] = FakeCollection()
+        return collection
+
+
+def make_message(text: str, seconds: int) -> Message:
+    return Message(text=Text(text), created_at=datetime(2024, 1, 1) + timedelta(seconds=seconds))
+
+
+@pytest.mark.asyncio
+async def test_embedded_messages_page_keeps_history_order_on_out_of_order_appends():
+    database = FakeDatabase()
+    database['chats'].documents.append({'oid': 'chat', 'messages': []})
+    repository = MongoDBMessagesRepository(
+        mongo_db_client={'chat_db': database},
+        mongo_db_db_name='chat_db',
+        mongo_db_collection_name='chats',
+    )
+
+    # created_at ставится до записи: второй воркер успел записать более новое сообщение раньше
+    earliest, earlier, later = make_message('earliest', 0), make_message('earlier', 1), make_message('later', 2)
+    for message in (earliest, later, earlier):
+        await repository.add_message('chat', message)
+
+    pushes = [call['update']['$push'] for name, call in database['chats'].calls if name == 'update_one']
+    # запись - дописывание в конец массива, без сортировки всей истории чата
+    assert all('$sort' not in push['messages'] for push in pushes)
+
+    page = await repository.get_messages('chat', GetMessagesFilters(limit=2))
+    # страница - последние сообщения в порядке (created_at, oid), как и у коллекции сообщений
+    assert [message.oid for message in page] == [earlier.oid, later.oid]
+
+
+@pytest.mark.asyncio
+async def test_outbox_marks_published_events_by_document_id():
+    database = FakeDatabase()
+    event = NewMessageReceivedEvent(message_text='text', message_oid='message', chat_oid='chat')
+    database['messages'].documents.append({'_id': 7, 'outbox': [convert_event_to_document(event)]})
+    repository = MongoDBOutboxRepository(
+        mongo_db_client={'chat_db': database},
+        mongo_db_db_name='chat_db',
+        mongo_db_collection_names=('chats', 'messages'),
+    )
+
+    events = await repository.get_pending_events(limit=10)
+    assert [pending.event_id for pending in events] == [event.event_id]
+    await repository.mark_published(events)
+
+    updates = [call for name, call in database['messages'].calls if name == 'update_many']
+    # _id - индекс есть всегда: обновляются только документы пачки, без скана коллекции
+    assert [update['filter']['_id'] for update in updates] == [{'$in': [7]}, {'$in': [7]}]
+    assert not [call for name, call in database['chats'].calls if name == 'update_many']
+
+
+@pytest.mark.asyncio
+async def test_outbox_limits_batch_by_events_not_documents():
+    database = FakeDatabase()
+    events = [
+        NewMessageReceivedEvent(message_text='text', message_oid=str(index), chat_oid='chat') for index in range(5)
+    ]
+    # все события "горячего" чата - в одном документе
+    database['chats'].documents.append({'_id': 1, 'outbox': [convert_event_to_document(event) for event in events]})
+    repository = MongoDBOutboxRepository(
+        mongo_db_client={'chat_db': database},
+        mongo_db_db_name='chat_db',
+        mongo_db_collection_names=('chats',),
+    )
+
+    pending = await repository.get_pending_events(limit=2)
+    assert [event.event_id for event in pending] == [event.event_id for event in events[:2]]
+    await repository.mark_published(pending)
+
+    updates = [call['update'] for name, call in database['chats'].calls if name == 'update_many']
+    # из outbox удаляются только события пачки, остальные уйдут следующей
+    assert updates[0]['$pull']['outbox']['event_id']['$in'] == [str(event.event_id) for event in events[:2]]
+    assert database['chats'].cursors[-1].closed
+
+
+@pytest.mark.asyncio
+async def test_collection_messages_batch_keeps_each_event_with_its_message():
+    database = FakeDatabase()
+    repository = MongoDBCollectionMessagesRepository(
+        mongo_db_client={'chat_db': database},
+        mongo_db_db_name='chat_db',
+        mongo_db_collection_name='messages',
+    )
+    messages = [make_message(f'text {index}', index) for index in range(3)]
+    events = [
+        NewMessageReceivedEvent(message_text=message.text.value, message_oid=message.oid, chat_oid='chat')
+        for message in messages
+    ]
+
+    await repository.add_messages('chat', messages, events=events)
+
+    # сообщение и его событие - одна атомарная запись: событие не потеряется и не уйдет без сообщения,
+    # даже если вставка пачки оборвется посередине
+    documents = database['messages'].documents
+    assert [[event['event_id'] for event in document['outbox']] for document in documents] == [
+        [str(event.event_id)] for event in events
+    ]
+
+
+@pytest.mark.asyncio
+async def test_embedded_messages_export_reads_chat_with_one_cursor():
+    database = FakeDatabase()
+    messages = [make_message(f'text {index}', index) for index in range(5)]
+    # параллельные $push дописывают массив не по порядку
+    database['chats'].documents.append({
+        'oid': 'chat',
+        'messages': [encode_message(message) for message in reversed(messages)],
+    })
+    repository = MongoDBMessagesRepository(
+        mongo_db_client={'chat_db': database},
+        mongo_db_db_name='chat_db',
+        mongo_db_collection_name='chats',
+    )
+
+    batches = [batch async for batch in repository.iter_messages('chat', batch_size=2)]
+
+    assert [[message.oid for message in batch] for batch in batches] == [
+        [message.oid for message in messages[start:start + 2]] for start in range(0, 5, 2)
+    ]
+    aggregates = [call for name, call in database['chats'].calls if name == 'aggregate']
+    # одна агрегация на весь экспорт, пачки отдает курсор
+    assert len(aggregates) == 1
+    assert aggregates[0]['batchSize'] == 2
+    assert database['chats'].cursors[0].closed
@@ -0,0 +1,95 @@
+import asyncio
+from dataclasses import dataclass, field
+
+import pytest
+from faker import Faker
+from punq import Container
+
+from domain.events.messages import NewChatCreatedEvent
+from infra.repositories.outbox.base import BaseOutboxRepository
+from infra.repositories.outbox.memory import MemoryOutboxRepository
+from logic.commands.messages import CreateChatCommand
+from logic.events.base import EventHandler
+from logic.mediator import Mediator
+from logic.outbox import OutboxRelay
+
+
+@dataclass(frozen=True)
+class CollectingEventHandler(EventHandler[NewChatCreatedEvent, None]):
+    events: list = field(default_factory=list)
+
+    async def handle(self, event: NewChatCreatedEvent) -> None:
+        self.events.append(event)
+
+
+@pytest.mark.asyncio
+async def test_create_chat_stores_event_in_outbox(
+        container: Container,
+        mediator: Mediator,
+        faker: Faker,
+):
+    chat, *_ = await mediator.handle_command(CreateChatCommand(title=faker.text()[:100]))
+
+    outbox_repository = container.resolve(BaseOutboxRepository)
+    pending_events = await outbox_repository.get_pending_events(limit=10)
+
+    assert len(pending_events) == 1
+    assert isinstance(pending_events[0], NewChatCreatedEvent)
+    assert pending_events[0].chat_oid == chat.oid
+    assert not chat.pull_events()
+
+
+@pytest.mark.asyncio
+async def test_outbox_relay_publishes_and_marks_events(
+        container: Container,
+        mediator: Mediator,
+        faker: Faker,
+):
+    chat, *_ = await mediator.handle_command(CreateChatCommand(title=faker.text()[:100]))
+
+    handler = CollectingEventHandler()
+    relay_mediator = Mediator()
+    relay_mediator.register_event(NewChatCreatedEvent, [handler])
+    outbox_repository = container.resolve(BaseOutboxRepository)
+    relay = OutboxRelay(outbox_repository=outbox_repository, mediator=relay_mediator.freeze())
+
+    assert await relay.drain_once() == 1
+    assert [event.chat_oid for event in handler.events] == [chat.oid]
+
+    assert await relay.drain_once() == 0
+    assert not await outbox_repository.get_pending_events(limit=10)
+
+
+@dataclass
+class LeasedOutboxRepository(MemoryOutboxRepository):
+    owner: str | None = field(default=None, kw_only=True)
+
+    async def acquire_relay_lease(self, owner: str, ttl: float) -> bool:
+        return self.owner == owner
+
+
+@pytest.mark.asyncio
+async def test_outbox_relay_publishes_only_while_holding_lease():
+    outbox_repository = LeasedOutboxRepository(owner='other-worker')
+    outbox_repository.add_events([NewChatCreatedEvent(chat_oid='chat', chat_title='title')])
+    handler = CollectingEventHandler()
+    relay_mediator = Mediator()
+    relay_mediator.register_event(NewChatCreatedEvent, [handler])
+    relay = OutboxRelay(
+        outbox_repository=outbox_repository,
+        mediator=relay_mediator.freeze(),
+        poll_interval=0.01,
+        owner='this-worker',
+    )
+
+    task = asyncio.create_task(relay.run())
+    await asyncio.sleep(0.05)
+    assert not handler.events
+
+    # право освободилось и досталось этому relay - он начинает публиковать
+    outbox_repository.owner = 'this-worker'
+    await asyncio.sleep(0.05)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    assert [event.chat_oid for event in handler.events] == ['chat']
@@ -0,0 +1,167 @@
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+import pytest
+from punq import Container, Scope
+
+from domain.entities.messages import Message
+from domain.events.messages import NewMessageReceivedEvent
+from domain.values.messages import Text
+from infra.message_brokers.memory import MemoryMessageBroker, MemoryMessageConsumer
+from infra.repositories.filters.messages import GetMessagesFilters, MessagesCursor
+from infra.repositories.messages.base import BaseMessagesRepository
+from infra.repositories.messages.recent import RecentMessagesBuffer
+from logic.commands.messages import CreateChatCommand, CreateMessageCommand
+from logic.consumers import BroadcastEventsConsumer
+from logic.events.messages import NewMessageReceivedEventHandler, NewMessageReceivedRecentMessagesEventHandler
+from logic.mediator import Mediator
+from logic.queries.messages import GetMessagesQuery
+
+
+def make_messages(count: int, start: datetime = datetime(2024, 1, 1)) -> list[Message]:
+    return [Message(text=Text(f'text {index}'), created_at=start + timedelta(seconds=index)) for index in range(count)]
+
+
+@dataclass
+class FakeClock:
+    now: float = 0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@dataclass
+class LatestMessagesRepository(BaseMessagesRepository):
+    """
+    Отдает последние limit сообщений и считает обращения - курсоры буфер в хранилище не пропускает.
+    """
+    messages: list[Message] = field(default_factory=list)
+    reads: int = 0
+
+    async def add_message(self, chat_oid, message, events=()):
+        self.messages.append(message)
+
+    async def add_messages(self, chat_oid, messages, events=()):
+        self.messages.extend(messages)
+
+    async def get_messages(self, chat_oid, filters):
+        self.reads += 1
+        return self.messages[-filters.limit:]
+
+
+def test_recent_messages_buffer_pages_and_cursors():
+    buffer = RecentMessagesBuffer(capacity=5)
+    messages = make_messages(8)
+    buffer.seed('chat', messages[-5:], complete=False)
+
+    assert buffer.get_messages('chat', GetMessagesFilters(limit=3)) == messages[-3:]
+    before = MessagesCursor.from_message(messages[5])
+    assert buffer.get_messages('chat', GetMessagesFilters(limit=3, before=before)) is None
+    assert buffer.get_messages('chat', GetMessagesFilters(limit=2, before=before)) == messages[3:5]
+    after = MessagesCursor.from_message(messages[5])
+    assert buffer.get_messages('chat', GetMessagesFilters(limit=10, after=after)) == messages[6:]
+
+    # буфер - ограниченный хвост: старые сообщения вытесняются новыми, дубли по oid отбрасываются
+    new_message = make_messages(1, start=datetime(2024, 2, 1))[0]
+    buffer.add_message('chat', new_message)
+    buffer.add_message('chat', new_message)
+    assert buffer.get_messages('chat', GetMessagesFilters(limit=5)) == messages[-4:] + [new_message]
+
+
+def test_recent_messages_buffer_evicts_whole_chats_lru():
+    buffer = RecentMessagesBuffer(capacity=10, max_bytes=3000)
+    for chat_oid in ('first', 'second'):
+        buffer.seed(chat_oid, make_messages(5), complete=True)
+    buffer.get_messages('first', GetMessagesFilters(limit=1))
+
+    buffer.seed('third', make_messages(5), complete=True)
+
+    assert buffer.is_seeded('first') and buffer.is_seeded('third')
+    assert not buffer.is_seeded('second')
+    assert buffer.size <= 3000
+    assert buffer.stats.evictions == 1
+
+
+@pytest.mark.asyncio
+async def test_get_messages_served_from_buffer_after_first_read(container: Container):
+    messages_repository = LatestMessagesRepository(messages=make_messages(3))
+    container.register(BaseMessagesRepository, instance=messages_repository, scope=Scope.singleton)
+    container.register(RecentMessagesBuffer, instance=RecentMessagesBuffer(capacity=100), scope=Scope.singleton)
+    mediator = container.resolve(Mediator)
+    chat, *_ = await mediator.handle_command(CreateChatCommand(title='recent messages'))
+
+    first_page = await mediator.handle_query(GetMessagesQuery(chat_oid=chat.oid, limit=2))
+    message, *_ = await mediator.handle_command(CreateMessageCommand(chat_oid=chat.oid, text='new'))
+    second_page = await mediator.handle_query(GetMessagesQuery(chat_oid=chat.oid, limit=2))
+
+    assert first_page.items == messages_repository.messages[1:3]
+    assert first_page.before is not None
+    assert [item.oid for item in second_page.items] == [messages_repository.messages[2].oid, message.oid]
+    assert messages_repository.reads == 1
+
+
+@pytest.mark.asyncio
+async def test_get_messages_reseeds_expired_buffer(container: Container):
+    clock = FakeClock()
+    messages_repository = LatestMessagesRepository(messages=make_messages(3))
+    container.register(BaseMessagesRepository, instance=messages_repository, scope=Scope.singleton)
+    recent_messages = RecentMessagesBuffer(capacity=100, ttl=5, clock=clock)
+    container.register(RecentMessagesBuffer, instance=recent_messages, scope=Scope.singleton)
+    mediator = container.resolve(Mediator)
+    chat, *_ = await mediator.handle_command(CreateChatCommand(title='recent messages ttl'))
+
+    await mediator.handle_query(GetMessagesQuery(chat_oid=chat.oid, limit=2))
+    # сообщение записал другой процесс, а его событие до этого процесса не дошло
+    lost, *_ = make_messages(1, start=datetime(2024, 2, 1))
+    messages_repository.messages.append(lost)
+
+    stale_page = await mediator.handle_query(GetMessagesQuery(chat_oid=chat.oid, limit=2))
+    clock.now = 5
+    fresh_page = await mediator.handle_query(GetMessagesQuery(chat_oid=chat.oid, limit=2))
+
+    assert lost not in stale_page.items
+    assert fresh_page.items[-1].oid == lost.oid
+    assert messages_repository.reads == 2
+
+
+@pytest.mark.asyncio
+async def test_recent_messages_buffer_receives_other_processes_messages_from_broker():
+    broker = MemoryMessageBroker()
+    buffer = RecentMessagesBuffer(capacity=5)
+    messages = make_messages(3)
+    buffer.seed('chat', messages, complete=True)
+
+    # процесс, принявший сообщение: relay отправляет событие в брокер
+    relay_mediator = Mediator()
+    relay_mediator.register_event(
+        NewMessageReceivedEvent,
+        [NewMessageReceivedEventHandler(message_broker=broker, broker_topic='new-messages')],
+    )
+    relay_mediator.freeze()
+    # этот процесс: слушатель событий дописывает сообщение в свой буфер
+    listener_mediator = Mediator()
+    listener_mediator.register_event(NewMessageReceivedEvent, [NewMessageReceivedRecentMessagesEventHandler(buffer)])
+    listener = BroadcastEventsConsumer(
+        consumer=MemoryMessageConsumer(broker=broker, topics=('new-messages',)),
+        mediator=listener_mediator.freeze(),
+        workers=1,
+        fetch_timeout=0.01,
+    )
+    await listener.consumer.start()
+    listener_task = asyncio.create_task(listener.run())
+
+    new_message, *_ = make_messages(1, start=datetime(2024, 2, 1))
+    await relay_mediator.publish_event([NewMessageReceivedEvent(
+        message_text=new_message.text.as_generic_type(),
+        message_oid=new_message.oid,
+        chat_oid='chat',
+        message_created_at=new_message.created_at,
+    )])
+    async with asyncio.timeout(5):
+        while len(buffer.get_messages('chat', GetMessagesFilters(limit=5))) < 4:
+            await asyncio.sleep(0.01)
+
+    listener.stop()
+    await listener_task
+    assert buffer.get_messages('chat', GetMessagesFilters(limit=5)) == [*messages, new_message]